@@ -0,0 +1,97 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+
+class ColdCompactor:
+    """
+    Moves closed months of weatherdata into columnar cold storage (see
+    azure_table_service.cold_storage) in a background thread, at most once
+    per `interval_sec`.
+
+    A month is compacted once it ended at least `min_age_days` ago, so
+    readings that arrive late usually land before it moves. Compaction is
+    idempotent and resumable: a run interrupted by a restart is finished by
+    the next one, and rows that still arrive for a compacted month are folded
+    in then.
+    """
+
+    def __init__(self, table_service, interval_sec: float = 86400, min_age_days: int = 7):
+        self.table_service = table_service
+        self.interval_sec = interval_sec
+        self.min_age_days = min_age_days
+        self._lock = threading.Lock()
+        self._running = False
+        self._last_started = None
+        self._stats = {"runs": 0, "partitions": 0, "months": 0,
+                       "rows": 0, "partitions_failed": 0}
+
+    def cutoff_month(self) -> str:
+        """
+        The first month ('YYYY-MM') that stays hot.
+        """
+        return (datetime.now() - timedelta(days=self.min_age_days)).strftime("%Y-%m")
+
+    def start_if_due(self, partition_keys) -> bool:
+        """
+        Start a compaction of `partition_keys` in the background unless one
+        is running or the last started less than `interval_sec` ago. Returns
+        whether one was started.
+        """
+        if self.interval_sec <= 0:
+            return False
+        now = time.time()
+        with self._lock:
+            if self._running or (self._last_started is not None and now - self._last_started < self.interval_sec):
+                return False
+            self._running = True
+            self._last_started = now
+
+        threading.Thread(target=self._run_and_release, args=(list(partition_keys),),
+                         name="cold-compaction", daemon=True).start()
+        return True
+
+    def run(self, partition_keys) -> dict:
+        """
+        Compact every closed month of each partition. Errors are logged and
+        the partition is retried on the next run.
+        """
+        cutoff = self.cutoff_month()
+        started = time.perf_counter()
+        totals = {"partitions": 0, "months": 0,
+                  "rows": 0, "partitions_failed": 0}
+        for partition_key in dict.fromkeys(partition_keys):
+            try:
+                result = self.table_service.compact_weather(
+                    partition_key, cutoff)
+                totals["partitions"] += 1
+                totals["months"] += result["months"]
+                totals["rows"] += result["rows"]
+            except Exception as e:
+                logger.error(
+                    f"Error compacting weather data of partition {partition_key}: {e}")
+                totals["partitions_failed"] += 1
+
+        with self._lock:
+            self._stats["runs"] += 1
+            for key, value in totals.items():
+                self._stats[key] += value
+        logger.info(
+            f"Cold compaction before {cutoff} finished in {time.perf_counter() - started:.2f}s: "
+            f"{totals['months']} months and {totals['rows']} rows in {totals['partitions']} partitions, "
+            f"{totals['partitions_failed']} failed")
+        return totals
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+    def _run_and_release(self, partition_keys):
+        try:
+            self.run(partition_keys)
+        finally:
+            with self._lock:
+                self._running = False
@@ -0,0 +1,135 @@
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class DashboardSummaryWriter:
+    """
+    Writes the dashboard read model (the `dashboardsummary` table) after each
+    recompute, so the API serves field and farm dashboards with one read per
+    field instead of recomputing GDD from gdddata.
+
+    A field is rewritten when any of its sensors was recomputed this cycle,
+    or when its summary is older than `refresh_interval_sec`, so summaries of
+    quiet fields stay within the API's maximum age.
+    """
+
+    def __init__(self, table_service, refresh_interval_sec: float = 300):
+        self.table_service = table_service
+        self.refresh_interval_sec = refresh_interval_sec
+        self._lock = threading.Lock()
+        # Field ID -> time its summary was last written
+        self._written_at = {}
+        self._stats = {"fields_written": 0,
+                       "fields_skipped": 0, "fields_failed": 0}
+
+    def refresh(self, fields, recomputed, reset_dates, cutting_dates, executor=None) -> int:
+        """
+        Rewrite the summaries of the fields that need it. `recomputed` holds
+        the serials recomputed this cycle, `reset_dates` and `cutting_dates`
+        are keyed by serial (cutting dates fall back to the stored ones).
+        Returns the number of fields written.
+        """
+        now = time.time()
+        due = []
+        for field in fields:
+            if not field.sensors:
+                continue
+            with self._lock:
+                written_at = self._written_at.get(field.FieldId)
+            changed = any(
+                sensor.SerialNo in recomputed for sensor in field.sensors)
+            if changed or written_at is None or now - written_at >= self.refresh_interval_sec:
+                due.append(field)
+            else:
+                self._count("fields_skipped")
+
+        # Temperature and humidity forecasts are per grid cell; read each once
+        cell_series = {}
+        cell_lock = threading.Lock()
+
+        def write(field):
+            try:
+                self._write_field(field, reset_dates,
+                                  cutting_dates, cell_series, cell_lock)
+                return True
+            except Exception as e:
+                logger.error(
+                    f"Error writing dashboard summary for field {field.FieldId}: {e}")
+                self._count("fields_failed")
+                return False
+
+        results = list(executor.map(write, due)
+                       if executor is not None else map(write, due))
+        return sum(results)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+    def _write_field(self, field, reset_dates, cutting_dates, cell_series, cell_lock):
+        sensor_summaries = {}
+        for sensor in field.sensors:
+            serial = sensor.SerialNo
+            reset_date = reset_dates.get(serial) or datetime.now()
+            cutting_date = cutting_dates.get(
+                serial, sensor.CuttingDateCalculated)
+
+            forecast_partition = self.table_service.get_forecast_partition(
+                serial)
+            with cell_lock:
+                series = cell_series.get(forecast_partition)
+            if series is None:
+                # Temperature and humidity from one weatherdata query
+                weather = self.table_service.get_weather_forecast_series(
+                    serial)
+                series = (
+                    self.table_service.encode_series(
+                        weather["temperature"], "temperature"),
+                    self.table_service.encode_series(
+                        weather["humidity"], "humidity"),
+                )
+                with cell_lock:
+                    cell_series[forecast_partition] = series
+
+            # Current and cumulative GDD from one pass over the GDD data
+            gdd = self.table_service.get_gdd_series(serial, reset_date)
+            sensor_summaries[serial] = {
+                "SensorId": sensor.SensorId,
+                "OptimalGDD": sensor.OptimalGDD,
+                # Dates as ISO strings: Azure would return datetimes as UTC-aware
+                "ResetDate": reset_date.isoformat(),
+                "CurrentGDD": float(gdd["current_gdd"]),
+                "CuttingDate": cutting_date.isoformat() if cutting_date else None,
+                "SevenDayGDD": self.table_service.encode_series(
+                    gdd["cumulative_gdd"], "cumulative_gdd"),
+                "SevenDayTemp": series[0],
+                "SevenDayHumidity": series[1],
+            }
+
+        gdd_values = [summary["CurrentGDD"]
+                      for summary in sensor_summaries.values()]
+        field_cutting_dates = [summary["CuttingDate"] for summary in sensor_summaries.values()
+                               if summary["CuttingDate"] is not None]
+        computed_at = time.time()
+        field_summary = {
+            "FieldName": field.Name,
+            "CurrentGDD": sum(gdd_values) / len(gdd_values),
+            "OptimalCuttingDate": min(field_cutting_dates) if field_cutting_dates else None,
+            "SensorSerials": json.dumps(sorted(sensor_summaries)),
+            "ComputedAt": computed_at,
+        }
+        self.table_service.upsert_dashboard_summary(
+            field.FieldId, field_summary, sensor_summaries)
+
+        with self._lock:
+            self._written_at[field.FieldId] = computed_at
+            self._stats["fields_written"] += 1
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
@@ -0,0 +1,123 @@
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Iterable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DirtyEntry:
+    # Why the sensor needs a recompute: "new", "reading", "forecast", "reset",
+    # "retry" (its cutting date could not be saved) or "rebalance" (taken over
+    # from another replica, so rebuilt from all rows)
+    reasons: Set[str] = field(default_factory=set)
+    # Days with new readings, still to be aggregated into gdddata
+    reading_days: Set[str] = field(default_factory=set)
+    # Forecast days whose aggregates changed
+    forecast_days: Set[str] = field(default_factory=set)
+
+    def merge(self, other: "DirtyEntry"):
+        self.reasons |= other.reasons
+        self.reading_days |= other.reading_days
+        self.forecast_days |= other.forecast_days
+
+
+class DirtyTracker:
+    """
+    Records which sensors (and which of their days) changed since they were
+    last recomputed, so the forecast cycle only recomputes those.
+
+    Sensors are marked dirty by stored MQTT readings, changed forecasts, and
+    changes to their reset date or OptimalGDD. A sensor the process has not
+    seen before is dirty as well, since its stored state is unknown.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        # Sensor serial -> settings the last recompute used
+        self._settings = {}
+        self._cycle = {"dirty_at_start": 0, "processed": 0, "skipped": 0}
+        self._totals = {"processed": 0, "skipped": 0, "new": 0,
+                        "reading": 0, "forecast": 0, "reset": 0, "retry": 0,
+                        "rebalance": 0}
+
+    def mark(self, sensor_serial_number: str, reason: str, days: Iterable[str] = ()):
+        with self._lock:
+            entry = self._entries.setdefault(sensor_serial_number, DirtyEntry())
+            entry.reasons.add(reason)
+            if reason == "reading":
+                entry.reading_days.update(days)
+            elif reason == "forecast":
+                entry.forecast_days.update(days)
+            self._totals[reason] += 1
+
+    def observe_settings(self, sensor_serial_number: str, settings) -> bool:
+        """
+        Mark a sensor dirty if it is new or its settings (reset date, optimal
+        GDD) differ from the last recompute. Returns True if it was marked.
+        """
+        with self._lock:
+            seen = sensor_serial_number in self._settings
+            previous = self._settings.get(sensor_serial_number)
+            self._settings[sensor_serial_number] = settings
+        if not seen:
+            self.mark(sensor_serial_number, "new")
+            return True
+        if previous != settings:
+            self.mark(sensor_serial_number, "reset")
+            return True
+        return False
+
+    def needs_rebuild(self, sensor_serial_number: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(sensor_serial_number)
+            return entry is not None and "rebalance" in entry.reasons
+
+    def pop(self, sensor_serial_number: str) -> Optional[DirtyEntry]:
+        """
+        Take a sensor's pending changes, or None if it is clean.
+        """
+        with self._lock:
+            return self._entries.pop(sensor_serial_number, None)
+
+    def restore(self, sensor_serial_number: str, entry: DirtyEntry):
+        """
+        Put back changes whose recompute failed, so the next cycle retries.
+        """
+        with self._lock:
+            self._entries.setdefault(
+                sensor_serial_number, DirtyEntry()).merge(entry)
+
+    def forget(self, sensor_serial_number: str):
+        """
+        Drop everything known about a sensor, so it is treated as new.
+        """
+        with self._lock:
+            self._entries.pop(sensor_serial_number, None)
+            self._settings.pop(sensor_serial_number, None)
+
+    def begin_cycle(self):
+        with self._lock:
+            self._cycle = {"dirty_at_start": len(self._entries),
+                           "processed": 0, "skipped": 0}
+
+    def record_processed(self):
+        self._count("processed")
+
+    def record_skipped(self):
+        self._count("skipped")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "dirty_now": len(self._entries),
+                "cycle": dict(self._cycle),
+                "totals": dict(self._totals),
+            }
+
+    def _count(self, name: str):
+        with self._lock:
+            self._cycle[name] += 1
+            self._totals[name] += 1
@@ -0,0 +1,84 @@
+import json
+import logging
+import os
+import re
+import threading
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedForecast:
+    body: dict
+    payload_hash: str
+    # Epoch seconds after which the forecast must be revalidated
+    expires: float = 0.0
+    last_modified: Optional[str] = None
+
+
+class ForecastCache:
+    """
+    Forecast responses keyed by location, kept in memory and mirrored to one
+    JSON file per location in `cache_dir`, so a restart keeps the upstream
+    expiry times instead of refetching every location at once.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self._entries = {}
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, key: str) -> Optional[CachedForecast]:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            return entry
+
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as cache_file:
+                entry = CachedForecast(**json.load(cache_file))
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable forecast cache file {path}: {e}")
+            return None
+
+        with self._lock:
+            self._entries[key] = entry
+        return entry
+
+    def put(self, key: str, entry: CachedForecast):
+        with self._lock:
+            self._entries[key] = entry
+
+        # Write to a temporary file first so a crash never leaves a torn entry;
+        # the name is unique since sharded replicas may share the cache volume
+        path = self._path(key)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as cache_file:
+                json.dump(asdict(entry), cache_file)
+            os.replace(temp_path, path)
+        except Exception as e:
+            logger.warning(f"Could not persist forecast cache entry {key}: {e}")
+
+    def invalidate(self, key: str):
+        """
+        Drop an entry, e.g. when storing its forecast failed, so the next
+        fetch downloads it again and reports it as changed.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _path(self, key: str) -> str:
+        safe_key = re.sub(r"[^A-Za-z0-9_.-]", "_", key)
+        return os.path.join(self.cache_dir, f"{safe_key}.json")
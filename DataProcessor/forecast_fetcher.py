@@ -0,0 +1,175 @@
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Iterable, Iterator, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from forecast_cache import CachedForecast, ForecastCache
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "gdd/1.0 (user@gdd.com)"
+
+
+def snap_to_grid(lat: float, lon: float, precision: int = 4) -> Tuple[str, float, float]:
+    """
+    Snap coordinates to a grid of `precision` decimals (met.no accepts at most
+    4). Returns the cell key used as the forecast PartitionKey, and the
+    snapped latitude and longitude to request.
+    """
+    snapped_lat = round(lat, precision)
+    snapped_lon = round(lon, precision)
+    cell_key = f"cell_{snapped_lat:.{precision}f}_{snapped_lon:.{precision}f}"
+    return cell_key, snapped_lat, snapped_lon
+
+
+@dataclass
+class ForecastResult:
+    key: Any
+    lat: float
+    lon: float
+    data: Optional[dict] = None
+    error: Optional[Exception] = None
+    elapsed_sec: float = 0.0
+    # False when the forecast is the same as the one already stored
+    changed: bool = True
+    # "network", "cache" (not yet expired) or "revalidated" (304 or same payload)
+    source: str = "network"
+
+
+class ForecastFetcher:
+    """
+    Fetches met.no `/compact` forecasts concurrently over a pooled keep-alive
+    session. At most `concurrency` requests are in flight, and each request is
+    bounded by `timeout_sec`, so one slow response cannot stall a whole cycle.
+
+    With a `cache`, responses are served from it until their `Expires` time and
+    then revalidated with `If-Modified-Since`; a 304 or an identical payload is
+    reported as unchanged. Keys passed to `fetch_all` are then the cache keys.
+    """
+
+    def __init__(self, base_url: str, concurrency: int = 8, timeout_sec: float = 10.0,
+                 cache: Optional[ForecastCache] = None):
+        self.base_url = base_url
+        self.concurrency = max(1, concurrency)
+        self.timeout_sec = timeout_sec
+        self.cache = cache
+
+        self._stats_lock = threading.Lock()
+        self._stats = {"network": 0, "cache": 0,
+                       "revalidated": 0, "changed": 0, "errors": 0}
+
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": USER_AGENT})
+        adapter = HTTPAdapter(pool_connections=1,
+                              pool_maxsize=self.concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="forecast-fetch")
+
+    def fetch(self, lat: float, lon: float) -> dict:
+        """
+        Fetch one forecast and return the decoded JSON body.
+        """
+        response = self._get(lat, lon)
+        response.raise_for_status()
+        return response.json()
+
+    def fetch_cached(self, key: str, lat: float, lon: float, result: ForecastResult):
+        """
+        Fill `result` from the cache, revalidating with met.no when expired.
+        """
+        entry = self.cache.get(key)
+        if entry is not None and time.time() < entry.expires:
+            result.data, result.changed, result.source = entry.body, False, "cache"
+            return
+
+        headers = {}
+        if entry is not None and entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        response = self._get(lat, lon, headers)
+
+        if response.status_code == 304 and entry is not None:
+            entry.expires = self._expires(response)
+            entry.last_modified = response.headers.get(
+                "Last-Modified", entry.last_modified)
+            self.cache.put(key, entry)
+            result.data, result.changed, result.source = entry.body, False, "revalidated"
+            return
+
+        response.raise_for_status()
+        payload_hash = hashlib.sha256(response.content).hexdigest()
+        body = response.json()
+        self.cache.put(key, CachedForecast(
+            body=body,
+            payload_hash=payload_hash,
+            expires=self._expires(response),
+            last_modified=response.headers.get("Last-Modified"),
+        ))
+
+        if entry is not None and entry.payload_hash == payload_hash:
+            result.data, result.changed, result.source = body, False, "revalidated"
+        else:
+            result.data, result.changed, result.source = body, True, "network"
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def fetch_all(self, locations: Iterable[Tuple[Any, float, float]]) -> Iterator[ForecastResult]:
+        """
+        Fetch forecasts for `(key, lat, lon)` tuples and yield a ForecastResult
+        for each one as soon as it completes, in completion order.
+        """
+        futures = {
+            self.executor.submit(self._fetch_timed, key, lat, lon): key
+            for key, lat, lon in locations
+        }
+        for future in as_completed(futures):
+            yield future.result()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
+    def _fetch_timed(self, key, lat: float, lon: float) -> ForecastResult:
+        result = ForecastResult(key=key, lat=lat, lon=lon)
+        started = time.perf_counter()
+        try:
+            if self.cache is not None:
+                self.fetch_cached(key, lat, lon, result)
+            else:
+                result.data = self.fetch(lat, lon)
+        except Exception as e:
+            result.error = e
+        result.elapsed_sec = time.perf_counter() - started
+
+        with self._stats_lock:
+            if result.error is not None:
+                self._stats["errors"] += 1
+            else:
+                self._stats[result.source] += 1
+                if result.changed:
+                    self._stats["changed"] += 1
+        return result
+
+    def _get(self, lat: float, lon: float, headers: Optional[dict] = None) -> requests.Response:
+        url = f"{self.base_url}/compact"
+        return self.session.get(
+            url, params={"lat": lat, "lon": lon}, headers=headers, timeout=self.timeout_sec)
+
+    @staticmethod
+    def _expires(response: requests.Response) -> float:
+        # Without a usable Expires header the next cycle revalidates
+        try:
+            return parsedate_to_datetime(response.headers["Expires"]).timestamp()
+        except (KeyError, TypeError, ValueError):
+            return 0.0
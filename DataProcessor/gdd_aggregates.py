@@ -0,0 +1,160 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+
+class DailyGddAggregator:
+    """
+    Keeps the per-sensor, per-day aggregates in gdddata (sum, count and mean
+    for actual and forecast temperatures) up to date incrementally, writing
+    only the days that changed.
+
+    - Actual: the days with stored readings (tracked by the DirtyTracker) are
+      re-aggregated from their own rows on the next update.
+      Readings are upserts keyed by hour, so re-sent hours replace rather than
+      add to a day, which a blind running sum would double count.
+    - Forecast: daily aggregates are computed from the cell's forecast in
+      memory (or read back from its stored rows when another replica fetches
+      the cell) and compared with what was last written for each sensor.
+
+    `add_gdd_actual` / `add_gdd_forecast` on AzureTableService remain the
+    rebuild-from-scratch path for repair.
+    """
+
+    def __init__(self, table_service):
+        self.table_service = table_service
+        self._lock = threading.Lock()
+        # Sensor serial -> {date: (sum, count)} last written as forecast
+        self._written_forecast_days = {}
+        # Grid cell -> {date: (sum, count)} of its current forecast
+        self._cell_forecast_days = {}
+        # Sensor serial -> earliest day whose cumulative GDD index is out of date
+        self._index_stale_from = {}
+
+        self._stats = {"actual_days_written": 0,
+                       "forecast_days_written": 0, "forecast_days_unchanged": 0}
+
+    def update_actual(self, sensor_serial_number: str, dates: Iterable[str]) -> List[str]:
+        """
+        Re-aggregate and write the given actual days of one sensor.
+        Returns the dates written.
+        """
+        dates = set(dates)
+        if not dates:
+            return []
+
+        aggregates = self.table_service.get_daily_aggregates(
+            sensor_serial_number, "temperature_actual", min(dates), max(dates))
+        changed = {date: aggregates[date]
+                   for date in dates if date in aggregates}
+        self.table_service.upsert_gdd_days(
+            sensor_serial_number, "Actual", changed)
+
+        self._count("actual_days_written", len(changed))
+        self._mark_index_stale(sensor_serial_number, changed)
+        return list(changed)
+
+    def cell_forecast_days(self, cell_key: str, forecast_data: Iterable[dict], changed: bool = True) -> Dict[str, tuple]:
+        """
+        Daily forecast aggregates for a grid cell, once its forecast is stored.
+        Later days are fully covered by the forecast itself; the first day is
+        usually partial (its earlier hours were stored by previous cycles), so
+        that day is re-aggregated from the stored rows.
+        """
+        with self._lock:
+            cached = self._cell_forecast_days.get(cell_key)
+        if cached is not None and not changed:
+            return cached
+
+        days = self.table_service.aggregate_daily(
+            forecast_data, "air_temperature")
+        if days:
+            first_day = min(days)
+            days.update(self.table_service.get_daily_aggregates(
+                cell_key, "air_temperature", first_day, first_day))
+
+        with self._lock:
+            self._cell_forecast_days[cell_key] = days
+        return days
+
+    def stored_cell_forecast_days(self, cell_key: str, days: int = 14) -> Dict[str, tuple]:
+        """
+        Daily forecast aggregates of a grid cell from today on, read back from
+        its stored rows. For cells whose forecast another replica fetches.
+        """
+        today = datetime.now().date()
+        return self.table_service.get_daily_aggregates(
+            cell_key, "air_temperature", today.isoformat(), (today + timedelta(days=days)).isoformat())
+
+    def update_forecast(self, sensor_serial_number: str, forecast_days: Dict[str, tuple]) -> List[str]:
+        """
+        Write the forecast days of one sensor that differ from the last write.
+        Returns the dates written.
+        """
+        with self._lock:
+            previous = self._written_forecast_days.get(
+                sensor_serial_number, {})
+        changed = {date: aggregate for date, aggregate in forecast_days.items()
+                   if previous.get(date) != aggregate}
+
+        self.table_service.upsert_gdd_days(
+            sensor_serial_number, "Forecast", changed)
+
+        with self._lock:
+            self._written_forecast_days[sensor_serial_number] = {
+                **previous, **changed}
+        self._mark_index_stale(sensor_serial_number, changed)
+        self._count("forecast_days_written", len(changed))
+        self._count("forecast_days_unchanged",
+                    len(forecast_days) - len(changed))
+        return list(changed)
+
+    def sync_cumulative_index(self, sensor_serial_number: str) -> bool:
+        """
+        Rewrite the sensor's cumulative GDD index from its earliest changed
+        day on. The day stays marked if the update fails.
+        """
+        with self._lock:
+            from_date = self._index_stale_from.pop(sensor_serial_number, None)
+        if from_date is None:
+            return False
+
+        try:
+            self.table_service.update_cumulative_gdd(
+                sensor_serial_number, from_date)
+        except Exception:
+            self._mark_index_stale(sensor_serial_number, [from_date])
+            raise
+        return True
+
+    def rebuild(self, sensor_serial_number: str):
+        """
+        Recompute every day of one sensor from all of its rows.
+        """
+        with self._lock:
+            self._written_forecast_days.pop(sensor_serial_number, None)
+            self._index_stale_from.pop(sensor_serial_number, None)
+        self.table_service.add_gdd_forecast(sensor_serial_number)
+        self.table_service.add_gdd_actual(sensor_serial_number)
+        self.table_service.rebuild_cumulative_gdd(sensor_serial_number)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+    def _mark_index_stale(self, sensor_serial_number: str, dates: Iterable[str]):
+        dates = list(dates)
+        if not dates:
+            return
+        with self._lock:
+            current = self._index_stale_from.get(sensor_serial_number)
+            earliest = min(dates)
+            if current is None or earliest < current:
+                self._index_stale_from[sensor_serial_number] = earliest
+
+    def _count(self, name: str, amount: int):
+        with self._lock:
+            self._stats[name] += amount
@@ -0,0 +1,249 @@
+import base64
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+BACKPRESSURE_POLICIES = ("block", "drop_oldest", "spill")
+
+
+class StageTimer:
+    """
+    Thread-safe count/total/max accumulator for one pipeline stage.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_sec = 0.0
+        self.max_sec = 0.0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.count += 1
+            self.total_sec += seconds
+            self.max_sec = max(self.max_sec, seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "count": self.count,
+                "avg_sec": self.total_sec / self.count if self.count else 0.0,
+                "max_sec": self.max_sec,
+            }
+
+
+class IngestPipeline:
+    """
+    Bounded in-process queue between the MQTT network thread and a pool of
+    storage workers, so a slow storage call never stalls the broker connection.
+
+    `submit` is called from the paho callback and only enqueues. When the queue
+    is full the configured backpressure policy applies:
+
+    - block: wait for room (up to `block_timeout_sec`, then drop); keep it
+      well below the MQTT keepalive, as the network thread is the one waiting
+    - drop_oldest: evict the oldest queued message to make room
+    - spill: append the message to a file in `spill_dir`; spilled messages are
+      fed back into the queue once it drains, including after a restart
+    """
+
+    def __init__(self, handler, workers: int = 4, max_queue_size: int = 10000,
+                 policy: str = "block", block_timeout_sec: float = 5.0,
+                 spill_dir: str = "/tmp/ingest-spill"):
+        if policy not in BACKPRESSURE_POLICIES:
+            raise ValueError(
+                f"Unknown backpressure policy '{policy}', expected one of {BACKPRESSURE_POLICIES}")
+
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.policy = policy
+        self.block_timeout_sec = block_timeout_sec
+        self.spill_dir = spill_dir
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._threads = []
+        self._stop_event = threading.Event()
+        self._spill_lock = threading.Lock()
+
+        self._counters_lock = threading.Lock()
+        self._counters = {
+            "enqueued": 0,
+            "processed": 0,
+            "failed": 0,
+            "dropped": 0,
+            "spilled": 0,
+            "unspilled": 0,
+            "max_queue_depth": 0,
+        }
+        self._queue_wait = StageTimer()
+        self._handle_time = StageTimer()
+
+    # Intake (MQTT network thread)
+
+    def submit(self, topic: str, payload: bytes) -> bool:
+        """
+        Enqueue one message. Returns False if it was dropped.
+        """
+        item = (time.perf_counter(), topic, payload)
+
+        if self.policy == "block":
+            try:
+                self._queue.put(item, timeout=self.block_timeout_sec)
+            except queue.Full:
+                self._count("dropped")
+                logger.warning(
+                    f"Ingest queue full for {self.block_timeout_sec}s, dropped message from {topic}")
+                return False
+
+        elif self.policy == "drop_oldest":
+            while True:
+                try:
+                    self._queue.put_nowait(item)
+                    break
+                except queue.Full:
+                    try:
+                        self._queue.get_nowait()
+                        self._queue.task_done()
+                        self._count("dropped")
+                    except queue.Empty:
+                        pass
+
+        else:
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                self._spill(topic, payload)
+                return True
+
+        self._count("enqueued")
+        depth = self._queue.qsize()
+        with self._counters_lock:
+            self._counters["max_queue_depth"] = max(
+                self._counters["max_queue_depth"], depth)
+        return True
+
+    # Lifecycle
+
+    def start(self):
+        """
+        Start the worker pool (and the spill drainer for the spill policy).
+        """
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f"ingest-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        if self.policy == "spill":
+            os.makedirs(self.spill_dir, exist_ok=True)
+            thread = threading.Thread(
+                target=self._drain_spill, name="ingest-spill-drainer", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        logger.info(
+            f"Ingest pipeline started with {self.workers} workers, queue size {self._queue.maxsize}, policy '{self.policy}'")
+
+    def stop(self, drain: bool = True):
+        """
+        Stop the workers. With `drain`, wait until everything queued is handled.
+        Spilled messages stay on disk for the next start.
+        """
+        if drain:
+            self._queue.join()
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        logger.info(f"Ingest pipeline stopped: {self.stats()}")
+
+    def stats(self) -> dict:
+        with self._counters_lock:
+            stats = dict(self._counters)
+        stats["queue_depth"] = self._queue.qsize()
+        stats["queue_capacity"] = self._queue.maxsize
+        stats["queue_wait"] = self._queue_wait.snapshot()
+        stats["handle"] = self._handle_time.snapshot()
+        return stats
+
+    # Workers
+
+    def _work(self):
+        while not self._stop_event.is_set():
+            try:
+                enqueued_at, topic, payload = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            started = time.perf_counter()
+            self._queue_wait.record(started - enqueued_at)
+            try:
+                self.handler(topic, payload)
+                self._count("processed")
+            except Exception as e:
+                self._count("failed")
+                logger.error(f"Error handling message from {topic}: {e}")
+            finally:
+                self._handle_time.record(time.perf_counter() - started)
+                self._queue.task_done()
+
+    # Spill to disk
+
+    def _spill_path(self) -> str:
+        return os.path.join(self.spill_dir, "spill.jsonl")
+
+    def _spill(self, topic: str, payload: bytes):
+        line = json.dumps({
+            "topic": topic,
+            "payload": base64.b64encode(payload).decode("ascii"),
+        })
+        with self._spill_lock:
+            with open(self._spill_path(), "a", encoding="utf-8") as spill_file:
+                spill_file.write(line + "\n")
+        self._count("spilled")
+
+    def _drain_spill(self):
+        draining_path = os.path.join(self.spill_dir, "spill.draining.jsonl")
+        while not self._stop_event.wait(1.0):
+            # Only feed spilled messages back once the queue has room again
+            if self._queue.qsize() > self._queue.maxsize // 2:
+                continue
+
+            with self._spill_lock:
+                if not os.path.exists(draining_path):
+                    if not os.path.exists(self._spill_path()):
+                        continue
+                    os.replace(self._spill_path(), draining_path)
+
+            try:
+                with open(draining_path, encoding="utf-8") as spill_file:
+                    for line in spill_file:
+                        record = json.loads(line)
+                        item = (time.perf_counter(), record["topic"],
+                                base64.b64decode(record["payload"]))
+                        if not self._put_until_stopped(item):
+                            # Leave the file for the next start; upserts make replays harmless
+                            return
+                        self._count("unspilled")
+                os.remove(draining_path)
+            except Exception as e:
+                logger.error(f"Error draining ingest spill file: {e}")
+
+    def _put_until_stopped(self, item) -> bool:
+        # The drainer may block on a full queue; it is not the network thread
+        while not self._stop_event.is_set():
+            try:
+                self._queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _count(self, name: str, amount: int = 1):
+        with self._counters_lock:
+            self._counters[name] += amount
@@ -0,0 +1,270 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from azure_table_service.storage import MAX_TRANSACTION_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class IngestWriter:
+    """
+    Buffers decoded sensor readings and writes them to Azure Table Storage as
+    entity-group transactions, grouped by PartitionKey (the sensor serial).
+
+    A partition is flushed as soon as it holds `batch_size` readings, every
+    buffered partition is flushed every `flush_interval_sec` seconds, and
+    everything left in the buffer is flushed when the writer is closed.
+
+    `on_written(partition_key, entities)` is called after each batch is stored.
+
+    A failed batch is put back and retried on later flushes. After
+    `max_attempts` failures its entities are written one by one and those
+    that still fail are dropped, so one entity the service always rejects
+    cannot hold back its partition. Until then the partition is only written
+    by the timed flushes, not as readings arrive. A partition keeps at most
+    `max_partition_rows` readings waiting for a retry; older ones are dropped.
+    """
+
+    def __init__(self, table_service, table_name: str = "weatherdata",
+                 batch_size: int = MAX_TRANSACTION_SIZE, flush_interval_sec: float = 5.0,
+                 on_written=None, max_attempts: int = 5, max_partition_rows: int = 10000):
+        self.table_service = table_service
+        self.on_written = on_written
+        self.table_name = table_name
+        self.batch_size = max(1, min(batch_size, MAX_TRANSACTION_SIZE))
+        self.flush_interval_sec = flush_interval_sec
+        self.max_attempts = max(1, max_attempts)
+        self.max_partition_rows = max(self.batch_size, max_partition_rows)
+
+        # PartitionKey -> OrderedDict(RowKey -> entity); a re-sent reading replaces the buffered one
+        self._buffer = {}
+        # (PartitionKey, RowKey) -> failed writes of the buffered entity
+        self._attempts = {}
+        # Partitions with a failed batch wait for the next timed flush
+        self._retrying = set()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._closed = False
+
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "entities_buffered": 0,
+            "entities_written": 0,
+            "batches_written": 0,
+            "batches_failed": 0,
+            "entities_dropped": 0,
+            "last_batch_size": 0,
+            "max_batch_size": 0,
+            "total_flush_latency_sec": 0.0,
+            "max_flush_latency_sec": 0.0,
+        }
+
+    def start(self):
+        """
+        Start the background thread that flushes the buffer on a timer.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="ingest-writer", daemon=True)
+            self._thread.start()
+
+    def add(self, entity: dict):
+        """
+        Buffer one entity. Flushes its partition when it reaches the batch size.
+        """
+        partition_key = entity["PartitionKey"]
+        ready = None
+        dropped = 0
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("IngestWriter is closed")
+            rows = self._buffer.setdefault(partition_key, OrderedDict())
+            rows[entity["RowKey"]] = entity
+            # A new reading starts with no failed attempts
+            self._attempts.pop((partition_key, entity["RowKey"]), None)
+            if partition_key in self._retrying:
+                dropped = self._trim(partition_key, rows)
+            elif len(rows) >= self.batch_size:
+                ready = self._buffer.pop(partition_key)
+
+        with self._stats_lock:
+            self._stats["entities_buffered"] += 1
+        self._log_trimmed(partition_key, dropped)
+
+        if ready:
+            self._write_partition(partition_key, ready)
+
+    def flush(self):
+        """
+        Write every buffered partition.
+        """
+        with self._lock:
+            pending, self._buffer = self._buffer, {}
+            self._retrying.clear()
+
+        for partition_key, rows in pending.items():
+            self._write_partition(partition_key, rows)
+
+    def close(self):
+        """
+        Stop the flush timer and write whatever is still buffered. Readings
+        whose last write failed are discarded.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+        with self._lock:
+            discarded, self._buffer = self._buffer, {}
+            self._attempts.clear()
+            self._retrying.clear()
+        count = sum(len(rows) for rows in discarded.values())
+        if count:
+            self._count_dropped(count)
+            logger.error(
+                f"Discarded {count} unwritten entities in {len(discarded)} partitions at close")
+        logger.info(f"Ingest writer closed: {self.stats()}")
+
+    def buffered_count(self) -> int:
+        with self._lock:
+            return sum(len(rows) for rows in self._buffer.values())
+
+    def stats(self) -> dict:
+        """
+        Snapshot of the writer counters, including derived averages.
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        batches = stats["batches_written"]
+        stats["avg_batch_size"] = stats["entities_written"] / \
+            batches if batches else 0.0
+        stats["avg_flush_latency_sec"] = stats["total_flush_latency_sec"] / \
+            batches if batches else 0.0
+        stats["entities_pending"] = self.buffered_count()
+        return stats
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval_sec):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error in ingest writer flush: {e}")
+
+    def _write_partition(self, partition_key: str, rows: OrderedDict):
+        entities = list(rows.values())
+        for start in range(0, len(entities), self.batch_size):
+            chunk = entities[start:start + self.batch_size]
+            started = time.perf_counter()
+            try:
+                self.table_service.upsert_entities_batch(
+                    self.table_name, chunk)
+            except Exception as e:
+                logger.error(
+                    f"Failed to write batch of {len(chunk)} entities for partition {partition_key}: {e}")
+                with self._stats_lock:
+                    self._stats["batches_failed"] += 1
+                if self._record_failure(partition_key, chunk) < self.max_attempts:
+                    # Put the unwritten readings back so the next flush retries them
+                    self._requeue(partition_key, entities[start:])
+                    return
+                chunk = self._write_each(partition_key, chunk)
+                if not chunk:
+                    continue
+
+            latency = time.perf_counter() - started
+            with self._stats_lock:
+                self._stats["entities_written"] += len(chunk)
+                self._stats["batches_written"] += 1
+                self._stats["last_batch_size"] = len(chunk)
+                self._stats["max_batch_size"] = max(
+                    self._stats["max_batch_size"], len(chunk))
+                self._stats["total_flush_latency_sec"] += latency
+                self._stats["max_flush_latency_sec"] = max(
+                    self._stats["max_flush_latency_sec"], latency)
+
+            logger.debug(
+                f"Wrote batch of {len(chunk)} entities for partition {partition_key} in {latency:.3f}s")
+
+            if self.on_written is not None:
+                try:
+                    self.on_written(partition_key, chunk)
+                except Exception as e:
+                    logger.error(
+                        f"Error in on_written callback for partition {partition_key}: {e}")
+
+    def _record_failure(self, partition_key: str, chunk: list) -> int:
+        """
+        Count a failed write of `chunk`. Returns the attempts so far.
+        """
+        with self._lock:
+            attempts = 0
+            for entity in chunk:
+                key = (partition_key, entity["RowKey"])
+                self._attempts[key] = self._attempts.get(key, 0) + 1
+                attempts = max(attempts, self._attempts[key])
+            return attempts
+
+    def _write_each(self, partition_key: str, chunk: list) -> list:
+        """
+        Write the entities of a batch that kept failing one at a time, to
+        find the ones the service rejects. Returns those written.
+        """
+        written = []
+        for entity in chunk:
+            try:
+                self.table_service.upsert_entities_batch(
+                    self.table_name, [entity])
+                written.append(entity)
+            except Exception as e:
+                logger.error(
+                    f"Dropping entity {entity['RowKey']} of partition {partition_key} after "
+                    f"{self.max_attempts} failed attempts: {e}")
+                self._count_dropped(1)
+        with self._lock:
+            for entity in chunk:
+                self._attempts.pop((partition_key, entity["RowKey"]), None)
+        return written
+
+    def _requeue(self, partition_key: str, entities: list):
+        with self._lock:
+            self._retrying.add(partition_key)
+            rows = self._buffer.setdefault(partition_key, OrderedDict())
+            # Retried readings go before those buffered since the failed flush
+            for entity in reversed(entities):
+                if entity["RowKey"] in rows:
+                    # The buffered reading is newer; keep it and its own attempts
+                    self._attempts.pop((partition_key, entity["RowKey"]), None)
+                else:
+                    rows[entity["RowKey"]] = entity
+                    rows.move_to_end(entity["RowKey"], last=False)
+            dropped = self._trim(partition_key, rows)
+        self._log_trimmed(partition_key, dropped)
+
+    def _trim(self, partition_key: str, rows: OrderedDict) -> int:
+        # Keep the newest readings if the partition keeps failing (called with the lock held)
+        dropped = 0
+        while len(rows) > self.max_partition_rows:
+            row_key, _ = rows.popitem(last=False)
+            self._attempts.pop((partition_key, row_key), None)
+            dropped += 1
+        return dropped
+
+    def _log_trimmed(self, partition_key: str, dropped: int):
+        if dropped:
+            self._count_dropped(dropped)
+            logger.error(
+                f"Dropped {dropped} oldest entities of partition {partition_key}: "
+                f"more than {self.max_partition_rows} waiting for a retry")
+
+    def _count_dropped(self, count: int):
+        with self._stats_lock:
+            self._stats["entities_dropped"] += count
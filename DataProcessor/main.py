@@ -1,12 +1,24 @@
 import os
+import sys
+import socket
+import signal
 import logging
 import time
 from datetime import datetime
 import threading
-import requests
+from concurrent.futures import ThreadPoolExecutor, wait
 import paho.mqtt.client as mqtt
 from azure_table_service import AzureTableService
 from mysql_service.service import MySQLService
+from ingest_writer import IngestWriter
+from ingest_pipeline import IngestPipeline
+from forecast_fetcher import ForecastFetcher, snap_to_grid
+from forecast_cache import ForecastCache
+from gdd_aggregates import DailyGddAggregator
+from dirty_tracker import DirtyTracker
+from sharding import ShardCoordinator
+from dashboard_summary import DashboardSummaryWriter
+from cold_compaction import ColdCompactor
 
 # Environment Variables
 MQTT_BROKER = os.getenv("MQTT_BROKER", "mosquitto")
@@ -15,10 +27,70 @@ MQTT_PREFIX = os.getenv("MQTT_TOPIC_PREFIX", "farms")
 BASE_WEATHER_API_URL = os.getenv(
     "BASE_WEATHER_API_URL", "https://api.met.no/weatherapi/locationforecast/2.0")
 GET_FORECAST_INTERVAL_SEC = int(os.getenv("GET_FORECAST_INTERVAL_SEC", 60))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 100))
+INGEST_FLUSH_INTERVAL_SEC = float(os.getenv("INGEST_FLUSH_INTERVAL_SEC", 5))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 4))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", 10000))
+INGEST_BACKPRESSURE = os.getenv("INGEST_BACKPRESSURE", "block")
+# With the block policy, drop a message after waiting this long for room
+# (below the 60 s MQTT keepalive, so the broker connection stays up)
+INGEST_BLOCK_TIMEOUT_SEC = float(os.getenv("INGEST_BLOCK_TIMEOUT_SEC", 5))
+INGEST_SPILL_DIR = os.getenv("INGEST_SPILL_DIR", "/tmp/ingest-spill")
+FORECAST_FETCH_CONCURRENCY = int(os.getenv("FORECAST_FETCH_CONCURRENCY", 8))
+FORECAST_FETCH_TIMEOUT_SEC = float(os.getenv("FORECAST_FETCH_TIMEOUT_SEC", 10))
+FORECAST_STORE_WORKERS = int(os.getenv("FORECAST_STORE_WORKERS", 4))
+GDD_COMPUTE_WORKERS = int(os.getenv("GDD_COMPUTE_WORKERS", 4))
+FORECAST_GRID_PRECISION = int(os.getenv("FORECAST_GRID_PRECISION", 4))
+FORECAST_CACHE_DIR = os.getenv("FORECAST_CACHE_DIR", "/tmp/forecast-cache")
+# When to rebuild GDD days from all rows: "startup" (first cycle only), "always" or "never"
+GDD_REBUILD_MODE = os.getenv("GDD_REBUILD_MODE", "startup")
+# Rewrite dashboard summaries of unchanged fields this often (the API ignores
+# summaries older than DASHBOARD_SUMMARY_MAX_AGE_SEC)
+DASHBOARD_SUMMARY_REFRESH_SEC = float(
+    os.getenv("DASHBOARD_SUMMARY_REFRESH_SEC", 300))
+# Sharded mode: replicas with the same SHARD_GROUP split ingest and forecast work
+SHARD_GROUP = os.getenv("SHARD_GROUP", "")
+PROCESSOR_ID = os.getenv("PROCESSOR_ID", socket.gethostname())
+SHARD_HEARTBEAT_INTERVAL_SEC = float(
+    os.getenv("SHARD_HEARTBEAT_INTERVAL_SEC", 10))
+SHARD_MEMBER_TTL_SEC = float(os.getenv("SHARD_MEMBER_TTL_SEC", 30))
+# Move closed months of weatherdata to cold storage this often (0 disables),
+# once they ended at least COLD_COMPACTION_MIN_AGE_DAYS ago
+COLD_COMPACTION_INTERVAL_SEC = float(
+    os.getenv("COLD_COMPACTION_INTERVAL_SEC", 86400))
+COLD_COMPACTION_MIN_AGE_DAYS = int(os.getenv("COLD_COMPACTION_MIN_AGE_DAYS", 7))
 
 # Initialize services
 table_service = AzureTableService()
 mysql_service = MySQLService()
+gdd_aggregator = DailyGddAggregator(table_service)
+dirty_tracker = DirtyTracker()
+summary_writer = DashboardSummaryWriter(
+    table_service, refresh_interval_sec=DASHBOARD_SUMMARY_REFRESH_SEC)
+cold_compactor = ColdCompactor(
+    table_service,
+    interval_sec=COLD_COMPACTION_INTERVAL_SEC,
+    min_age_days=COLD_COMPACTION_MIN_AGE_DAYS,
+)
+ingest_writer = IngestWriter(
+    table_service,
+    table_name="weatherdata",
+    batch_size=INGEST_BATCH_SIZE,
+    flush_interval_sec=INGEST_FLUSH_INTERVAL_SEC,
+    on_written=lambda partition_key, entities: on_readings_written(
+        partition_key, entities),
+)
+forecast_cache = ForecastCache(FORECAST_CACHE_DIR)
+forecast_fetcher = ForecastFetcher(
+    BASE_WEATHER_API_URL,
+    concurrency=FORECAST_FETCH_CONCURRENCY,
+    timeout_sec=FORECAST_FETCH_TIMEOUT_SEC,
+    cache=forecast_cache,
+)
+store_executor = ThreadPoolExecutor(
+    max_workers=FORECAST_STORE_WORKERS, thread_name_prefix="forecast-store")
+compute_executor = ThreadPoolExecutor(
+    max_workers=GDD_COMPUTE_WORKERS, thread_name_prefix="gdd-compute")
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -30,18 +102,45 @@ logger = logging.getLogger(__name__)
 def on_connect(client, userdata, flags, rc):
     if rc == 0:
         logger.info("Connected to MQTT broker")
-        client.subscribe(f"{MQTT_PREFIX}/#")
-        logger.info(f"Subscribed to topics with prefix {MQTT_PREFIX}")
+        if shard is not None:
+            # Shared subscription: the broker delivers each reading to one replica
+            client.subscribe(f"$share/{SHARD_GROUP}/{MQTT_PREFIX}/#")
+            shard.subscribe(client)
+            logger.info(
+                f"Subscribed to topics with prefix {MQTT_PREFIX} as {PROCESSOR_ID} in shard group {SHARD_GROUP}")
+        else:
+            client.subscribe(f"{MQTT_PREFIX}/#")
+            logger.info(f"Subscribed to topics with prefix {MQTT_PREFIX}")
     else:
         logger.error(f"Failed to connect, return code {rc}")
 
 
 def on_message(client, userdata, msg):
-    logger.info(f"Received message from topic {msg.topic}")
+    if shard is not None and shard.handles(msg.topic):
+        shard.handle_message(msg.topic, msg.payload)
+        return
+    # Runs on the paho network thread: only hand the message to the pipeline
+    ingest_pipeline.submit(msg.topic, msg.payload)
+
+
+def on_readings_written(partition_key, entities):
+    """
+    Mark a sensor dirty for the days of its stored readings. In sharded mode
+    the owning replica may be another one, so the change is broadcast too.
+    """
+    days = {entity["RowKey"].split(" ")[0] for entity in entities}
+    if shard is None or shard.owns_sensor(partition_key):
+        dirty_tracker.mark(partition_key, "reading", days)
+    if shard is not None:
+        shard.publish_dirty(partition_key, days)
+
+
+def process_message(topic, payload):
+    logger.info(f"Received message from topic {topic}")
 
     try:
         # Decode the MQTT message payload
-        message_body = msg.payload.decode("utf-8")
+        message_body = payload.decode("utf-8")
         logger.info(f"Raw message body: {message_body}")
 
         # Split the CSV data
@@ -55,14 +154,6 @@ def on_message(client, userdata, msg):
         }
         logger.info(f"Decoded sensor data: {sensor_data}")
 
-        # Use AzureTableService to store the data
-        table_service = AzureTableService()
-
-        table_name = "weatherdata"
-
-        # Ensure the table exists
-        table_service.create_table_if_not_exists(table_name)
-
         # Prepare the entity with sensor data fields
         entity = {
             "PartitionKey": sensor_data['sensor_serial'],
@@ -70,10 +161,10 @@ def on_message(client, userdata, msg):
             "temperature_actual": sensor_data["temperature_actual"],
         }
 
-        # Store the entity in the table
-        table_service.store_entity(table_name, entity)
+        # Buffer the entity; the writer stores it in a batched transaction
+        ingest_writer.add(entity)
         logger.info(
-            f"Stored entity for sensor_serial {sensor_data['sensor_serial']}")
+            f"Buffered entity for sensor_serial {sensor_data['sensor_serial']}")
 
     except ValueError as e:
         logger.error(f"Failed to parse CSV data: {e}")
@@ -81,100 +172,324 @@ def on_message(client, userdata, msg):
         logger.error(f"Error processing MQTT message: {e}")
 
 
+# Storage workers between the MQTT callback and the ingest writer
+ingest_pipeline = IngestPipeline(
+    process_message,
+    workers=INGEST_WORKERS,
+    max_queue_size=INGEST_QUEUE_SIZE,
+    policy=INGEST_BACKPRESSURE,
+    block_timeout_sec=INGEST_BLOCK_TIMEOUT_SEC,
+    spill_dir=INGEST_SPILL_DIR,
+)
+
 # MQTT Client setup
 client = mqtt.Client()
 client.on_connect = on_connect
 client.on_message = on_message
 
+shard = ShardCoordinator(
+    client,
+    SHARD_GROUP,
+    PROCESSOR_ID,
+    heartbeat_interval_sec=SHARD_HEARTBEAT_INTERVAL_SEC,
+    member_ttl_sec=SHARD_MEMBER_TTL_SEC,
+    on_dirty=lambda serial, days: dirty_tracker.mark(serial, "reading", days),
+) if SHARD_GROUP else None
+
 # Scheduled Function (Weather Forecast)
 
 
+def parse_forecast(partition_key, met_api_response):
+    """
+    Turn a met.no response into weatherdata entities under `partition_key`.
+    """
+    forecast_data = []
+    for item in met_api_response["properties"]["timeseries"]:
+        timestamp_str = item["time"].replace('Z', '+00:00')
+        timestamp = datetime.fromisoformat(timestamp_str)
+
+        # Dynamically use all data in `instant/details`
+        instant_details = item["data"]["instant"]["details"]
+
+        # Add PartitionKey and RowKey for Azure Table Storage
+        instant_details["PartitionKey"] = partition_key
+        instant_details["RowKey"] = timestamp.strftime("%Y-%m-%d %H:%M:%S")
+
+        forecast_data.append(instant_details)
+    return forecast_data
+
+
+def store_forecast(cell_key, sensors, met_api_response, reset_dates, changed=True, rebuild=False):
+    """
+    Storage stage: persist one grid cell's forecast once (unless it is
+    unchanged), then hand every sensor in the cell to the compute stage with
+    the cell's daily forecast aggregates. Returns the compute futures.
+    """
+    try:
+        forecast_data = parse_forecast(cell_key, met_api_response)
+
+        # Save the forecast once for all sensors in this cell
+        if not changed:
+            logger.info(
+                f"Forecast for cell {cell_key} unchanged, skipping storage")
+        elif forecast_data:
+            table_service.save_weather_data_list(forecast_data)
+            logger.info(
+                f"Successfully stored {len(forecast_data)} forecast entries for cell {cell_key} ({len(sensors)} sensors)")
+        else:
+            logger.warning(
+                f"No valid forecast data to save for cell {cell_key}.")
+
+        forecast_days = gdd_aggregator.cell_forecast_days(
+            cell_key, forecast_data, changed)
+        return [compute_executor.submit(compute_sensor, sensor, forecast_days, reset_dates.get(sensor.SerialNo), rebuild)
+                for sensor in sensors]
+
+    except KeyError as e:
+        logger.error(
+            f"Error parsing response for cell {cell_key}: missing key {e}")
+    except Exception as e:
+        logger.error(
+            f"Unexpected error storing forecast for cell {cell_key}: {e}")
+
+    # Not stored: make sure the next cycle does not treat this forecast as unchanged
+    forecast_cache.invalidate(cell_key)
+    return []
+
+
+def read_stored_forecast(cell_key, sensors, reset_dates, rebuild=False):
+    """
+    Storage stage for a grid cell another replica owns: that replica fetches
+    and stores its forecast, so read the cell's daily forecast aggregates back
+    and hand the sensors to the compute stage. Returns the compute futures.
+    """
+    try:
+        forecast_days = gdd_aggregator.stored_cell_forecast_days(cell_key)
+    except Exception as e:
+        logger.error(
+            f"Error reading stored forecast for cell {cell_key}: {e}")
+        return []
+    return [compute_executor.submit(compute_sensor, sensor, forecast_days, reset_dates.get(sensor.SerialNo), rebuild)
+            for sensor in sensors]
+
+
+def compute_sensor(sensor, forecast_days, reset_date, rebuild=False):
+    """
+    Compute stage: update the sensor's daily GDD aggregates (only the days that
+    changed, or all of them when rebuilding) and compute its cutting date.
+    Sensors without new readings, forecast changes or reset-date changes are
+    skipped. Returns (serial, cutting date), or None if nothing was computed;
+    the cycle writes all cutting dates to MySQL at once.
+    """
+    sensor_serial_number = sensor.SerialNo
+    entry = None
+    try:
+        dirty_tracker.observe_settings(
+            sensor_serial_number, (reset_date, sensor.OptimalGDD))
+
+        # Sensors taken over from another replica are rebuilt from all rows
+        if rebuild or dirty_tracker.needs_rebuild(sensor_serial_number):
+            entry = dirty_tracker.pop(sensor_serial_number)
+            gdd_aggregator.rebuild(sensor_serial_number)
+        else:
+            # Only the forecast days that differ from the last write are stored
+            changed_days = gdd_aggregator.update_forecast(
+                sensor_serial_number, forecast_days)
+            if changed_days:
+                dirty_tracker.mark(sensor_serial_number,
+                                   "forecast", changed_days)
+
+            entry = dirty_tracker.pop(sensor_serial_number)
+            if entry is None:
+                dirty_tracker.record_skipped()
+                return None
+
+            gdd_aggregator.update_actual(
+                sensor_serial_number, entry.reading_days)
+            gdd_aggregator.sync_cumulative_index(sensor_serial_number)
+
+        # Computation of the CuttingDateCalculated of each sensor
+        calculatedCuttingDate = table_service.calculate_cutting_date(
+            sensor_serial_number, sensor.OptimalGDD, reset_date or datetime.now())
+        dirty_tracker.record_processed()
+        return sensor_serial_number, calculatedCuttingDate
+
+    except Exception as e:
+        logger.error(
+            f"Unexpected error computing GDD for sensor {sensor_serial_number}: {e}")
+        # Keep the sensor dirty so the next cycle retries it
+        if entry is not None:
+            dirty_tracker.restore(sensor_serial_number, entry)
+        return None
+
+
+def run_forecast_cycle(rebuild=False):
+    """
+    One forecast cycle as three stages: concurrent fetches (one per grid
+    cell), then storage and GDD computation on their own pools as each
+    response arrives. With `rebuild`, GDD days are recomputed from all rows.
+    """
+    # Fetch all fields and their sensors from MySQL
+    fields_with_sensors = mysql_service.get_all_fields_with_sensors()
+    logger.info(f"Fetched fields with sensors: {fields_with_sensors}")
+
+    # In sharded mode, only handle the farms this replica owns
+    owned = None
+    if shard is not None:
+        sensors_by_farm = {}
+        for field in fields_with_sensors:
+            sensors_by_farm.setdefault(field.FarmId, []).extend(
+                sensor.SerialNo for sensor in field.sensors)
+        owned, acquired = shard.assign(sensors_by_farm)
+        for serials in sensors_by_farm.values():
+            for serial in serials:
+                if serial in acquired:
+                    dirty_tracker.mark(serial, "rebalance")
+                elif serial not in owned:
+                    # Another replica keeps this sensor up to date
+                    dirty_tracker.forget(serial)
+
+    # Group sensors by forecast grid cell so each cell is fetched once. Every
+    # cell is listed, with only the sensors this replica computes
+    cells = {}
+    for field in fields_with_sensors:
+        for sensor in field.sensors:
+            cell_key, lat, lon = snap_to_grid(
+                sensor.Lat, sensor.Long, FORECAST_GRID_PRECISION)
+            sensors = cells.setdefault(cell_key, (lat, lon, []))[2]
+            if owned is None or sensor.SerialNo in owned:
+                sensors.append(sensor)
+
+    # Farms of one cell can be owned by different replicas: only the cell's
+    # owner fetches, stores and compacts its forecast
+    fetched_cells = {cell_key for cell_key in cells
+                     if shard is None or shard.owns_key(cell_key)}
+    cells = {cell_key: cell for cell_key, cell in cells.items()
+             if cell[2] or cell_key in fetched_cells}
+
+    table_service.set_forecast_cells({
+        sensor.SerialNo: cell_key
+        for cell_key, (_, _, sensors) in cells.items()
+        for sensor in sensors
+    })
+
+    # Readings are stored per sensor and forecasts per grid cell
+    cold_compactor.start_if_due(
+        [sensor.SerialNo for _, _, sensors in cells.values() for sensor in sensors] + sorted(fetched_cells))
+
+    sensor_count = sum(len(sensors) for _, _, sensors in cells.values())
+    started = time.perf_counter()
+
+    # Latest reset date of every sensor in one grouped query
+    reset_dates = mysql_service.get_latest_reset_dates_by_serials(
+        sensor.SerialNo for _, _, sensors in cells.values() for sensor in sensors)
+    dirty_tracker.begin_cycle()
+
+    store_futures = {
+        cell_key: store_executor.submit(
+            read_stored_forecast, cell_key, sensors, reset_dates, rebuild)
+        for cell_key, (_, _, sensors) in cells.items() if cell_key not in fetched_cells
+    }
+    for result in forecast_fetcher.fetch_all((cell_key, lat, lon) for cell_key, (lat, lon, _) in cells.items()
+                                             if cell_key in fetched_cells):
+        cell_key = result.key
+        if result.error is not None:
+            logger.error(
+                f"HTTP request failed for cell {cell_key}: {result.error}")
+            continue
+
+        logger.info(
+            f"Fetched forecast for cell {cell_key} at ({result.lat}, {result.lon}) from {result.source} in {result.elapsed_sec:.2f}s")
+
+        store_futures[cell_key] = store_executor.submit(
+            store_forecast, cell_key, cells[cell_key][2], result.data, reset_dates, result.changed, rebuild)
+
+    # The storage stage returns the compute futures it scheduled
+    compute_futures = []
+    for future in store_futures.values():
+        compute_futures.extend(future.result())
+
+    # Cells without a stored forecast this cycle: still recompute their sensors
+    # for new readings or reset dates, with no forecast changes
+    for cell_key, (_, _, sensors) in cells.items():
+        future = store_futures.get(cell_key)
+        if future is None or not future.result():
+            compute_futures.extend(compute_executor.submit(
+                compute_sensor, sensor, {}, reset_dates.get(sensor.SerialNo), rebuild) for sensor in sensors)
+    wait(compute_futures)
+
+    # Write all computed cutting dates in one transaction
+    cutting_dates = dict(
+        future.result() for future in compute_futures if future.result() is not None)
+    if not mysql_service.update_sensor_cutting_dates(cutting_dates):
+        for sensor_serial_number in cutting_dates:
+            dirty_tracker.mark(sensor_serial_number, "retry")
+
+    # Dashboard read model for the fields this replica handles
+    summaries_written = summary_writer.refresh(
+        [field for field in fields_with_sensors
+         if owned is None or any(sensor.SerialNo in owned for sensor in field.sensors)],
+        set(cutting_dates), reset_dates, cutting_dates, executor=compute_executor)
+
+    cycle = dirty_tracker.stats()["cycle"]
+    logger.info(
+        f"Forecast cycle for {sensor_count} sensors in {len(cells)} grid cells ({len(fetched_cells)} fetched here) finished in {time.perf_counter() - started:.2f}s: "
+        f"{cycle['processed']} recomputed, {cycle['skipped']} clean sensors skipped ({cycle['dirty_at_start']} dirty at start), "
+        f"{summaries_written} dashboard summaries written")
+
+
 def fetch_weather_forecast():
+    first_cycle = True
     while True:
         try:
             logger.info("Executing scheduled weather forecast task...")
-            # Fetch all fields and their sensors from MySQL
-            fields_with_sensors = mysql_service.get_all_fields_with_sensors()
-            logger.info(f"Fetched fields with sensors: {fields_with_sensors}")
-
-            for field in fields_with_sensors:
-                logger.info(
-                    f"Processing field: {field.Name}, Altitude: {field.Altitude}")
-
-                for sensor in field.sensors:
-                    sensor_serial_number = sensor.SerialNo
-                    lat = sensor.Lat
-                    lon = sensor.Long
-
-                    logger.info(
-                        f"Fetching forecast data for sensor {sensor_serial_number} at location ({lat}, {lon})")
-
-                    # Fetch forecast data from Weather API
-                    url = f"{BASE_WEATHER_API_URL}/compact?lat={lat}&lon={lon}"
-                    logger.info(f"Constructed URL: {url}")
-
-                    try:
-                        response = requests.get(
-                            url, headers={"User-Agent": "gdd/1.0 (user@gdd.com)"})
-                        response.raise_for_status()
-                        met_api_response = response.json()
-
-                        forecast_data = []
-                        for item in met_api_response["properties"]["timeseries"]:
-                            timestamp_str = item["time"].replace('Z', '+00:00')
-                            timestamp = datetime.fromisoformat(timestamp_str)
-
-                            # Dynamically use all data in `instant/details`
-                            instant_details = item["data"]["instant"]["details"]
-
-                            # Add PartitionKey and RowKey for Azure Table Storage
-                            instant_details["PartitionKey"] = sensor_serial_number
-                            instant_details["RowKey"] = timestamp.strftime(
-                                "%Y-%m-%d %H:%M:%S")
-
-                            forecast_data.append(instant_details)
-
-                        # Save all forecast data for this sensor
-                        if forecast_data:
-                            table_service.save_weather_data_list(forecast_data)
-                            logger.info(
-                                f"Successfully stored {len(forecast_data)} forecast entries for sensor {sensor_serial_number}")
-                        else:
-                            logger.warning(
-                                f"No valid forecast data to save for sensor {sensor_serial_number}.")
-
-                        # Calculate GDD data and update cutting date in MySQL
-                        table_service.add_gdd_forecast(sensor_serial_number)
-                        table_service.add_gdd_actual(sensor_serial_number)
-
-                        # Computation of the CuttingDateCalculated of each sensor
-                        calculatedCuttingDate = table_service.calculate_cutting_date(
-                            sensor_serial_number, sensor.OptimalGDD, mysql_service.get_latest_sensor_reset_date_by_serial(sensor_serial_number))
-
-                        mysql_service.update_sensor_cutting_date(
-                            sensor_serial_number, calculatedCuttingDate)
-
-                    except requests.RequestException as e:
-                        logger.error(
-                            f"HTTP request failed for sensor {sensor_serial_number}: {e}")
-                    except KeyError as e:
-                        logger.error(
-                            f"Error parsing response for sensor {sensor_serial_number}: missing key {e}")
-                    except Exception as e:
-                        logger.error(
-                            f"Unexpected error for sensor {sensor_serial_number}: {e}")
-
+            rebuild = GDD_REBUILD_MODE == "always" or (
+                GDD_REBUILD_MODE == "startup" and first_cycle)
+            run_forecast_cycle(rebuild)
+            first_cycle = False
+
+            logger.info(f"GDD aggregate stats: {gdd_aggregator.stats()}")
+            logger.info(f"Dirty sensor stats: {dirty_tracker.stats()}")
+            logger.info(f"Dashboard summary stats: {summary_writer.stats()}")
+            logger.info(f"Cold compaction stats: {cold_compactor.stats()}")
+            if shard is not None:
+                logger.info(f"Shard stats: {shard.stats()}")
+            logger.info(f"Forecast fetch stats: {forecast_fetcher.stats()}")
+            logger.info(f"Ingest pipeline stats: {ingest_pipeline.stats()}")
+            logger.info(f"Ingest writer stats: {ingest_writer.stats()}")
             time.sleep(GET_FORECAST_INTERVAL_SEC)
         except Exception as e:
             logger.error(f"Error in weather forecast task: {e}")
 
 
+def shutdown(signum, frame):
+    logger.info(f"Received signal {signum}, shutting down")
+    sys.exit(0)
+
+
 # Main Execution
 if __name__ == "__main__":
+    # Turn `docker stop` into a normal exit so buffered readings get flushed
+    signal.signal(signal.SIGTERM, shutdown)
+    ingest_writer.start()
+    ingest_pipeline.start()
+
     # Start MQTT Client in a separate thread
     threading.Thread(target=client.connect, args=(
         MQTT_BROKER, MQTT_PORT)).start()
     threading.Thread(target=client.loop_forever).start()
+    if shard is not None:
+        shard.start()
+        shard.wait_for_peers()
 
-    # Start scheduled task
-    fetch_weather_forecast()
+    try:
+        # Start scheduled task
+        fetch_weather_forecast()
+    finally:
+        # Stop intake first, drain the queue, then write everything still buffered
+        if shard is not None:
+            shard.stop()
+        client.disconnect()
+        ingest_pipeline.stop(drain=True)
+        ingest_writer.close()
+        forecast_fetcher.close()
@@ -0,0 +1,236 @@
+import bisect
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    """
+    Consistent hash ring over replica IDs. Each member is placed at
+    `vnodes` points so keys spread evenly, and adding or removing a member
+    only moves the keys next to its points.
+    """
+
+    def __init__(self, members: Iterable[str], vnodes: int = 64):
+        self.members = sorted(set(members))
+        self._points = sorted(
+            (_hash(f"{member}#{i}"), member)
+            for member in self.members
+            for i in range(vnodes)
+        )
+        self._hashes = [point for point, _ in self._points]
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self._points:
+            return None
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._points)
+        return self._points[index][1]
+
+
+class ShardCoordinator:
+    """
+    Splits forecast and GDD work between DataProcessor replicas.
+
+    Replicas announce themselves with heartbeats on
+    `processors/<group>/members/<id>`; the broker publishes an empty payload
+    on that topic (last will) when a replica disappears, and members that miss
+    heartbeats for `member_ttl_sec` are dropped. Keys are assigned to replicas
+    with a HashRing over the live members, so the assignment rebalances as
+    replicas join or leave: farm IDs decide which replica computes GDD for a
+    sensor, grid cell keys which one fetches, stores and compacts a forecast.
+
+    Since readings for any sensor can arrive at any replica through the shared
+    subscription, the replica that stores them broadcasts a dirty notice on
+    `processors/<group>/dirty` for the owner to pick up.
+    """
+
+    def __init__(self, client, group: str, member_id: str, heartbeat_interval_sec: float = 10.0,
+                 member_ttl_sec: float = 30.0, vnodes: int = 64, on_dirty=None):
+        self.client = client
+        self.group = group
+        self.member_id = member_id
+        self.heartbeat_interval_sec = heartbeat_interval_sec
+        self.member_ttl_sec = member_ttl_sec
+        self.vnodes = vnodes
+        # on_dirty(sensor_serial_number, days) for notices about owned sensors
+        self.on_dirty = on_dirty
+
+        self.topic_root = f"processors/{group}"
+        self.members_topic = f"{self.topic_root}/members"
+        self.dirty_topic = f"{self.topic_root}/dirty"
+
+        self._lock = threading.Lock()
+        # Member ID -> monotonic time of its last heartbeat
+        self._members = {}
+        self._ring = HashRing([member_id], vnodes)
+        # Sensor serials owned as of the last assignment; None until the first
+        self._owned = None
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._stats = {"rebalances": 0, "dirty_notices_sent": 0,
+                       "dirty_notices_received": 0, "dirty_notices_ignored": 0}
+
+        # Tell the others we left if the connection drops without a goodbye
+        client.will_set(f"{self.members_topic}/{member_id}",
+                        payload="", qos=1)
+
+    def subscribe(self, client):
+        """
+        Subscribe to membership and dirty notices (call from on_connect).
+        """
+        client.subscribe(f"{self.members_topic}/+", qos=1)
+        client.subscribe(self.dirty_topic, qos=1)
+        self._heartbeat()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="shard-heartbeat", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.client.publish(
+            f"{self.members_topic}/{self.member_id}", payload="", qos=1)
+
+    def wait_for_peers(self):
+        """
+        Give running replicas one heartbeat interval to announce themselves,
+        so a starting replica does not claim every farm for its first cycle.
+        """
+        self._stop_event.wait(self.heartbeat_interval_sec)
+
+    def handles(self, topic: str) -> bool:
+        return topic.startswith(f"{self.topic_root}/")
+
+    def handle_message(self, topic: str, payload: bytes):
+        """
+        Process a membership or dirty-notice message (runs on the MQTT thread).
+        """
+        if topic == self.dirty_topic:
+            self._handle_dirty(payload)
+            return
+
+        member_id = topic[len(self.members_topic) + 1:]
+        with self._lock:
+            if payload:
+                joined = member_id not in self._members
+                self._members[member_id] = time.monotonic()
+            else:
+                joined = False
+                left = self._members.pop(member_id, None) is not None
+        if payload and joined:
+            logger.info(f"Processor {member_id} joined group {self.group}")
+        elif not payload and left:
+            logger.info(f"Processor {member_id} left group {self.group}")
+
+    def members(self) -> List[str]:
+        now = time.monotonic()
+        with self._lock:
+            expired = [member for member, seen in self._members.items()
+                       if now - seen > self.member_ttl_sec]
+            for member in expired:
+                del self._members[member]
+            live = set(self._members)
+        for member in expired:
+            logger.warning(
+                f"Processor {member} missed heartbeats, removing it from group {self.group}")
+        live.add(self.member_id)
+        return sorted(live)
+
+    def assign(self, sensors_by_key: dict):
+        """
+        Work out which sensors this replica owns, given {farm ID: [sensor
+        serials]}. Returns (owned serials, serials newly owned since the last
+        assignment); the latter were updated by another replica until now.
+        """
+        members = self.members()
+        with self._lock:
+            if members != self._ring.members:
+                logger.info(
+                    f"Rebalancing group {self.group} across {len(members)} processors: {members}")
+                self._ring = HashRing(members, self.vnodes)
+                self._stats["rebalances"] += 1
+            ring = self._ring
+
+        owned = {serial
+                 for key, serials in sensors_by_key.items()
+                 if ring.owner(key) == self.member_id
+                 for serial in serials}
+        with self._lock:
+            previous, self._owned = self._owned, owned
+        acquired = owned - previous if previous is not None else set()
+        return owned, acquired
+
+    def owns_key(self, key: str) -> bool:
+        """
+        Whether this replica owns `key` (such as a grid cell key) on the ring
+        of the last assignment.
+        """
+        with self._lock:
+            ring = self._ring
+        return ring.owner(key) == self.member_id
+
+    def owns_sensor(self, sensor_serial_number: str) -> bool:
+        with self._lock:
+            return self._owned is None or sensor_serial_number in self._owned
+
+    def publish_dirty(self, sensor_serial_number: str, days: Iterable[str]):
+        payload = json.dumps(
+            {"from": self.member_id, "serial": sensor_serial_number, "days": sorted(days)})
+        self.client.publish(self.dirty_topic, payload=payload, qos=1)
+        self._count("dirty_notices_sent")
+
+    def stats(self) -> dict:
+        members = self.members()
+        with self._lock:
+            stats = dict(self._stats)
+            stats["owned_sensors"] = len(
+                self._owned) if self._owned is not None else None
+        stats["member_id"] = self.member_id
+        stats["members"] = members
+        return stats
+
+    def _handle_dirty(self, payload: bytes):
+        try:
+            notice = json.loads(payload)
+            sensor_serial_number, days = notice["serial"], notice["days"]
+        except (ValueError, KeyError, TypeError) as e:
+            logger.error(f"Ignoring malformed dirty notice: {e}")
+            return
+
+        # The sender already marked the sensor if it owns it
+        if notice.get("from") == self.member_id:
+            return
+        self._count("dirty_notices_received")
+        if not self.owns_sensor(sensor_serial_number):
+            self._count("dirty_notices_ignored")
+            return
+        if self.on_dirty is not None:
+            self.on_dirty(sensor_serial_number, days)
+
+    def _heartbeat(self):
+        self.client.publish(f"{self.members_topic}/{self.member_id}",
+                            payload=json.dumps({"id": self.member_id, "ts": time.time()}), qos=1)
+
+    def _run(self):
+        while not self._stop_event.wait(self.heartbeat_interval_sec):
+            try:
+                self._heartbeat()
+            except Exception as e:
+                logger.error(f"Error sending processor heartbeat: {e}")
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
@@ -1,10 +1,18 @@
+import hashlib
+import json
+import logging
 import os
+import threading
+import time
+from collections import OrderedDict
 from fastapi import Request, HTTPException, Security
 from fastapi.security import HTTPBearer
 from jose import jwt
 from jose.exceptions import JWTError
 import requests
 
+logger = logging.getLogger(__name__)
+
 # Custom Authentication Error
 class AuthError(HTTPException):
     def __init__(self, status_code: int, detail: str):
@@ -15,31 +23,156 @@ AUTH0_DOMAIN =  os.getenv('AUTH0_DOMAIN')
 API_AUDIENCE = os.getenv('AUTH0_AUDIENCE')
 ALGORITHMS = ["RS256"]
 
+# JWKS caching: keys are refetched every JWKS_REFRESH_INTERVAL_SEC, or early
+# when a token names an unknown kid (key rotation), but never more often than
+# JWKS_MIN_REFRESH_INTERVAL_SEC so bad tokens can't hammer Auth0.
+# JWKS_FILE reads the keys from a local file instead (offline testing).
+JWKS_URL = os.getenv('JWKS_URL', f"https://{AUTH0_DOMAIN}/.well-known/jwks.json")
+JWKS_FILE = os.getenv('JWKS_FILE')
+JWKS_REFRESH_INTERVAL_SEC = int(os.getenv('JWKS_REFRESH_INTERVAL_SEC', 3600))
+JWKS_MIN_REFRESH_INTERVAL_SEC = int(os.getenv('JWKS_MIN_REFRESH_INTERVAL_SEC', 30))
+JWKS_FETCH_TIMEOUT_SEC = float(os.getenv('JWKS_FETCH_TIMEOUT_SEC', 5))
+
+# Verified tokens (by SHA-256 of the token) kept until they expire
+VERIFIED_TOKEN_CACHE_SIZE = int(os.getenv('VERIFIED_TOKEN_CACHE_SIZE', 1000))
+
 # HTTP Bearer Dependency
 http_bearer = HTTPBearer()
 
+
+class JWKSCache:
+    """
+    In-memory copy of the JSON Web Key Set, by kid.
+    """
+
+    def __init__(self, url: str = JWKS_URL, path: str = JWKS_FILE,
+                 refresh_interval_sec: float = JWKS_REFRESH_INTERVAL_SEC,
+                 min_refresh_interval_sec: float = JWKS_MIN_REFRESH_INTERVAL_SEC):
+        self.url = url
+        self.path = path
+        self.refresh_interval_sec = refresh_interval_sec
+        self.min_refresh_interval_sec = min_refresh_interval_sec
+        self._lock = threading.Lock()
+        self._keys = {}
+        self._fetched_at = None
+        self._stats = {"fetches": 0, "forced_refreshes": 0, "fetch_errors": 0}
+
+    def get_key(self, kid: str) -> dict:
+        """
+        The RSA key with this kid, refreshing the set when it is due or the
+        kid is unknown. Returns None if no such key exists.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._fetched_at is None or now - self._fetched_at >= self.refresh_interval_sec:
+                self._refresh()
+            elif kid not in self._keys and now - self._fetched_at >= self.min_refresh_interval_sec:
+                self._stats["forced_refreshes"] += 1
+                self._refresh()
+            return self._keys.get(kid)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, keys=len(self._keys))
+
+    def _fetch(self) -> dict:
+        if self.path:
+            with open(self.path) as f:
+                return json.load(f)
+        response = requests.get(self.url, timeout=JWKS_FETCH_TIMEOUT_SEC)
+        response.raise_for_status()
+        return response.json()
+
+    def _refresh(self):
+        # Caller holds the lock
+        self._stats["fetches"] += 1
+        try:
+            jwks = self._fetch()
+        except (requests.exceptions.RequestException, OSError, ValueError) as e:
+            self._stats["fetch_errors"] += 1
+            if not self._keys:
+                raise
+            # Keep serving the keys we have; retry after the minimum interval
+            logger.warning(f"JWKS refresh failed, using cached keys: {e}")
+            self._fetched_at = time.monotonic() - self.refresh_interval_sec + self.min_refresh_interval_sec
+            return
+
+        self._keys = {
+            key["kid"]: {
+                "kty": key["kty"],
+                "kid": key["kid"],
+                "use": key.get("use", "sig"),
+                "n": key["n"],
+                "e": key["e"]
+            }
+            for key in jwks["keys"] if key.get("kty") == "RSA"
+        }
+        self._fetched_at = time.monotonic()
+        logger.info(f"Loaded {len(self._keys)} JWKS keys")
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of verified token payloads, by SHA-256 of the token, so
+    repeat requests skip the RSA signature check until the token expires.
+    """
+
+    def __init__(self, max_size: int = VERIFIED_TOKEN_CACHE_SIZE):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._payloads = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> dict:
+        key = self._key(token)
+        with self._lock:
+            payload = self._payloads.get(key)
+            if payload is not None and payload["exp"] <= time.time():
+                del self._payloads[key]
+                payload = None
+            if payload is None:
+                self._stats["misses"] += 1
+                return None
+            self._payloads.move_to_end(key)
+            self._stats["hits"] += 1
+            return payload
+
+    def put(self, token: str, payload: dict):
+        # Tokens without an expiry are verified every time
+        if not isinstance(payload.get("exp"), (int, float)) or self.max_size <= 0:
+            return
+        with self._lock:
+            self._payloads[self._key(token)] = payload
+            self._payloads.move_to_end(self._key(token))
+            while len(self._payloads) > self.max_size:
+                self._payloads.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, entries=len(self._payloads))
+
+
+jwks_cache = JWKSCache()
+verified_tokens = VerifiedTokenCache()
+
+
 def verify_jwt(token: str) -> dict:
     """
     Verify the JWT using Auth0's public keys.
     """
+    payload = verified_tokens.get(token)
+    if payload is not None:
+        return payload
+
     try:
-        # Fetch JWKS (JSON Web Key Set) from Auth0
-        jwks_url = f"https://{AUTH0_DOMAIN}/.well-known/jwks.json"
-        jwks = requests.get(jwks_url).json()
         unverified_header = jwt.get_unverified_header(token)
 
         # Find the matching RSA key
-        rsa_key = {}
-        for key in jwks["keys"]:
-            if key["kid"] == unverified_header["kid"]:
-                rsa_key = {
-                    "kty": key["kty"],
-                    "kid": key["kid"],
-                    "use": key["use"],
-                    "n": key["n"],
-                    "e": key["e"]
-                }
-                break
+        rsa_key = jwks_cache.get_key(unverified_header.get("kid"))
 
         if not rsa_key:
             raise AuthError(status_code=401, detail="Unable to find the appropriate key.")
@@ -52,11 +185,12 @@ def verify_jwt(token: str) -> dict:
             audience=API_AUDIENCE,
             issuer=f"https://{AUTH0_DOMAIN}/"
         )
+        verified_tokens.put(token, payload)
         return payload
 
     except JWTError:
         raise AuthError(status_code=401, detail="Invalid token.")
-    except requests.exceptions.RequestException:
+    except (requests.exceptions.RequestException, OSError, ValueError):
         raise AuthError(status_code=500, detail="Unable to verify token.")
 
 def get_current_user(token: str = Security(http_bearer)):
@@ -67,4 +201,4 @@ def get_current_user(token: str = Security(http_bearer)):
         return verify_jwt(token.credentials)
     except AuthError as e:
         raise e  # Return a 401 Unauthorized if the token is invalid
-    
+
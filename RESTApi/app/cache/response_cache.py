@@ -0,0 +1,188 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+logger = logging.getLogger(__name__)
+
+# Dashboards only change when the DataProcessor finishes a forecast cycle
+# (or a user edits the farm), so cached responses live for one cycle
+RESPONSE_CACHE_TTL_SEC = float(os.getenv(
+    "RESPONSE_CACHE_TTL_SEC", os.getenv("GET_FORECAST_INTERVAL_SEC", 120)))
+RESPONSE_CACHE_MAX_ENTRIES = int(
+    os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 10000))
+
+
+class CachedResponse:
+    """
+    A serialized response body with its ETag, expiry and invalidation tags.
+    """
+
+    __slots__ = ("body", "etag", "expires_at", "tags")
+
+    def __init__(self, body: bytes, etag: str, expires_at: float, tags: frozenset):
+        self.body = body
+        self.etag = etag
+        self.expires_at = expires_at
+        self.tags = tags
+
+
+class ResponseCache:
+    """
+    In-process cache of JSON responses, keyed by user (the token's `sub`) and
+    resource, with a TTL and strong ETags.
+
+    Each entry carries tags naming the farms and fields its body was built
+    from; writes invalidate by tag, so every user's cached dashboards that
+    show a changed farm or field are dropped at once. Clients that send
+    If-None-Match with the current ETag get a 304 without the routes
+    touching MySQL or table storage.
+    """
+
+    def __init__(self, ttl_sec: float = RESPONSE_CACHE_TTL_SEC, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.ttl_sec = ttl_sec
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # (user, resource) -> CachedResponse, least recently used first
+        self._entries = OrderedDict()
+        # tag -> keys of the entries carrying it
+        self._tagged = {}
+        self._stats = {"hits": 0, "not_modified": 0, "misses": 0,
+                       "expired": 0, "invalidated": 0, "evicted": 0}
+
+    @staticmethod
+    def user_key(current_user: dict) -> str:
+        return current_user.get("sub", "")
+
+    @staticmethod
+    def etag_for(body: bytes) -> str:
+        return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+    @staticmethod
+    def etag_matches(request: Request, etag: str) -> bool:
+        """
+        True if the request's If-None-Match lists the ETag (or is `*`).
+        """
+        header = request.headers.get("if-none-match")
+        if not header:
+            return False
+        candidates = [candidate.strip() for candidate in header.split(",")]
+        # If-None-Match uses the weak comparison, so ignore a W/ prefix
+        return "*" in candidates or etag in (
+            candidate[2:] if candidate.startswith("W/") else candidate for candidate in candidates)
+
+    async def respond(self, request: Request, current_user: dict, resource: str, build) -> Response:
+        """
+        Serve `resource` for the user from the cache, or await `build()`,
+        which returns (content, tags), and cache its result. Returns a 304
+        when the client already holds the current body.
+        """
+        key = (self.user_key(current_user), resource)
+        entry = self._get(key)
+        if entry is None:
+            content, tags = await build()
+            body = json.dumps(jsonable_encoder(content),
+                              separators=(",", ":")).encode()
+            entry = CachedResponse(body, self.etag_for(body),
+                                   time.monotonic() + self.ttl_sec, frozenset(tags))
+            self._put(key, entry)
+
+        headers = {"ETag": entry.etag,
+                   "Cache-Control": "private, no-cache"}
+        if self.etag_matches(request, entry.etag):
+            self._count("not_modified")
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+    def invalidate(self, *tags: str) -> int:
+        """
+        Drop every entry carrying one of the tags. Returns the number dropped.
+        """
+        with self._lock:
+            keys = set()
+            for tag in tags:
+                keys.update(self._tagged.pop(tag, ()))
+            for key in keys:
+                self._remove(key)
+            self._stats["invalidated"] += len(keys)
+        if keys:
+            logger.info(
+                f"Invalidated {len(keys)} cached responses for {', '.join(tags)}")
+        return len(keys)
+
+    def invalidate_user(self, current_user: dict, resource: str):
+        with self._lock:
+            if self._remove((self.user_key(current_user), resource)):
+                self._stats["invalidated"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(
+            stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["ttl_sec"] = self.ttl_sec
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tagged.clear()
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self._stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry
+
+    def _put(self, key, entry: CachedResponse):
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            for tag in entry.tags:
+                self._tagged.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats["evicted"] += 1
+
+    def _remove(self, key) -> bool:
+        # Caller holds the lock
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        for tag in entry.tags:
+            keys = self._tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged[tag]
+        return True
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+
+# Singleton cache instance
+response_cache_instance = ResponseCache()
+
+
+# Dependency function
+def get_response_cache():
+    return response_cache_instance
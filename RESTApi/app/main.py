@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from azure_table_service.service import AzureTableService
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
@@ -6,12 +7,22 @@ from mysql_service import MySQLService
 import os
 from mysql_service.schemas import CreateFarmSchema
 from app.auth.auth import get_current_user
-from mysql_service.dependencies import get_mysql_service
-from azure_table_service.dependencies import get_azure_table_service
+from mysql_service.dependencies import get_mysql_service, mysql_async_service_instance
+from azure_table_service.dependencies import get_azure_table_service, azure_async_service_instance
+from app.cache.response_cache import ResponseCache, get_response_cache
 from .routers import farmsroutes, fieldsroutes
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Close the async services' connection pools
+    await azure_async_service_instance.close()
+    await mysql_async_service_instance.close()
+
+
 # Create FastAPI app
 app = FastAPI(
+    lifespan=lifespan,
     title="GDD Rest API",
     version="1.0.0",
     contact={
@@ -33,6 +44,17 @@ app.add_middleware(
 async def health_check():
     return {"status": "ok"}
 
+
+@app.get("/cache/stats")
+def cache_stats(
+        current_user: dict = Depends(get_current_user),
+        mysql_service: MySQLService = Depends(get_mysql_service),
+        response_cache: ResponseCache = Depends(get_response_cache)):
+    return {
+        "responses": response_cache.stats(),
+        "users": mysql_service.user_cache.stats(),
+    }
+
 # Include the routers
 app.include_router(farmsroutes.router)
 app.include_router(fieldsroutes.router)
@@ -1,17 +1,24 @@
+import json
 import logging
 import math
-from azure_table_service.service import AzureTableService
-from fastapi import FastAPI, Depends
+from datetime import datetime
+from typing import Optional
+from fastapi import FastAPI, Depends, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from fastapi import APIRouter
 from fastapi.middleware.cors import CORSMiddleware
 from mysql_service import MySQLService
 
 
 import os
-from mysql_service.schemas import CreateFarmSchema, FarmDashboardSchema, FieldDetail, ReadFarmSchema
+from mysql_service.schemas import CreateFarmSchema, FarmDashboardPageSchema, FarmDashboardSchema, FieldDetail, ReadFarmSchema
 from app.auth.auth import get_current_user
-from mysql_service.dependencies import get_mysql_service
-from azure_table_service.dependencies import get_azure_table_service
+from app.cache.response_cache import ResponseCache, get_response_cache
+from mysql_service.async_service import AsyncMySQLService
+from mysql_service.dependencies import get_async_mysql_service, get_mysql_service
+from azure_table_service.async_service import AsyncAzureTableService
+from azure_table_service.dependencies import get_async_azure_table_service
 
 router = APIRouter(
     prefix="/farms",
@@ -19,19 +26,149 @@ router = APIRouter(
 )
 
 
+# Farms per page of the paginated and streamed farm dashboards
+FARM_DASHBOARD_PAGE_SIZE = int(os.getenv("FARM_DASHBOARD_PAGE_SIZE", 25))
+FARM_DASHBOARD_MAX_PAGE_SIZE = int(
+    os.getenv("FARM_DASHBOARD_MAX_PAGE_SIZE", 200))
+
+
+def farm_dashboard_tags(current_user: dict, farms: list[FarmDashboardSchema]) -> list[str]:
+    """
+    Cache tags of a farm dashboard response: its farms and fields, and the
+    user's farm list (which changes when they create a farm).
+    """
+    return [f"farms:{ResponseCache.user_key(current_user)}"] + [
+        f"farm:{farm.FarmId}" for farm in farms] + [
+        f"field:{field.FieldId}" for farm in farms for field in farm.FarmFields]
+
+
 @router.get("/farmdashboard", response_model=list[FarmDashboardSchema])
-def read_farm_dashboard(
+async def read_farm_dashboard(
+        request: Request,
         current_user: dict = Depends(get_current_user),
-        mysql_service: MySQLService = Depends(get_mysql_service),
-        table_service: AzureTableService = Depends(get_azure_table_service)):
+        mysql_service: AsyncMySQLService = Depends(get_async_mysql_service),
+        table_service: AsyncAzureTableService = Depends(
+            get_async_azure_table_service),
+        response_cache: ResponseCache = Depends(get_response_cache)):
 
     # Log user info
     print("Current User:", current_user)
 
+    async def build():
+        response = await build_farm_dashboard(
+            current_user, mysql_service, table_service)
+        return response, farm_dashboard_tags(current_user, response)
+
+    # Repeat polls are answered from the cache (304 if the ETag matches)
+    return await response_cache.respond(request, current_user, "farmdashboard", build)
+
+
+@router.get("/farmdashboard/page", response_model=FarmDashboardPageSchema)
+async def read_farm_dashboard_page(
+        request: Request,
+        cursor: Optional[str] = Query(None, max_length=36),
+        limit: int = Query(FARM_DASHBOARD_PAGE_SIZE, ge=1,
+                           le=FARM_DASHBOARD_MAX_PAGE_SIZE),
+        current_user: dict = Depends(get_current_user),
+        mysql_service: AsyncMySQLService = Depends(get_async_mysql_service),
+        table_service: AsyncAzureTableService = Depends(
+            get_async_azure_table_service),
+        response_cache: ResponseCache = Depends(get_response_cache)):
+    """
+    The farm dashboard one page at a time, in FarmId order. Pass the
+    returned NextCursor as `cursor` to get the next page.
+    """
+
+    async def build():
+        user = await mysql_service.get_or_create_user(current_user)
+        farms, next_cursor = await mysql_service.get_farm_dashboard_page(
+            user.UserID, cursor, limit)
+        dashboards = await build_farm_dashboards(
+            farms, mysql_service, table_service)
+        page = FarmDashboardPageSchema(
+            Farms=dashboards, NextCursor=next_cursor)
+        return page, farm_dashboard_tags(current_user, dashboards)
+
+    return await response_cache.respond(
+        request, current_user, f"farmdashboard:page:{cursor or ''}:{limit}", build)
+
+
+@router.get("/farmdashboard/stream")
+async def stream_farm_dashboard(
+        limit: int = Query(FARM_DASHBOARD_PAGE_SIZE, ge=1,
+                           le=FARM_DASHBOARD_MAX_PAGE_SIZE),
+        current_user: dict = Depends(get_current_user),
+        mysql_service: AsyncMySQLService = Depends(get_async_mysql_service),
+        table_service: AsyncAzureTableService = Depends(
+            get_async_azure_table_service)):
+    """
+    The farm dashboard as NDJSON, one FarmDashboardSchema per line in
+    FarmId order. Farms are read and computed `limit` at a time and each
+    page is written as soon as it is ready.
+    """
+    user = await mysql_service.get_or_create_user(current_user)
+
+    async def farm_lines():
+        cursor = None
+        try:
+            while True:
+                farms, cursor = await mysql_service.get_farm_dashboard_page(
+                    user.UserID, cursor, limit)
+                for farm in await build_farm_dashboards(farms, mysql_service, table_service):
+                    yield json.dumps(jsonable_encoder(farm), separators=(",", ":")) + "\n"
+                if cursor is None:
+                    break
+        except Exception as e:
+            # The status line has been sent, so the stream just ends early
+            logging.error(
+                f"Error streaming farm dashboard after farm {cursor}: {e}")
+            raise
+
+    return StreamingResponse(farm_lines(), media_type="application/x-ndjson")
+
+
+async def build_farm_dashboard(current_user: dict, mysql_service: AsyncMySQLService,
+                               table_service: AsyncAzureTableService) -> list[FarmDashboardSchema]:
     # Fetch user and their farms with fields
-    user = mysql_service.get_or_create_user(current_user)
-    farms_with_fields = mysql_service.get_farms_with_fields_by_user(
-        user.UserID)
+    user = await mysql_service.get_or_create_user(current_user)
+    farms_with_fields, _ = await mysql_service.get_farm_dashboard_page(user.UserID)
+    return await build_farm_dashboards(farms_with_fields, mysql_service, table_service)
+
+
+async def build_farm_dashboards(farms_with_fields: list[dict], mysql_service: AsyncMySQLService,
+                                table_service: AsyncAzureTableService) -> list[FarmDashboardSchema]:
+
+    fields = [field for farm in farms_with_fields for field in farm["Fields"]]
+
+    # Precomputed field summaries from the DataProcessor, one read per field
+    summaries = await table_service.get_field_summaries(
+        [field["FieldId"] for field in fields])
+    summarized = {
+        field["FieldId"]: summaries[field["FieldId"]]
+        for field in fields
+        if table_service.is_summary_current(
+            summaries.get(field["FieldId"]), [sensor["SerialNo"] for sensor in field["Sensors"]])
+    }
+
+    # Fields without a current summary are computed live
+    sensors = [
+        sensor
+        for field in fields
+        if field["FieldId"] not in summarized
+        for sensor in field["Sensors"]
+    ]
+
+    # Latest reset dates of all the user's sensors in one query
+    reset_dates = await mysql_service.get_latest_reset_dates_by_sensor_ids(
+        sensor["SensorId"] for sensor in sensors)
+
+    # Cumulative GDD of every sensor, with the partitions queried concurrently
+    # (today as the reset date if the sensor has none)
+    sensor_gdd = await table_service.calculate_sensors_gdd([
+        (sensor["SerialNo"], reset_dates.get(
+            sensor["SensorId"]) or datetime.now())
+        for sensor in sensors
+    ])
 
     # Map to FarmDashboardSchema
     response = []
@@ -41,22 +178,20 @@ def read_farm_dashboard(
             gdd_values = []
             cutting_dates = []
             for sensor in field["Sensors"]:
-                # Get the latest reset date
-                latest_reset_date = mysql_service.get_latest_sensor_reset_date(
-                    sensor["SensorId"])
-
-                # Calculate the cumulative GDD for the sensor
-                gdd = table_service.calculate_sensor_gdd(
-                    sensor["SerialNo"], latest_reset_date)
-                gdd_values.append(gdd)
+                if field["FieldId"] not in summarized:
+                    gdd_values.append(sensor_gdd[sensor["SerialNo"]])
 
                 # Use the pre-calculated cutting date
                 if sensor["CuttingDateCalculated"]:
                     cutting_dates.append(sensor["CuttingDateCalculated"])
 
             # Compute average GDD for the field
-            current_gdd = math.ceil(
-                sum(gdd_values) / len(gdd_values)) if gdd_values else 0
+            if field["FieldId"] in summarized:
+                current_gdd = math.ceil(
+                    summarized[field["FieldId"]]["CurrentGDD"])
+            else:
+                current_gdd = math.ceil(
+                    sum(gdd_values) / len(gdd_values)) if gdd_values else 0
 
             # Determine the earliest cutting date for the field
             optimal_cutting_date = min(
@@ -86,7 +221,8 @@ def read_farm_dashboard(
 def create_farm(
         new_farm: CreateFarmSchema,
         current_user: dict = Depends(get_current_user),
-        mysql_service: MySQLService = Depends(get_mysql_service)):
+        mysql_service: MySQLService = Depends(get_mysql_service),
+        response_cache: ResponseCache = Depends(get_response_cache)):
 
     # Fetch the current user
     user = mysql_service.get_or_create_user(current_user)
@@ -97,4 +233,7 @@ def create_farm(
     mysql_service.assign_user_to_farm(
         user.UserID, created_farm.FarmId, role=1)
 
+    # The user's cached farm dashboards don't list the new farm
+    response_cache.invalidate(f"farms:{ResponseCache.user_key(current_user)}")
+
     return created_farm
@@ -1,119 +1,266 @@
+import asyncio
 import logging
 import math
-from fastapi import HTTPException
+from datetime import datetime, timedelta, timezone
+from typing import List, Literal, Optional
+from fastapi import HTTPException, Request
 from azure_table_service.service import AzureTableService
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Query
 from fastapi import APIRouter
 from fastapi.middleware.cors import CORSMiddleware
 from mysql_service import MySQLService
 from uuid import UUID
 
 import os
-from mysql_service.schemas import FieldDashboardSchema, FieldSensorSchema, GraphData, ReadFieldSchema, CreateFieldSchema, CreateSensorSchema, ReadSensorSchema, UpdateSensorResetDateSchema
+from mysql_service.schemas import BulkCreateResultSchema, FieldDashboardSchema, FieldSensorSchema, GraphData, HistorySchema, ReadFieldSchema, CreateFieldSchema, CreateSensorSchema, ReadSensorSchema, UpdateSensorResetDateSchema
 from app.auth.auth import get_current_user
-from mysql_service.dependencies import get_mysql_service
-from azure_table_service.dependencies import get_azure_table_service
+from app.cache.response_cache import ResponseCache, get_response_cache
+from mysql_service.async_service import AsyncMySQLService
+from mysql_service.dependencies import get_async_mysql_service, get_mysql_service
+from azure_table_service.async_service import AsyncAzureTableService
+from azure_table_service.dependencies import get_async_azure_table_service, get_azure_table_service
 
 router = APIRouter(
     prefix="/fields",
     tags=["fields"],
 )
 
+# Items accepted by one bulk create request
+BULK_CREATE_MAX_ITEMS = int(os.getenv("BULK_CREATE_MAX_ITEMS", 5000))
+
+# Points per series of the history endpoints
+HISTORY_DEFAULT_POINTS = int(os.getenv("HISTORY_DEFAULT_POINTS", 500))
+HISTORY_MAX_POINTS = int(os.getenv("HISTORY_MAX_POINTS", 5000))
+
 
 @router.get("/fielddashboard{field_id}", response_model=FieldDashboardSchema)
-def read_farm_dashboard(
+async def read_farm_dashboard(
         field_id: UUID,
+        request: Request,
         current_user: dict = Depends(get_current_user),
-        mysql_service: MySQLService = Depends(get_mysql_service),
-        table_service: AzureTableService = Depends(get_azure_table_service)):
+        mysql_service: AsyncMySQLService = Depends(get_async_mysql_service),
+        table_service: AsyncAzureTableService = Depends(
+            get_async_azure_table_service),
+        response_cache: ResponseCache = Depends(get_response_cache)):
 
-    try:
-        # 1. Retrieve field details using MySQLService
-        field = mysql_service.get_field_by_id(str(field_id))
+    async def build():
+        # 1. Retrieve field details and the precomputed summary concurrently
+        field, summary = await asyncio.gather(
+            mysql_service.get_field_by_id(str(field_id)),
+            table_service.get_field_dashboard_summary(str(field_id)))
         if not field:
             raise HTTPException(status_code=404, detail="Field not found")
+        dashboard = await build_field_dashboard(field, summary, mysql_service, table_service)
+        return dashboard, [f"field:{field.FieldId}", f"farm:{field.FarmId}"]
 
-        # 2. Extract field-level data
-        field_name = field.Name
-        altitude = field.Altitude
-
-        # 3. Retrieve sensors (already eagerly loaded)
-        sensors = field.sensors
-        if not sensors:
-            return FieldDashboardSchema(
-                FieldName=field_name,
-                Altitude=altitude,
-                FieldSensors=[],
-            )
-
-        # 4. Select the first sensor and calculate GDD forecast
-        selected_sensor = sensors[0]
-        latest_reset_date = mysql_service.get_latest_sensor_reset_date_by_serial(
-            selected_sensor.SerialNo)
-        gdd_forecast = table_service.calculate_cumulative_gdd_forecast(
-            partition_key=selected_sensor.SerialNo,
-            latest_reset_date=latest_reset_date
-        )
-
-        # 5. Convert GDD forecast to GraphData format
-        seven_day_gdd_forecast = [
-            GraphData(date=record["date"], value=record["cumulative_gdd"]) for record in gdd_forecast
-        ]
-
-        # 6. Fetch seven-day temperature forecast
-        temperature_forecast = table_service.get_seven_day_temperature_forecast(
-            partition_key=selected_sensor.SerialNo
-        )
-        seven_day_temp_forecast = [
-            GraphData(date=record["date"], value=record["temperature"]) for record in temperature_forecast
-        ]
-        humidity_forecast = table_service.get_seven_day_humidity_forecast(
-            partition_key=selected_sensor.SerialNo)
+    try:
+        # Repeat polls are answered from the cache (304 if the ETag matches)
+        return await response_cache.respond(request, current_user, f"fielddashboard:{field_id}", build)
+    except Exception as e:
+        logging.error(f"Error retrieving field dashboard: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
 
-        seven_day_humidity_forecast = [
-            GraphData(date=record["date"], value=record["humidity"]) for record in humidity_forecast
 
-        ]
+async def build_field_dashboard(field, summary, mysql_service: AsyncMySQLService,
+                                table_service: AsyncAzureTableService) -> FieldDashboardSchema:
+    """
+    Build the field dashboard from the precomputed summary when it is
+    current, otherwise from MySQL and table storage, running the
+    independent queries concurrently.
+    """
+    # 2. Extract field-level data
+    field_name = field.Name
+    altitude = field.Altitude
 
-        # 7. Prepare the response
-        response = FieldDashboardSchema(
+    # 3. Retrieve sensors (already eagerly loaded)
+    sensors = field.sensors
+    if not sensors:
+        return FieldDashboardSchema(
             FieldName=field_name,
             Altitude=altitude,
-            CurrentGDD=math.ceil(table_service.calculate_sensor_gdd(
-                sensors[0].SerialNo, latest_reset_date)),
-            OptimalGDD=selected_sensor.OptimalGDD,
-            # table_service.calculate_forcast_cutting_date(
-            CuttingDateCalculated=sensors[0].CuttingDateCalculated,
-            # selected_sensor.SerialNo, selected_sensor.OptimalGDD, latest_reset_date),  #
-            FieldSensors=[
-                {
-                    "SensorId": sensor.SensorId,
-                    "SerialNo": sensor.SerialNo,
-                    "OptimalGDD": sensor.OptimalGDD,
-                    "SensorResetDate": mysql_service.get_sensor_reset_date_by_sensor_id(sensor.SensorId),
-                    "State": sensor.State.value,
-                } for sensor in sensors
-            ],
-            SevenDayTempForecast=seven_day_temp_forecast,  # Add temperature forecast
-            SevenDayGDDForecast=seven_day_gdd_forecast,
-            SevenDayHumidityForecast=seven_day_humidity_forecast
+            FieldSensors=[],
         )
-        return response
 
+    # 4. Select the first sensor and calculate GDD forecast
+    selected_sensor = sensors[0]
+
+    # Serve the DataProcessor's precomputed summary when it is current
+    if summary is not None:
+        field_summary, sensor_summaries = summary
+        if table_service.is_summary_current(field_summary, [sensor.SerialNo for sensor in sensors]):
+            return field_dashboard_from_summary(field, sensors, sensor_summaries)
+
+    async def gdd():
+        # Latest reset dates of all the field's sensors in one query
+        # (today if a sensor has none)
+        reset_dates = await mysql_service.get_latest_reset_dates_by_sensor_ids(
+            [sensor.SensorId for sensor in sensors])
+        reset_dates = {sensor.SensorId: reset_dates.get(sensor.SensorId) or datetime.now()
+                       for sensor in sensors}
+        # Daily, cumulative and current GDD in one pass over the GDD data
+        return reset_dates, await table_service.get_gdd_series(
+            selected_sensor.SerialNo, reset_dates[selected_sensor.SensorId])
+
+    # The weather forecast (temperature and humidity in one query) doesn't
+    # depend on the reset date
+    (reset_dates, gdd_series), weather_series = await asyncio.gather(
+        gdd(), table_service.get_weather_forecast_series(selected_sensor.SerialNo))
+
+    # 5. Convert the forecasts to GraphData format
+    seven_day_gdd_forecast = [
+        GraphData(date=record["date"], value=record["cumulative_gdd"]) for record in gdd_series["cumulative_gdd"]
+    ]
+    seven_day_temp_forecast = [
+        GraphData(date=record["date"], value=record["temperature"]) for record in weather_series["temperature"]
+    ]
+    seven_day_humidity_forecast = [
+        GraphData(date=record["date"], value=record["humidity"]) for record in weather_series["humidity"]
+    ]
+
+    # 6. Prepare the response
+    response = FieldDashboardSchema(
+        FieldName=field_name,
+        Altitude=altitude,
+        CurrentGDD=math.ceil(gdd_series["current_gdd"]),
+        OptimalGDD=selected_sensor.OptimalGDD,
+        # table_service.calculate_forcast_cutting_date(
+        CuttingDateCalculated=sensors[0].CuttingDateCalculated,
+        # selected_sensor.SerialNo, selected_sensor.OptimalGDD, latest_reset_date),  #
+        FieldSensors=[
+            {
+                "SensorId": sensor.SensorId,
+                "SerialNo": sensor.SerialNo,
+                "OptimalGDD": sensor.OptimalGDD,
+                "SensorResetDate": reset_dates[sensor.SensorId],
+                "State": sensor.State.value,
+            } for sensor in sensors
+        ],
+        SevenDayTempForecast=seven_day_temp_forecast,  # Add temperature forecast
+        SevenDayGDDForecast=seven_day_gdd_forecast,
+        SevenDayHumidityForecast=seven_day_humidity_forecast
+    )
+    return response
+
+
+def field_dashboard_from_summary(field, sensors, sensor_summaries) -> FieldDashboardSchema:
+    """
+    Build the field dashboard from the field's dashboard summary rows.
+    """
+    selected_summary = sensor_summaries[sensors[0].SerialNo]
+
+    def graph(encoded):
+        return [GraphData(date=day, value=value) for day, value in AzureTableService.decode_series(encoded)]
+
+    return FieldDashboardSchema(
+        FieldName=field.Name,
+        Altitude=field.Altitude,
+        CurrentGDD=math.ceil(selected_summary["CurrentGDD"]),
+        OptimalGDD=sensors[0].OptimalGDD,
+        CuttingDateCalculated=sensors[0].CuttingDateCalculated,
+        FieldSensors=[
+            {
+                "SensorId": sensor.SensorId,
+                "SerialNo": sensor.SerialNo,
+                "OptimalGDD": sensor.OptimalGDD,
+                "SensorResetDate": datetime.fromisoformat(sensor_summaries[sensor.SerialNo]["ResetDate"]),
+                "State": sensor.State.value,
+            } for sensor in sensors
+        ],
+        SevenDayTempForecast=graph(selected_summary.get("SevenDayTemp")),
+        SevenDayGDDForecast=graph(selected_summary.get("SevenDayGDD")),
+        SevenDayHumidityForecast=graph(
+            selected_summary.get("SevenDayHumidity")),
+    )
+
+
+@router.get("/{field_id}/history", response_model=HistorySchema)
+def read_field_history(
+        field_id: UUID,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        points: int = Query(HISTORY_DEFAULT_POINTS, ge=3, le=HISTORY_MAX_POINTS),
+        method: Literal["buckets", "lttb"] = "buckets",
+        current_user: dict = Depends(get_current_user),
+        mysql_service: MySQLService = Depends(get_mysql_service),
+        table_service: AzureTableService = Depends(get_azure_table_service)):
+    """
+    Measured and forecast temperature of a field (the mean over its sensors)
+    between `start` and `end` (default: the last 7 days), downsampled to
+    `points` points.
+    """
+    field = mysql_service.get_field_by_id(str(field_id))
+    if not field:
+        raise HTTPException(status_code=404, detail="Field not found")
+    return read_history([sensor.SerialNo for sensor in field.sensors],
+                        start, end, points, method, table_service)
+
+
+@router.get("/sensor/{sensor_id}/history", response_model=HistorySchema)
+def read_sensor_history(
+        sensor_id: UUID,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        points: int = Query(HISTORY_DEFAULT_POINTS, ge=3, le=HISTORY_MAX_POINTS),
+        method: Literal["buckets", "lttb"] = "buckets",
+        current_user: dict = Depends(get_current_user),
+        mysql_service: MySQLService = Depends(get_mysql_service),
+        table_service: AzureTableService = Depends(get_azure_table_service)):
+    """
+    Measured and forecast temperature of one sensor, as read_field_history.
+    """
+    sensor = mysql_service.get_sensor_by_id(str(sensor_id))
+    if not sensor:
+        raise HTTPException(status_code=404, detail="Sensor not found")
+    return read_history([sensor.SerialNo], start, end, points, method, table_service)
+
+
+def naive_utc(moment: datetime) -> datetime:
+    """
+    Convert an aware datetime to naive UTC; naive ones are taken as UTC already.
+    """
+    if moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def read_history(serials: list[str], start: Optional[datetime], end: Optional[datetime],
+                 points: int, method: str, table_service: AzureTableService) -> HistorySchema:
+    # Stored RowKeys are naive UTC timestamps
+    end = naive_utc(end or datetime.now())
+    start = naive_utc(start or end - timedelta(days=7))
+    if start >= end:
+        raise HTTPException(
+            status_code=422, detail="start must be before end")
+
+    try:
+        series = table_service.get_sensors_history(
+            serials, start, end, points, method)
     except Exception as e:
-        logging.error(f"Error retrieving field dashboard: {e}")
+        logging.error(f"Error reading history of sensors {serials}: {e}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
+    return HistorySchema(
+        Start=start,
+        End=end,
+        Method=method,
+        Temperature=series["temperature"],
+        ForecastTemperature=series["forecast_temperature"],
+    )
+
 
 @router.post("/newfield", response_model=ReadFieldSchema)
 def create_field(
         new_field: CreateFieldSchema,
         current_user: dict = Depends(get_current_user),
-        mysql_service: MySQLService = Depends(get_mysql_service)):
+        mysql_service: MySQLService = Depends(get_mysql_service),
+        response_cache: ResponseCache = Depends(get_response_cache)):
 
     # Create the field
     created_field = mysql_service.create_field(new_field)
 
+    # Cached farm dashboards of the farm don't list the new field
+    response_cache.invalidate(f"farm:{created_field.FarmId}")
+
     return created_field
 
 
@@ -121,20 +268,83 @@ def create_field(
 def create_field(
         new_sensor: CreateSensorSchema,
         current_user: dict = Depends(get_current_user),
-        mysql_service: MySQLService = Depends(get_mysql_service)):
+        mysql_service: MySQLService = Depends(get_mysql_service),
+        response_cache: ResponseCache = Depends(get_response_cache)):
 
     user = mysql_service.get_or_create_user(current_user)
     # Create the sensor
     created_sensor = mysql_service.create_sensor(new_sensor, user.UserID)
 
+    response_cache.invalidate(f"field:{created_sensor.FieldId}")
+
     return created_sensor
 
 
+def check_bulk_size(items: list):
+    if len(items) > BULK_CREATE_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413, detail=f"At most {BULK_CREATE_MAX_ITEMS} items per request")
+
+
+def bulk_result(outcomes: list[dict]) -> BulkCreateResultSchema:
+    created = sum(outcome["Status"] == "created" for outcome in outcomes)
+    return BulkCreateResultSchema(Created=created, Rejected=len(outcomes) - created, Items=outcomes)
+
+
+@router.post("/newfields", response_model=BulkCreateResultSchema)
+def create_fields(
+        new_fields: List[CreateFieldSchema],
+        current_user: dict = Depends(get_current_user),
+        mysql_service: MySQLService = Depends(get_mysql_service),
+        response_cache: ResponseCache = Depends(get_response_cache)):
+    """
+    Create many fields in one transaction, with an outcome per field.
+    """
+    check_bulk_size(new_fields)
+    try:
+        outcomes = mysql_service.create_fields(new_fields)
+    except Exception as e:
+        logging.error(f"Error creating fields: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+    # Cached farm dashboards of the farms don't list the new fields
+    response_cache.invalidate(*{
+        f"farm:{outcome['ParentId']}" for outcome in outcomes if outcome["Status"] == "created"})
+
+    return bulk_result(outcomes)
+
+
+@router.post("/newsensors", response_model=BulkCreateResultSchema)
+def create_sensors(
+        new_sensors: List[CreateSensorSchema],
+        current_user: dict = Depends(get_current_user),
+        mysql_service: MySQLService = Depends(get_mysql_service),
+        response_cache: ResponseCache = Depends(get_response_cache)):
+    """
+    Create many sensors and their reset dates in one transaction, with an
+    outcome per sensor.
+    """
+    check_bulk_size(new_sensors)
+    try:
+        user = mysql_service.get_or_create_user(current_user)
+        outcomes = mysql_service.create_sensors(new_sensors, user.UserID)
+    except Exception as e:
+        logging.error(f"Error creating sensors: {e}")
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+    response_cache.invalidate(*{
+        f"field:{outcome['ParentId']}" for outcome in outcomes if outcome["Status"] == "created"})
+
+    return bulk_result(outcomes)
+
+
 @router.put("/sensor/resetdate", response_model=bool)
 def update_sensor_reset_date(
         update_data: UpdateSensorResetDateSchema,
         current_user: dict = Depends(get_current_user),
-        mysql_service: MySQLService = Depends(get_mysql_service)):
+        mysql_service: MySQLService = Depends(get_mysql_service),
+        table_service: AzureTableService = Depends(get_azure_table_service),
+        response_cache: ResponseCache = Depends(get_response_cache)):
 
     try:
         user = mysql_service.get_or_create_user(current_user)
@@ -147,6 +357,17 @@ def update_sensor_reset_date(
         if not success:
             raise HTTPException(
                 status_code=404, detail="Sensor not found or update failed")
+
+        # The field's cached responses and dashboard summary used the old
+        # reset date; the DataProcessor writes a new summary on its next cycle
+        sensor = mysql_service.get_sensor_by_id(str(update_data.SensorId))
+        if sensor is not None:
+            response_cache.invalidate(f"field:{sensor.FieldId}")
+            try:
+                table_service.invalidate_dashboard_summary(sensor.FieldId)
+            except Exception as e:
+                logging.error(
+                    f"Reset date updated but dashboard summary of field {sensor.FieldId} not invalidated: {e}")
         return success
     except Exception as e:
         logging.error(f"Error updating sensor reset date: {e}")
@@ -0,0 +1,300 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from azure.core.exceptions import ResourceNotFoundError
+from azure.data.tables.aio import TableServiceClient
+
+from azure_table_service.storage import (
+    TABLE_STORAGE_BACKEND, AzureTableStorage, create_table_storage, odata_filter)
+from azure_table_service.service import (
+    AzureTableService,
+    CUMULATIVE_GDD_META_ROW,
+    CUMULATIVE_GDD_TABLE,
+    DASHBOARD_SUMMARY_FIELD_ROW,
+    DASHBOARD_SUMMARY_TABLE,
+    GDD_QUERY_CONCURRENCY,
+    SENSOR_CELLS_PARTITION,
+    SENSOR_CELLS_TABLE,
+    SENSOR_CELL_CACHE_TTL_SEC,
+)
+
+
+class AsyncAzureTableService:
+    """
+    Async (azure.data.tables.aio) version of the AzureTableService reads
+    behind the dashboards. Query filters and result processing come from
+    AzureTableService, so both return the same data, and the table readiness
+    and forecast cell caches are shared with it. With a storage backend other
+    than Azure, reads run on the sync TableStorage in worker threads.
+    """
+
+    # Static helpers shared with the sync service
+    encode_series = staticmethod(AzureTableService.encode_series)
+    decode_series = staticmethod(AzureTableService.decode_series)
+    is_summary_current = staticmethod(AzureTableService.is_summary_current)
+
+    def __init__(self):
+        # Fetch Azure Table Storage connection string from environment variables
+        self.connection_string = os.getenv(
+            'AZURE_STORAGE_SERVICE', "UseDevelopmentStorage=true")
+        self._service_client = None
+        self._table_clients = {}
+        # Only Azure has an async client
+        self.storage = None if TABLE_STORAGE_BACKEND == "azure" else create_table_storage()
+
+    @property
+    def service_client(self) -> TableServiceClient:
+        # Created on first use, from inside the event loop that runs the requests
+        if self._service_client is None:
+            self._service_client = TableServiceClient.from_connection_string(
+                conn_str=self.connection_string)
+        return self._service_client
+
+    def get_table_client(self, table_name: str):
+        table_client = self._table_clients.get(table_name)
+        if table_client is None:
+            table_client = self.service_client.get_table_client(table_name)
+            self._table_clients[table_name] = table_client
+        return table_client
+
+    async def close(self):
+        # Table clients share the service client's transport
+        if self._service_client is not None:
+            await self._service_client.close()
+        self._service_client = None
+        self._table_clients = {}
+        if self.storage is not None:
+            self.storage.close()
+
+    async def create_table_if_not_exists(self, table_name: str):
+        key = (self.connection_string, table_name)
+        if key in AzureTableStorage._ready_tables:
+            return
+
+        try:
+            await self.service_client.create_table_if_not_exists(table_name)
+            with AzureTableStorage._shared_lock:
+                AzureTableStorage._ready_tables.add(key)
+            print(f"Table '{table_name}' is ready.")
+        except Exception as e:
+            print(f"Error creating table '{table_name}': {str(e)}")
+
+    def invalidate_if_table_missing(self, table_name: str, error: Exception):
+        """
+        Invalidate the readiness of `table_name` if `error` says the table is gone.
+        A missing entity also raises ResourceNotFoundError, with its own error code.
+        """
+        if isinstance(error, ResourceNotFoundError) and getattr(error, "error_code", None) != "ResourceNotFound":
+            logging.warning(
+                f"Table '{table_name}' not found, clearing its readiness cache.")
+            with AzureTableStorage._shared_lock:
+                AzureTableStorage._ready_tables.discard(
+                    (self.connection_string, table_name))
+            return True
+        return False
+
+    async def _query(self, table_name: str, key_range: Tuple[str, str, str], select: List[str] = None) -> List[Dict]:
+        """
+        Entities of a (partition key, first RowKey, last RowKey) range, as
+        TableStorage.query.
+        """
+        if self.storage is not None:
+            return await asyncio.to_thread(
+                lambda: list(self.storage.query(table_name, *key_range, select=select)))
+
+        await self.create_table_if_not_exists(table_name)
+        entities = self.get_table_client(table_name).query_entities(
+            query_filter=odata_filter(*key_range), select=select)
+        return [entity async for entity in entities]
+
+    async def _get_entity(self, table_name: str, partition_key: str, row_key: str) -> Optional[Dict]:
+        if self.storage is not None:
+            return await asyncio.to_thread(self.storage.get_entity, table_name, partition_key, row_key)
+
+        await self.create_table_if_not_exists(table_name)
+        try:
+            return await self.get_table_client(table_name).get_entity(
+                partition_key=partition_key, row_key=row_key)
+        except ResourceNotFoundError as e:
+            self.invalidate_if_table_missing(table_name, e)
+            return None
+
+    async def get_forecast_partition(self, sensor_serial_number: str) -> str:
+        """
+        Resolve the weatherdata partition holding a sensor's forecast: its grid
+        cell if one is mapped, otherwise the serial itself (per-sensor forecasts).
+        """
+        cached = AzureTableService._forecast_partitions.get(
+            sensor_serial_number)
+        if cached and time.monotonic() - cached[1] < SENSOR_CELL_CACHE_TTL_SEC:
+            return cached[0]
+
+        entity = await self._get_entity(SENSOR_CELLS_TABLE, SENSOR_CELLS_PARTITION, sensor_serial_number)
+        partition_key = entity["CellKey"] if entity else sensor_serial_number
+
+        with AzureTableService._shared_lock:
+            AzureTableService._forecast_partitions[sensor_serial_number] = (
+                partition_key, time.monotonic())
+        return partition_key
+
+    async def get_weather_forecast_series(self, partition_key: str) -> Dict[str, List[Dict]]:
+        """
+        Seven-day daily average temperature and humidity forecasts from one
+        weatherdata query projecting both columns.
+        """
+        table_name = "weatherdata"
+        try:
+            # Forecasts are stored once per grid cell, not per sensor. The range
+            # starts today, so it never reaches months compacted to cold storage.
+            forecast_partition = await self.get_forecast_partition(partition_key)
+            entities = await self._query(
+                table_name,
+                AzureTableService._seven_day_forecast_range(
+                    forecast_partition),
+                select=["RowKey", "air_temperature", "relative_humidity"])
+            return AzureTableService._weather_series(entities)
+
+        except Exception as e:
+            self.invalidate_if_table_missing(table_name, e)
+            logging.error(f"Error fetching seven-day weather forecast: {e}")
+            raise
+
+    async def get_cumulative_gdd_meta(self, partition_key: str) -> Optional[Dict]:
+        return await self._get_entity(CUMULATIVE_GDD_TABLE, partition_key, CUMULATIVE_GDD_META_ROW)
+
+    async def _cumulative_at(self, partition_key: str, meta: Dict, day) -> Tuple[float, float]:
+        """
+        (cumulative GDD, running maximum of it) at the end of `day`.
+        """
+        row_key = AzureTableService._cumulative_row_key(meta, day)
+        if row_key is None:
+            return 0.0, float("-inf")
+        entity = await self._get_entity(CUMULATIVE_GDD_TABLE, partition_key, row_key)
+        return AzureTableService._cumulative_values(partition_key, row_key, entity)
+
+    async def calculate_sensor_gdd(self, sensor_serial_number: str, latest_reset_date: datetime) -> float:
+        """
+        GDD accumulated from the reset date up to today, as the difference of
+        two cumulative GDD index reads (made concurrently).
+        """
+        try:
+            meta = await self.get_cumulative_gdd_meta(sensor_serial_number)
+            if meta is None:
+                entities = await self._query(
+                    "gdddata", AzureTableService._scan_sensor_gdd_range(sensor_serial_number, latest_reset_date))
+                return AzureTableService._sum_daily_gdd(entities)
+
+            today = datetime.now().date()
+            reset = latest_reset_date.date()
+            if reset > today:
+                return 0
+
+            (until, _), (before, _) = await asyncio.gather(
+                self._cumulative_at(sensor_serial_number, meta, today),
+                self._cumulative_at(sensor_serial_number, meta, reset - timedelta(days=1)))
+            return until - before
+
+        except Exception as e:
+            logging.error(
+                f"Error in calculate_sensor_gdd for sensor {sensor_serial_number}: {e}")
+            raise
+
+    async def calculate_sensors_gdd(self, sensor_reset_dates: List[Tuple[str, datetime]],
+                                    max_workers: int = GDD_QUERY_CONCURRENCY) -> Dict[str, float]:
+        """
+        Current GDD for many sensors at once, with up to `max_workers`
+        sensors queried concurrently. Returns {serial: GDD}.
+        """
+        semaphore = asyncio.Semaphore(max(1, max_workers))
+
+        async def sensor_gdd(serial, reset_date):
+            async with semaphore:
+                return serial, await self.calculate_sensor_gdd(serial, reset_date)
+
+        return dict(await asyncio.gather(*(
+            sensor_gdd(serial, reset_date) for serial, reset_date in sensor_reset_dates)))
+
+    async def get_gdd_series(self, partition_key: str, latest_reset_date: datetime) -> Dict:
+        """
+        Daily, cumulative and current GDD from one pass over the sensor's GDD
+        data, as AzureTableService.get_gdd_series, with the index query and
+        the row before the reset date read concurrently.
+        """
+        table_name = CUMULATIVE_GDD_TABLE
+        try:
+            meta = await self.get_cumulative_gdd_meta(partition_key)
+            if meta is None:
+                table_name = "gdddata"
+                entities = await self._query(
+                    table_name,
+                    AzureTableService._scan_forecast_range(
+                        partition_key, latest_reset_date),
+                    select=["RowKey", "GddActual", "GddForecast"])
+                return AzureTableService._gdd_series_from_days(entities, latest_reset_date)
+
+            (base, _), entities = await asyncio.gather(
+                self._cumulative_at(
+                    partition_key, meta, latest_reset_date.date() - timedelta(days=1)),
+                self._query(
+                    table_name,
+                    AzureTableService._cumulative_forecast_range(
+                        partition_key, latest_reset_date),
+                    select=["RowKey", "DailyGdd", "Cumulative", "HasData"]))
+            until = AzureTableService._current_cumulative(
+                meta, latest_reset_date, entities)
+            if until is None:
+                # Today is past the end of the index, outside the queried range
+                until, _ = await self._cumulative_at(partition_key, meta, datetime.now().date())
+            return AzureTableService._gdd_series_from_index(entities, base, until, latest_reset_date)
+
+        except Exception as e:
+            self.invalidate_if_table_missing(table_name, e)
+            logging.error(
+                f"Error calculating GDD series for sensor {partition_key}: {e}")
+            raise
+
+    async def get_field_dashboard_series(self, partition_key: str, latest_reset_date: datetime) -> Dict:
+        """
+        Weather forecast and GDD series of a sensor in one dict, with the
+        weatherdata and GDD queries running concurrently.
+        """
+        weather, gdd = await asyncio.gather(
+            self.get_weather_forecast_series(partition_key),
+            self.get_gdd_series(partition_key, latest_reset_date))
+        return {**weather, **gdd}
+
+    async def get_field_dashboard_summary(self, field_id: str) -> Optional[Tuple[Dict, Dict[str, Dict]]]:
+        """
+        A field's summary row and {serial: sensor summary}, read with one
+        partition query, or None if the field has no summary.
+        """
+        table_name = DASHBOARD_SUMMARY_TABLE
+        try:
+            entities = await self._query(table_name, (field_id, None, None))
+            return AzureTableService._split_dashboard_summary(entities)
+
+        except Exception as e:
+            self.invalidate_if_table_missing(table_name, e)
+            logging.error(
+                f"Error reading dashboard summary for field {field_id}: {e}")
+            raise
+
+    async def get_field_summaries(self, field_ids: List[str],
+                                  max_workers: int = GDD_QUERY_CONCURRENCY) -> Dict[str, Dict]:
+        """
+        Field summary rows for many fields, read with concurrent point reads.
+        Fields without a summary are left out.
+        """
+        field_ids = list(dict.fromkeys(field_ids))
+        semaphore = asyncio.Semaphore(max(1, max_workers))
+
+        async def read(field_id):
+            async with semaphore:
+                return await self._get_entity(DASHBOARD_SUMMARY_TABLE, field_id, DASHBOARD_SUMMARY_FIELD_ROW)
+
+        summaries = await asyncio.gather(*(read(field_id) for field_id in field_ids))
+        return {field_id: summary for field_id, summary in zip(field_ids, summaries) if summary is not None}
@@ -0,0 +1,337 @@
+# cold_storage.py
+"""
+Columnar cold storage for closed months of weatherdata.
+
+weatherdata keeps one entity per partition (sensor or forecast grid cell) and
+hour. Compaction rolls the rows of a closed calendar month into a few blocks
+in the `weathercold` table, one array per column, and deletes the hot rows.
+Reads merge the blocks with whatever hot rows remain, so late readings for a
+compacted month are still seen, and folded in by the next compaction.
+
+Per month, a weathercold partition holds:
+- "<YYYY-MM>": the status marker. Status is "written" once blocks hold the
+  month and "compacted" once its hot rows are deleted; Generation, Parts,
+  Rows, Columns and Integers (JSON lists) describe the current blocks.
+- "<YYYY-MM>#<generation>#<part>": blocks of at most BLOCK_ROWS rows with
+  Offsets (seconds since the month start, int32) and C0, C1, ... (one per
+  column, float64 with NaN where a row has no value), each a zlib-compressed
+  little-endian array, as numpy.frombuffer reads it.
+
+Blocks of a new generation are written before the marker points to them and
+hot rows are deleted only after that, so a compaction interrupted at any
+step leaves readable data, and running it again finishes it.
+"""
+import json
+import math
+import sys
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+WEATHER_TABLE = "weatherdata"
+COLD_WEATHER_TABLE = "weathercold"
+
+# A float64 column of a block stays under the 64 KiB limit of a binary property
+BLOCK_ROWS = 8000
+# Blocks with many columns get fewer rows, to stay under the 1 MiB entity limit
+MAX_BLOCK_BYTES = 900_000
+
+STATUS_WRITTEN = "written"
+STATUS_COMPACTED = "compacted"
+
+ROW_KEY_FORMAT = "%Y-%m-%d %H:%M:%S"
+KEY_PROPERTIES = ("PartitionKey", "RowKey")
+
+
+def current_month() -> str:
+    return datetime.now().strftime("%Y-%m")
+
+
+def previous_month(month: str) -> str:
+    return (datetime.strptime(month, "%Y-%m") - timedelta(days=1)).strftime("%Y-%m")
+
+
+def month_bounds(month: str) -> Tuple[str, str]:
+    """
+    First and last RowKey a month's rows can have.
+    """
+    return f"{month}-01", f"{month}-31 23:59:59"
+
+
+def _pack(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return zlib.compress(values.tobytes())
+
+
+def _unpack(typecode: str, blob: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(zlib.decompress(blob))
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def merge_rows(cold: Iterable[Dict], hot: Iterable[Dict], partition_key: str = None) -> Iterator[Dict]:
+    """
+    Merge two row streams ordered by (PartitionKey, RowKey). Where both hold a
+    row, its hot values win, as a merge upsert of the hot row would.
+    """
+    def key(row):
+        return partition_key or row["PartitionKey"], row["RowKey"]
+
+    cold, hot = iter(cold), iter(hot)
+    cold_row, hot_row = next(cold, None), next(hot, None)
+    while cold_row is not None and hot_row is not None:
+        cold_key, hot_key = key(cold_row), key(hot_row)
+        if cold_key < hot_key:
+            yield cold_row
+            cold_row = next(cold, None)
+        elif hot_key < cold_key:
+            yield hot_row
+            hot_row = next(hot, None)
+        else:
+            yield {**cold_row, **{name: value for name, value in hot_row.items() if value is not None}}
+            cold_row, hot_row = next(cold, None), next(hot, None)
+
+    # Usually one side is empty: pass the other through
+    for row, rest in ((cold_row, cold), (hot_row, hot)):
+        if row is not None:
+            yield row
+            yield from rest
+
+
+class ColdWeatherStore:
+    """
+    Compacts closed months of weatherdata into columnar blocks and reads them
+    back as rows, on any TableStorage backend.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    @staticmethod
+    def may_hold(low: Optional[str]) -> bool:
+        """
+        Whether rows from RowKey `low` on can be in cold storage. The current
+        month is never compacted, so reads within it skip the cold table.
+        """
+        return low is None or low < f"{current_month()}-01"
+
+    # Reading
+
+    def iter_rows(self, partition_key: Optional[str], low: str = None, high: str = None,
+                  select: List[str] = None) -> Iterator[Dict]:
+        """
+        Compacted rows of a partition (all partitions without one) with
+        RowKey in [low, high], in (PartitionKey, RowKey) order. With `select`,
+        only those properties are returned, as TableStorage.query does.
+        """
+        marker = None
+        for entity in self.storage.query(COLD_WEATHER_TABLE, partition_key,
+                                         low[:7] if low else None, f"{high[:7]}#~" if high else None):
+            if "#" not in entity["RowKey"]:
+                marker = entity
+            elif marker is not None and marker["PartitionKey"] == entity["PartitionKey"] and \
+                    entity["RowKey"].startswith(self._generation_prefix(marker["RowKey"], marker["Generation"])):
+                # Blocks of older generations are skipped until they are deleted
+                yield from self._decode_block(marker, entity, low, high, select)
+
+    @staticmethod
+    def _generation_prefix(month: str, generation: int) -> str:
+        return f"{month}#{generation:06d}#"
+
+    def _decode_block(self, marker: Dict, block: Dict, low: str = None, high: str = None,
+                      select: List[str] = None) -> Iterator[Dict]:
+        start = datetime.strptime(marker["RowKey"], "%Y-%m")
+        columns = json.loads(marker["Columns"])
+        integers = set(json.loads(marker.get("Integers") or "[]"))
+        wanted = [(index, column) for index, column in enumerate(columns)
+                  if select is None or column in select]
+        with_partition_key = select is None or "PartitionKey" in select
+
+        # Offsets are sorted; compare them instead of formatting every RowKey
+        offsets = _unpack("i", block["Offsets"])
+        first, last = 0, len(offsets)
+        if low is not None and low[:7] == marker["RowKey"]:
+            first = bisect_left(offsets, self._offset(low, start))
+        if high is not None and high[:7] == marker["RowKey"]:
+            # A date alone sorts before every RowKey of that day
+            last = bisect_left(offsets, self._offset(high, start)) if len(high) <= 10 \
+                else bisect_right(offsets, self._offset(high, start))
+
+        values = [(column, _unpack("d", block[f"C{index}"]), column in integers) for index, column in wanted]
+        # Format RowKeys from a per-day prefix; strftime per row is the slowest part
+        days = {}
+        for position in range(first, last):
+            day, seconds = divmod(offsets[position], 86400)
+            prefix = days.get(day)
+            if prefix is None:
+                prefix = days[day] = (start + timedelta(days=day)).strftime("%Y-%m-%d")
+            row = {"PartitionKey": marker["PartitionKey"]} if with_partition_key else {}
+            row["RowKey"] = f"{prefix} {seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+            for column, column_values, integer in values:
+                value = column_values[position]
+                if not math.isnan(value):
+                    row[column] = int(value) if integer else value
+            yield row
+
+    @staticmethod
+    def _offset(row_key: str, start: datetime) -> int:
+        moment = datetime.strptime(row_key, ROW_KEY_FORMAT if len(row_key) > 10 else "%Y-%m-%d")
+        return int((moment - start).total_seconds())
+
+    def _read_month(self, marker: Dict) -> Dict[str, Dict]:
+        prefix = self._generation_prefix(marker["RowKey"], marker["Generation"])
+        rows = {}
+        for block in self.storage.query(COLD_WEATHER_TABLE, marker["PartitionKey"], prefix, f"{prefix}~"):
+            for row in self._decode_block(marker, block):
+                row_key = row.pop("RowKey")
+                row.pop("PartitionKey")
+                rows[row_key] = row
+        return rows
+
+    # Compaction
+
+    @staticmethod
+    def _compactable(entity: Dict, month: str) -> bool:
+        # Rows with other RowKeys or non-numeric values stay hot
+        try:
+            datetime.strptime(entity["RowKey"], ROW_KEY_FORMAT)
+        except ValueError:
+            return False
+        return entity["RowKey"].startswith(month) and all(
+            value is None or _is_number(value)
+            for name, value in entity.items() if name not in KEY_PROPERTIES)
+
+    def _encode_blocks(self, partition_key: str, month: str, generation: int,
+                       rows: Dict[str, Dict]) -> Tuple[List[str], List[str], List[Dict]]:
+        columns = sorted({column for values in rows.values() for column in values})
+        integers = [column for column in columns
+                    if all(isinstance(values[column], int) for values in rows.values() if column in values)]
+        start = datetime.strptime(month, "%Y-%m")
+        per_block = max(1, min(BLOCK_ROWS, MAX_BLOCK_BYTES // (8 * len(columns) + 4)))
+        prefix = self._generation_prefix(month, generation)
+
+        row_keys = sorted(rows)
+        blocks = []
+        for part, first in enumerate(range(0, len(row_keys), per_block)):
+            keys = row_keys[first:first + per_block]
+            block = {
+                "PartitionKey": partition_key,
+                "RowKey": f"{prefix}{part:04d}",
+                "Offsets": _pack(array("i", (
+                    int((datetime.strptime(row_key, ROW_KEY_FORMAT) - start).total_seconds()) for row_key in keys))),
+            }
+            for index, column in enumerate(columns):
+                block[f"C{index}"] = _pack(array("d", (
+                    float(rows[row_key].get(column, math.nan)) for row_key in keys)))
+            blocks.append(block)
+        return columns, integers, blocks
+
+    def _write_generation(self, partition_key: str, month: str, rows: Dict[str, Dict],
+                          marker: Optional[Dict]) -> Dict:
+        generation = (marker or {}).get("Generation", 0) + 1
+        columns, integers, blocks = self._encode_blocks(
+            partition_key, month, generation, rows)
+        # One block per batch: several would exceed the transaction size limit
+        for block in blocks:
+            self.storage.upsert_batch(COLD_WEATHER_TABLE, [block], replace=True)
+
+        marker = {
+            "PartitionKey": partition_key,
+            "RowKey": month,
+            "Status": STATUS_WRITTEN,
+            "Generation": generation,
+            "Parts": len(blocks),
+            "Rows": len(rows),
+            "Columns": json.dumps(columns),
+            "Integers": json.dumps(integers),
+        }
+        self.storage.upsert_batch(COLD_WEATHER_TABLE, [marker], replace=True)
+
+        # Blocks of older generations are unreachable now
+        prefix = self._generation_prefix(month, generation)
+        stale = [(partition_key, block["RowKey"])
+                 for block in self.storage.query(COLD_WEATHER_TABLE, partition_key, f"{month}#", f"{month}#~",
+                                                 select=["RowKey"])
+                 if not block["RowKey"].startswith(prefix)]
+        if stale:
+            self.storage.delete_batch(COLD_WEATHER_TABLE, stale)
+        return marker
+
+    def compact_month(self, partition_key: str, month: str) -> int:
+        """
+        Move the hot rows of one partition and closed month ('YYYY-MM') into
+        its blocks, merging them with rows compacted before. Returns the
+        number of hot rows moved; 0 if the month was already compacted.
+        """
+        if month >= current_month():
+            raise ValueError(f"Month {month} is not closed yet")
+
+        low, high = month_bounds(month)
+        hot = [entity for entity in self.storage.query(WEATHER_TABLE, partition_key, low, high)
+               if self._compactable(entity, month)]
+        marker = self.storage.get_entity(COLD_WEATHER_TABLE, partition_key, month)
+        if marker is None and not hot:
+            return 0
+        if marker is not None and marker.get("Status") == STATUS_COMPACTED and not hot:
+            return 0
+
+        # Only rewrite the blocks if the hot rows add or change values
+        rows = self._read_month(marker) if marker is not None else {}
+        changed = False
+        for entity in hot:
+            stored = rows.setdefault(entity["RowKey"], {})
+            for name, value in entity.items():
+                if name not in KEY_PROPERTIES and value is not None and stored.get(name) != value:
+                    stored[name] = value
+                    changed = True
+        if changed:
+            marker = self._write_generation(partition_key, month, rows, marker)
+
+        if hot:
+            self.storage.delete_batch(
+                WEATHER_TABLE, [(partition_key, entity["RowKey"]) for entity in hot])
+        if marker is None:
+            # The hot rows held no values: there are no blocks to mark
+            return len(hot)
+        if marker.get("Status") != STATUS_COMPACTED:
+            self.storage.upsert_batch(COLD_WEATHER_TABLE, [{
+                "PartitionKey": partition_key, "RowKey": month, "Status": STATUS_COMPACTED}])
+        return len(hot)
+
+    def pending_months(self, partition_key: str, before_month: str) -> List[str]:
+        """
+        Months before `before_month` of a partition that still have hot rows
+        or an unfinished compaction.
+        """
+        last = month_bounds(previous_month(before_month))[1]
+        months = {entity["RowKey"][:7]
+                  for entity in self.storage.query(WEATHER_TABLE, partition_key, None, last)
+                  if self._compactable(entity, entity["RowKey"][:7])}
+        months.update(
+            entity["RowKey"]
+            for entity in self.storage.query(COLD_WEATHER_TABLE, partition_key, None, f"{last[:7]}#~",
+                                             select=["RowKey", "Status"])
+            if "#" not in entity["RowKey"] and entity.get("Status") != STATUS_COMPACTED)
+        return sorted(month for month in months if month < before_month)
+
+    def compact_partition(self, partition_key: str, before_month: str) -> Dict[str, int]:
+        """
+        Compact every pending month of a partition before `before_month`
+        (never later than the current month), oldest first.
+        """
+        before_month = min(before_month, current_month())
+        stats = {"months": 0, "rows": 0}
+        for month in self.pending_months(partition_key, before_month):
+            stats["rows"] += self.compact_month(partition_key, month)
+            stats["months"] += 1
+        return stats
@@ -1,6 +1,11 @@
 from .service import AzureTableService
+from .async_service import AsyncAzureTableService
 
 azure_service_instance = AzureTableService()
+azure_async_service_instance = AsyncAzureTableService()
 
 def get_azure_table_service():
     return azure_service_instance
+
+async def get_async_azure_table_service():
+    return azure_async_service_instance
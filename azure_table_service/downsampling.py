@@ -0,0 +1,140 @@
+# downsampling.py
+"""
+Streaming downsampling of long time series to a requested number of points.
+
+Rows are fed one at a time in time order, so a series can be reduced while
+it is read from table storage page by page:
+- BucketDownsampler: fixed-width time buckets with min, max, mean and count
+- LTTBDownsampler: Largest-Triangle-Three-Buckets, keeping real points that
+  preserve the visual shape of the series
+"""
+import heapq
+from datetime import datetime
+from itertools import groupby
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+DOWNSAMPLING_METHODS = ("buckets", "lttb")
+
+
+def merge_mean(series: List[Iterable[Tuple[datetime, float]]]) -> Iterator[Tuple[datetime, float]]:
+    """
+    Merge time-ordered (timestamp, value) streams into one, averaging the
+    values that share a timestamp. Holds one item per stream in memory.
+    """
+    merged = heapq.merge(*series, key=lambda item: item[0])
+    for timestamp, items in groupby(merged, key=lambda item: item[0]):
+        total, count = 0.0, 0
+        for _, value in items:
+            total += value
+            count += 1
+        yield timestamp, total / count
+
+
+class BucketDownsampler:
+    """
+    Fixed-width time buckets over [start, end) keeping the min, max, mean and
+    count of each, so memory is bounded by `points` rather than the rows read.
+    """
+
+    def __init__(self, start: datetime, end: datetime, points: int):
+        self.start = start
+        self.points = points
+        self.width = (end - start) / points
+        # bucket index -> [count, sum, min, max]
+        self._buckets = {}
+
+    def add(self, timestamp: datetime, value: float):
+        index = min(self.points - 1, max(0, int((timestamp - self.start) / self.width)))
+        bucket = self._buckets.get(index)
+        if bucket is None:
+            self._buckets[index] = [1, value, value, value]
+            return
+        bucket[0] += 1
+        bucket[1] += value
+        if value < bucket[2]:
+            bucket[2] = value
+        if value > bucket[3]:
+            bucket[3] = value
+
+    def result(self) -> List[Dict]:
+        return [
+            {"date": self.start + self.width * index, "value": total / count,
+             "min": minimum, "max": maximum, "count": count}
+            for index, (count, total, minimum, maximum) in sorted(self._buckets.items())
+        ]
+
+
+class LTTBDownsampler:
+    """
+    Largest-Triangle-Three-Buckets over time-ordered points, streamed: the
+    first and last points are kept, and from each of `points` - 2 fixed-width
+    time buckets the point forming the largest triangle with the previously
+    kept point and the mean of the next bucket. Only the bucket being chosen
+    from and the one after it are held in memory.
+    """
+
+    def __init__(self, start: datetime, end: datetime, points: int):
+        self.start = start
+        self.buckets = max(1, points - 2)
+        self.width = (end - start).total_seconds() / self.buckets
+        self._selected = []
+        # The latest point, kept out of the buckets until another one arrives,
+        # so the last point of the stream is never bucketed
+        self._held = None
+        # Bucket waiting for the mean of the next one: [(x, timestamp, value)]
+        self._pending = None
+        self._current = None
+        self._current_index = None
+
+    def add(self, timestamp: datetime, value: float):
+        point = ((timestamp - self.start).total_seconds(), timestamp, value)
+        if not self._selected:
+            self._selected.append(point)
+            return
+        if self._held is not None:
+            self._bucket(self._held)
+        self._held = point
+
+    def _bucket(self, point):
+        index = min(self.buckets - 1, max(0, int(point[0] / self.width)))
+        if index != self._current_index:
+            if self._current:
+                self._close_current()
+            self._current, self._current_index = [], index
+        self._current.append(point)
+
+    def _close_current(self):
+        if self._pending:
+            self._select(self._pending, self._mean(self._current))
+        self._pending = self._current
+
+    @staticmethod
+    def _mean(bucket) -> Tuple[float, float]:
+        return (sum(point[0] for point in bucket) / len(bucket),
+                sum(point[2] for point in bucket) / len(bucket))
+
+    def _select(self, bucket, next_point: Tuple[float, float]):
+        previous_x, _, previous_y = self._selected[-1]
+        next_x, next_y = next_point
+        # Twice the triangle area; the factor doesn't change the maximum
+        self._selected.append(max(bucket, key=lambda point: abs(
+            (previous_x - next_x) * (point[2] - previous_y) - (previous_x - point[0]) * (next_y - previous_y))))
+
+    def result(self) -> List[Dict]:
+        if self._current:
+            self._close_current()
+            self._current, self._current_index = None, None
+        if self._pending:
+            last = self._held or self._pending[-1]
+            self._select(self._pending, (last[0], last[2]))
+            self._pending = None
+        if self._held is not None:
+            self._selected.append(self._held)
+            self._held = None
+        return [{"date": timestamp, "value": value} for _, timestamp, value in self._selected]
+
+
+def downsampler(method: str, start: datetime, end: datetime, points: int):
+    if method == "lttb":
+        return LTTBDownsampler(start, end, points)
+    return BucketDownsampler(start, end, points)
@@ -0,0 +1,189 @@
+# gdd_engine.py
+"""
+Vectorized GDD calculations for many sensors at once.
+
+Readings are loaded into columnar NumPy arrays (sensor index, day ordinal,
+temperature) and laid out as a dense sensors x days matrix, so daily means,
+cumulative GDD since each sensor's reset date, current GDD and cutting dates
+are computed for the whole batch with grouped reductions instead of
+per-record Python loops.
+
+The results match the per-sensor AzureTableService calculations:
+- the daily value of a day is GddActual if it is non-zero, else GddForecast
+- days without a gdddata row do not count and cannot be a cutting date
+- cumulative sums run day by day in date order, like the Python loops
+
+NumPy is not a service dependency; install benchmarks/requirements.txt to
+use this module.
+"""
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+class GddBatch:
+    """
+    Dense per-day matrices for a batch of sensors, covering the days
+    `first_ordinal` .. `first_ordinal + n_days - 1`.
+    """
+
+    def __init__(self, serials: List[str], first_ordinal: int, n_days: int):
+        self.serials = list(serials)
+        self.index = {serial: i for i, serial in enumerate(self.serials)}
+        self.first_ordinal = first_ordinal
+        self.n_days = n_days
+        shape = (len(self.serials), n_days)
+        self.actual = np.full(shape, np.nan)
+        self.forecast = np.full(shape, np.nan)
+
+    def column(self, ordinals: np.ndarray) -> np.ndarray:
+        return np.asarray(ordinals) - self.first_ordinal
+
+    def dates(self) -> List[date]:
+        return [date.fromordinal(self.first_ordinal + i) for i in range(self.n_days)]
+
+
+def columns_from_records(serial_index: Dict[str, int], records: Iterable[Dict], column: str,
+                         partition_key: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Convert weatherdata entities ('YYYY-MM-DD HH:MM:SS' RowKeys) into
+    (sensor index, day ordinal, value) arrays, skipping rows without `column`.
+    `partition_key` overrides the entity's PartitionKey (e.g. forecasts that
+    are stored per grid cell but belong to a sensor).
+    """
+    sensors, days, values = [], [], []
+    ordinals = {}
+    for record in records:
+        value = record.get(column)
+        if value is None:
+            continue
+        day = record["RowKey"][:10]
+        ordinal = ordinals.get(day)
+        if ordinal is None:
+            ordinal = ordinals[day] = date.fromisoformat(day).toordinal()
+        sensors.append(serial_index[partition_key or record["PartitionKey"]])
+        days.append(ordinal)
+        values.append(value)
+    return (np.asarray(sensors, dtype=np.int64),
+            np.asarray(days, dtype=np.int64),
+            np.asarray(values, dtype=np.float64))
+
+
+def daily_means(sensor_index: np.ndarray, day_ordinal: np.ndarray, values: np.ndarray,
+                n_sensors: int, first_ordinal: int, n_days: int) -> np.ndarray:
+    """
+    Mean value per sensor and day as an (n_sensors, n_days) matrix, NaN where
+    a day has no readings. Readings outside the day range are ignored.
+    """
+    columns = day_ordinal - first_ordinal
+    inside = (columns >= 0) & (columns < n_days)
+    cells = sensor_index[inside] * n_days + columns[inside]
+
+    size = n_sensors * n_days
+    # bincount accumulates in input order, like sum() over the same rows
+    sums = np.bincount(cells, weights=values[inside], minlength=size)
+    counts = np.bincount(cells, minlength=size)
+
+    means = np.full(size, np.nan)
+    present = counts > 0
+    means[present] = sums[present] / counts[present]
+    return means.reshape(n_sensors, n_days)
+
+
+def daily_gdd(actual: np.ndarray, forecast: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Daily GDD (actual if non-zero, else forecast) and a mask of days that have
+    any value. Days without a value contribute 0.
+    """
+    use_actual = ~np.isnan(actual) & (actual != 0)
+    gdd = np.where(use_actual, actual, forecast)
+    present = ~np.isnan(actual) | ~np.isnan(forecast)
+    return np.nan_to_num(gdd, nan=0.0), present
+
+
+def cumulative_since_reset(gdd: np.ndarray, first_ordinal: int, reset_ordinals: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cumulative GDD per sensor counted from its reset date (0 before it), and
+    the mask of days on or after the reset date.
+    """
+    n_days = gdd.shape[1]
+    day_columns = np.arange(n_days)
+    reset_columns = np.asarray(reset_ordinals) - first_ordinal
+    since_reset = day_columns[None, :] >= reset_columns[:, None]
+    return np.cumsum(np.where(since_reset, gdd, 0.0), axis=1), since_reset
+
+
+def current_gdd(cumulative: np.ndarray, first_ordinal: int, today_ordinal: int) -> np.ndarray:
+    """
+    GDD accumulated from each sensor's reset date up to and including today.
+    """
+    n_sensors, n_days = cumulative.shape
+    column = today_ordinal - first_ordinal
+    if column < 0 or n_days == 0:
+        return np.zeros(n_sensors)
+    return cumulative[:, min(column, n_days - 1)].copy()
+
+
+def cutting_dates(cumulative: np.ndarray, present: np.ndarray, since_reset: np.ndarray,
+                  first_ordinal: int, optimal_gdd: np.ndarray) -> np.ndarray:
+    """
+    Ordinal of the first day with data on or after the reset date where the
+    cumulative GDD reaches the sensor's optimal GDD, or -1 if it never does.
+    """
+    reached = (cumulative >= np.asarray(optimal_gdd, dtype=np.float64)[:, None]) & present & since_reset
+    first_column = np.argmax(reached, axis=1)
+    return np.where(reached.any(axis=1), first_column + first_ordinal, -1)
+
+
+def load_batch(serials: List[str], actual_readings: Iterable[Dict], forecast_readings: Dict[str, Iterable[Dict]],
+               first_day: date, last_day: date) -> GddBatch:
+    """
+    Build a GddBatch from weatherdata entities: actual readings for all
+    sensors (PartitionKey = serial) and forecast readings per sensor serial.
+    """
+    first_ordinal = first_day.toordinal()
+    n_days = last_day.toordinal() - first_ordinal + 1
+    batch = GddBatch(serials, first_ordinal, n_days)
+
+    sensors, days, values = columns_from_records(
+        batch.index, actual_readings, "temperature_actual")
+    batch.actual = daily_means(
+        sensors, days, values, len(serials), first_ordinal, n_days)
+
+    parts = [columns_from_records(batch.index, records, "air_temperature", partition_key=serial)
+             for serial, records in forecast_readings.items()]
+    if parts:
+        sensors, days, values = (np.concatenate(arrays) for arrays in zip(*parts))
+        batch.forecast = daily_means(
+            sensors, days, values, len(serials), first_ordinal, n_days)
+    return batch
+
+
+def compute(batch: GddBatch, reset_dates: Dict[str, datetime], optimal_gdd: Dict[str, float],
+            today: Optional[date] = None) -> Dict[str, Dict]:
+    """
+    Current GDD and cutting date for every sensor of the batch, keyed by
+    serial: {"current_gdd": float, "cutting_date": datetime or None}.
+    """
+    today = today or datetime.now().date()
+    reset_ordinals = np.array(
+        [reset_dates[serial].date().toordinal() for serial in batch.serials], dtype=np.int64)
+    optimal = np.array([optimal_gdd[serial]
+                       for serial in batch.serials], dtype=np.float64)
+
+    gdd, present = daily_gdd(batch.actual, batch.forecast)
+    cumulative, since_reset = cumulative_since_reset(
+        gdd, batch.first_ordinal, reset_ordinals)
+    current = current_gdd(cumulative, batch.first_ordinal, today.toordinal())
+    cutting = cutting_dates(cumulative, present, since_reset,
+                            batch.first_ordinal, optimal)
+
+    return {
+        serial: {
+            "current_gdd": float(current[i]),
+            "cutting_date": datetime.combine(date.fromordinal(int(cutting[i])), datetime.min.time())
+            if cutting[i] >= 0 else None,
+        }
+        for i, serial in enumerate(batch.serials)
+    }
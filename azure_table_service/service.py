@@ -1,60 +1,141 @@
+import json
 import logging
 import random
+import threading
+import time
 from collections import defaultdict
-from azure.data.tables import TableServiceClient, TableClient
-from azure.core.exceptions import ResourceNotFoundError
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Dict, Optional, Tuple
 import os
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from azure_table_service.cold_storage import ColdWeatherStore, merge_rows
+from azure_table_service.downsampling import downsampler, merge_mean
+from azure_table_service.storage import (
+    TableStorage, aggregate_daily, create_table_storage)
+
+# Sensor serial -> forecast grid cell mapping
+SENSOR_CELLS_TABLE = "sensorcells"
+SENSOR_CELLS_PARTITION = "sensorcell"
+SENSOR_CELL_CACHE_TTL_SEC = int(os.getenv("SENSOR_CELL_CACHE_TTL_SEC", 600))
+
+# Per-sensor prefix sums of daily GDD: one row per date from the first to the
+# last gdddata day (gaps filled with 0), plus a meta row with the date bounds
+CUMULATIVE_GDD_TABLE = "gddcumulative"
+CUMULATIVE_GDD_META_ROW = "meta"
+
+# Dashboard read model written by the DataProcessor: one partition per field
+# with a field summary row and one row per sensor
+DASHBOARD_SUMMARY_TABLE = "dashboardsummary"
+DASHBOARD_SUMMARY_FIELD_ROW = "_field"
+# Older summaries are ignored and the dashboards are computed live
+DASHBOARD_SUMMARY_MAX_AGE_SEC = int(
+    os.getenv("DASHBOARD_SUMMARY_MAX_AGE_SEC", 900))
+
+# Parallel partition queries in the batched GDD lookups
+GDD_QUERY_CONCURRENCY = int(os.getenv("GDD_QUERY_CONCURRENCY", 16))
 
 
 class AzureTableService:
-    def __init__(self):
-        # Fetch Azure Table Storage connection string from environment variables
-        self.connection_string = os.getenv(
-            'AZURE_STORAGE_SERVICE', "UseDevelopmentStorage=true")
-        self.service_client = TableServiceClient.from_connection_string(
-            conn_str=self.connection_string)
+    _shared_lock = threading.Lock()
+    # Sensor serial -> (forecast partition, time it was resolved)
+    _forecast_partitions = {}
 
-    def get_table_client(self, table_name: str) -> TableClient:
-
-        return self.service_client.get_table_client(table_name)
+    def __init__(self, storage: TableStorage = None):
+        # Azure Table Storage or the embedded backend, per TABLE_STORAGE_BACKEND
+        self.storage = storage or create_table_storage()
+        # Closed months of weatherdata compacted into columnar blocks
+        self.cold_weather = ColdWeatherStore(self.storage)
 
     def create_table_if_not_exists(self, table_name: str):
+        self.storage.create_table(table_name)
+
+    def iter_weather_rows(self, partition_key: Optional[str], low: str = None, high: str = None,
+                          select: List[str] = None) -> Iterator[Dict]:
+        """
+        weatherdata rows of a partition (all partitions without one) with
+        RowKey in [low, high], as TableStorage.query returns them, with the
+        compacted months merged in.
+        """
+        if not self.cold_weather.may_hold(low):
+            return self.storage.query("weatherdata", partition_key, low, high, select=select)
+
+        # Rows of all partitions are merged by (PartitionKey, RowKey)
+        strip_partition_key = partition_key is None and select is not None and "PartitionKey" not in select
+        if strip_partition_key:
+            select = ["PartitionKey", *select]
+        rows = merge_rows(
+            self.cold_weather.iter_rows(partition_key, low, high, select),
+            self.storage.query("weatherdata", partition_key, low, high, select=select),
+            partition_key)
+        if strip_partition_key:
+            return ({name: value for name, value in row.items() if name != "PartitionKey"} for row in rows)
+        return rows
+
+    def compact_weather(self, partition_key: str, before_month: str) -> Dict[str, int]:
+        """
+        Compact the weatherdata rows of a partition in the months before
+        `before_month` ('YYYY-MM') into cold storage. Safe to run again after
+        an interruption. Returns {"months", "rows"} compacted.
+        """
         try:
-            service_client = TableServiceClient.from_connection_string(
-                self.connection_string)
-            table_client = service_client.create_table_if_not_exists(
-                table_name)
-            print(f"Table '{table_name}' is ready.")
+            return self.cold_weather.compact_partition(partition_key, before_month)
+
         except Exception as e:
-            print(f"Error creating table '{table_name}': {str(e)}")
+            logging.error(
+                f"Error compacting weather data for PartitionKey '{partition_key}': {e}")
+            raise
+
+    def set_forecast_cells(self, sensor_cells: Dict[str, str]):
+        """
+        Record which forecast grid cell each sensor serial reads its forecast
+        from. Only mappings that differ from the cached ones are written.
+        """
+        now = time.monotonic()
+        changed = [
+            {
+                "PartitionKey": SENSOR_CELLS_PARTITION,
+                "RowKey": serial,
+                "CellKey": cell_key,
+            }
+            for serial, cell_key in sensor_cells.items()
+            if AzureTableService._forecast_partitions.get(serial, (None, 0))[0] != cell_key
+        ]
+        if changed:
+            self.upsert_entities_batch(SENSOR_CELLS_TABLE, changed)
+            logging.info(
+                f"Updated forecast cell mapping for {len(changed)} sensors.")
+
+        with AzureTableService._shared_lock:
+            for serial, cell_key in sensor_cells.items():
+                AzureTableService._forecast_partitions[serial] = (cell_key, now)
+
+    def get_forecast_partition(self, sensor_serial_number: str) -> str:
+        """
+        Resolve the weatherdata partition holding a sensor's forecast: its grid
+        cell if one is mapped, otherwise the serial itself (per-sensor forecasts).
+        """
+        cached = AzureTableService._forecast_partitions.get(
+            sensor_serial_number)
+        if cached and time.monotonic() - cached[1] < SENSOR_CELL_CACHE_TTL_SEC:
+            return cached[0]
+
+        entity = self.storage.get_entity(
+            SENSOR_CELLS_TABLE, SENSOR_CELLS_PARTITION, sensor_serial_number)
+        partition_key = entity["CellKey"] if entity else sensor_serial_number
+
+        with AzureTableService._shared_lock:
+            AzureTableService._forecast_partitions[sensor_serial_number] = (
+                partition_key, time.monotonic())
+        return partition_key
 
     def get_weather_data_with_air_temperature(self, partition_key: str = None) -> List[Dict]:
 
         table_name = "weatherdata"
 
         try:
-            # Ensure the table exists (optional, but useful if the function is called prematurely)
-            self.create_table_if_not_exists(table_name)
-
-            # Get the table client
-            table_client = self.get_table_client(table_name)
-
-            # Query entities with optional PartitionKey filter
-            if partition_key:
-                # When filtering by PartitionKey
-                query_filter = f"PartitionKey eq '{partition_key}'"
-                entities = table_client.query_entities(
-                    query_filter=query_filter,
-                    select=["PartitionKey", "RowKey", "air_temperature"]
-                )
-            else:
-                # When no filter is provided
-                entities = table_client.query_entities(
-                    query_filter="",
-                    select=["PartitionKey", "RowKey", "air_temperature"]
-                )
+            # Query entities with optional PartitionKey filter; a missing table has none
+            entities = self.iter_weather_rows(
+                partition_key or None, select=["PartitionKey", "RowKey", "air_temperature"])
 
             # Convert to a list of dictionaries
             weather_data = [entity for entity in entities]
@@ -63,9 +144,6 @@ class AzureTableService:
                 f"Retrieved {len(weather_data)} records with PartitionKey '{partition_key or 'ALL'}' from table '{table_name}'.")
             return weather_data
 
-        except ResourceNotFoundError:
-            logging.error(f"Table '{table_name}' does not exist.")
-            return []
         except Exception as e:
             logging.error(
                 f"Error fetching weather data from table '{table_name}': {e}")
@@ -76,26 +154,9 @@ class AzureTableService:
         table_name = "weatherdata"
 
         try:
-            # Ensure the table exists (optional, but useful if the function is called prematurely)
-            self.create_table_if_not_exists(table_name)
-
-            # Get the table client
-            table_client = self.get_table_client(table_name)
-
-            # Query entities with optional PartitionKey filter
-            if partition_key:
-                # When filtering by PartitionKey
-                query_filter = f"PartitionKey eq '{partition_key}'"
-                entities = table_client.query_entities(
-                    query_filter=query_filter,
-                    select=["PartitionKey", "RowKey", "temperature_actual"]
-                )
-            else:
-                # When no filter is provided
-                entities = table_client.query_entities(
-                    query_filter="",
-                    select=["PartitionKey", "RowKey", "temperature_actual"]
-                )
+            # Query entities with optional PartitionKey filter; a missing table has none
+            entities = self.iter_weather_rows(
+                partition_key or None, select=["PartitionKey", "RowKey", "temperature_actual"])
 
             # Convert to a list of dictionaries
             weather_data = [entity for entity in entities]
@@ -104,9 +165,6 @@ class AzureTableService:
                 f"Retrieved {len(weather_data)} records with PartitionKey '{partition_key or 'ALL'}' from table '{table_name}'.")
             return weather_data
 
-        except ResourceNotFoundError:
-            logging.error(f"Table '{table_name}' does not exist.")
-            return []
         except Exception as e:
             logging.error(
                 f"Error fetching weather data from table '{table_name}': {e}")
@@ -115,27 +173,34 @@ class AzureTableService:
     def store_entity(self, table_name, entity):
 
         try:
-            self.create_table_if_not_exists(table_name)
-            table_client = self.get_table_client(table_name)
-            table_client.upsert_entity(entity)
+            self.storage.upsert_batch(table_name, [entity])
         except Exception as e:
             print(f"Error storing entity in table '{table_name}': {e}")
             raise
 
+    def upsert_entities_batch(self, table_name: str, entities: List[Dict], replace: bool = False) -> int:
+        """
+        Upsert entities in per-partition batches (entity-group transactions of
+        at most MAX_TRANSACTION_SIZE operations on Azure). Duplicate RowKeys
+        within a partition keep the last entity. With `replace`, stored
+        entities are replaced instead of merged, so properties that are now
+        None are removed. Returns the number of entities written.
+        """
+        try:
+            return self.storage.upsert_batch(table_name, entities, replace=replace)
+
+        except Exception as e:
+            logging.error(
+                f"Error upserting entity batch in table '{table_name}': {e}")
+            raise
+
     def save_weather_data_list(self, weather_data_list: List[dict]):
 
         table_name = "weatherdata"
 
         try:
-            # Ensure the table exists
-            self.create_table_if_not_exists(table_name)
-
-            # Get the table client
-            table_client = self.get_table_client(table_name)
-
-            # Insert or upsert each weather data entity
-            for weather_data in weather_data_list:
-                table_client.upsert_entity(entity=weather_data)
+            # Insert or upsert the weather data entities
+            self.storage.upsert_batch(table_name, weather_data_list)
 
             logging.info(
                 f"Successfully stored {len(weather_data_list)} weather data entities in table '{table_name}'.")
@@ -145,12 +210,43 @@ class AzureTableService:
                 f"Error saving weather data list to table '{table_name}': {e}")
             raise
 
+    aggregate_daily = staticmethod(aggregate_daily)
+
+    def get_daily_aggregates(self, partition_key: str, column: str, start_date: str, end_date: str) -> Dict[str, tuple]:
+        """
+        Aggregate `column` per day for the weatherdata rows of one partition
+        between `start_date` and `end_date` (inclusive, 'YYYY-MM-DD').
+        """
+        table_name = "weatherdata"
+        try:
+            if not self.cold_weather.may_hold(start_date):
+                return self.storage.read_daily_aggregates(
+                    table_name, partition_key, column, start_date, end_date)
+            return aggregate_daily(self.iter_weather_rows(
+                partition_key, start_date, f"{end_date} 23:59:59", select=["RowKey", column]), column)
+
+        except Exception as e:
+            logging.error(
+                f"Error aggregating {column} for PartitionKey '{partition_key}': {e}")
+            raise
+
+    def upsert_gdd_days(self, partition_key: str, kind: str, aggregates: Dict[str, tuple]) -> int:
+        """
+        Write daily aggregates to gdddata. `kind` is "Actual" or "Forecast";
+        each day gets Gdd<kind> (the daily mean), <kind>Sum and <kind>Count.
+        The other kind's columns are left untouched (merge upsert).
+        """
+        return self.storage.write_daily_aggregates("gdddata", partition_key, kind, aggregates)
+
     def add_gdd_forecast(self, partition_key: str):
+        """
+        Rebuild every GddForecast day of a sensor from all of its forecast rows.
+        """
 
         try:
-            # Fetch weather data with air temperature for the specified PartitionKey
+            # Fetch forecast air temperatures from the sensor's forecast grid cell
             weather_data = self.get_weather_data_with_air_temperature(
-                partition_key)
+                self.get_forecast_partition(partition_key))
 
             logging.info(
                 f"Successfully retrieved {len(weather_data)} records for PartitionKey '{partition_key}' from table 'weather'.")
@@ -181,16 +277,15 @@ class AzureTableService:
                 gdd_forecast_data.append({
                     "PartitionKey": partition_key,
                     "RowKey": date,
-                    "GddForecast": avg_temperature
+                    "GddForecast": avg_temperature,
+                    "ForecastSum": sum(temperatures),
+                    "ForecastCount": len(temperatures)
                 })
 
             # Insert the calculated GDD forecast into the 'GDDs' table
             table_name = "gdddata"
-            self.create_table_if_not_exists(table_name)
-            table_client = self.get_table_client(table_name)
 
-            for gdd_data in gdd_forecast_data:
-                table_client.upsert_entity(entity=gdd_data)
+            self.storage.upsert_batch(table_name, gdd_forecast_data)
 
             logging.info(
                 f"Successfully added {len(gdd_forecast_data)} GDD forecast records for PartitionKey '{partition_key}' to table '{table_name}'.")
@@ -200,6 +295,9 @@ class AzureTableService:
             raise
 
     def add_gdd_actual(self, partition_key: str):
+        """
+        Rebuild every GddActual day of a sensor from all of its readings.
+        """
 
         try:
             # Fetch weather data with actual temperature for the specified PartitionKey
@@ -235,16 +333,15 @@ class AzureTableService:
                 gdd_actual_data.append({
                     "PartitionKey": partition_key,
                     "RowKey": date,
-                    "GddActual": avg_temperature
+                    "GddActual": avg_temperature,
+                    "ActualSum": sum(temperatures),
+                    "ActualCount": len(temperatures)
                 })
 
             # Insert the calculated GDD forecast into the 'GDDs' table
             table_name = "gdddata"
-            self.create_table_if_not_exists(table_name)
-            table_client = self.get_table_client(table_name)
 
-            for gdd_data in gdd_actual_data:
-                table_client.upsert_entity(entity=gdd_data)
+            self.storage.upsert_batch(table_name, gdd_actual_data)
 
             logging.info(
                 f"Successfully added {len(gdd_actual_data)} GDD forecast records for PartitionKey '{partition_key}' to table '{table_name}'.")
@@ -254,15 +351,57 @@ class AzureTableService:
             raise
 
     def calculate_cutting_date(self, sensor_serial_number: str, optimal_gdd: int, latest_reset_date: datetime) -> datetime:
+        """
+        First date on which GDD accumulated since the reset date reaches
+        `optimal_gdd`, or None. Binary search over the cumulative GDD index.
+        """
+        try:
+            meta = self.get_cumulative_gdd_meta(sensor_serial_number)
+            if meta is None:
+                return self._scan_cutting_date(sensor_serial_number, optimal_gdd, latest_reset_date)
+
+            first, last = self._cumulative_bounds(meta)
+            reset = latest_reset_date.date()
+            base, base_max = self._cumulative_at(
+                sensor_serial_number, meta, reset - timedelta(days=1))
+            target = base + optimal_gdd
+
+            # CumulativeMax is non-decreasing, so its first crossing of the target
+            # is the cutting date, unless history before the reset already peaked
+            # above the target (daily means can be negative): then scan instead.
+            if base_max >= target:
+                return self._scan_cutting_date(sensor_serial_number, optimal_gdd, latest_reset_date)
+
+            low, high = max(reset, first), last
+            if low > high:
+                return None
+            _, last_max = self._cumulative_at(sensor_serial_number, meta, high)
+            if last_max < target:
+                return None
+
+            while low < high:
+                middle = low + (high - low) // 2
+                _, middle_max = self._cumulative_at(
+                    sensor_serial_number, meta, middle)
+                if middle_max >= target:
+                    high = middle
+                else:
+                    low = middle + timedelta(days=1)
+
+            return datetime.combine(low, datetime.min.time())
+
+        except Exception as e:
+            logging.error(f"Error in calculate_cutting_date: {e}")
+            raise
+
+    def _scan_cutting_date(self, sensor_serial_number: str, optimal_gdd: int, latest_reset_date: datetime) -> datetime:
 
         table_name = "gdddata"
 
         try:
             # Get the GDD data since the latest reset date
-            self.create_table_if_not_exists(table_name)
-            table_client = self.get_table_client(table_name)
-            query_filter = f"PartitionKey eq '{sensor_serial_number}' and RowKey ge '{latest_reset_date.strftime('%Y-%m-%d')}'"
-            entities = table_client.query_entities(query_filter=query_filter)
+            entities = self.storage.query(
+                table_name, sensor_serial_number, latest_reset_date.strftime('%Y-%m-%d'))
 
             # Sort the entities by date (RowKey) to ensure processing in chronological order
             gdd_data = sorted(
@@ -302,10 +441,8 @@ class AzureTableService:
 
         try:
             # Get the GDD data since the latest reset date
-            self.create_table_if_not_exists(table_name)
-            table_client = self.get_table_client(table_name)
-            query_filter = f"PartitionKey eq '{sensor_serial_number}' and RowKey ge '{latest_reset_date.strftime('%Y-%m-%d')}'"
-            entities = table_client.query_entities(query_filter=query_filter)
+            entities = self.storage.query(
+                table_name, sensor_serial_number, latest_reset_date.strftime('%Y-%m-%d'))
 
             # Sort the entities by date (RowKey) to ensure processing in chronological order
             gdd_data = sorted(
@@ -340,28 +477,65 @@ class AzureTableService:
             raise
 
     def calculate_sensor_gdd(self, sensor_serial_number: str, latest_reset_date: datetime) -> float:
+        """
+        GDD accumulated from the reset date up to today, as the difference of
+        two cumulative GDD index reads.
+        """
+        try:
+            meta = self.get_cumulative_gdd_meta(sensor_serial_number)
+            if meta is None:
+                return self._scan_sensor_gdd(sensor_serial_number, latest_reset_date)
+
+            today = datetime.now().date()
+            reset = latest_reset_date.date()
+            if reset > today:
+                return 0
+
+            until, _ = self._cumulative_at(sensor_serial_number, meta, today)
+            before, _ = self._cumulative_at(
+                sensor_serial_number, meta, reset - timedelta(days=1))
+            cumulative_gdd = until - before
+
+            logging.info(
+                f"Cumulative GDD for sensor {sensor_serial_number} since {latest_reset_date}: {cumulative_gdd}")
+            return cumulative_gdd
+
+        except Exception as e:
+            logging.error(
+                f"Error in calculate_sensor_gdd for sensor {sensor_serial_number}: {e}")
+            raise
+
+    def calculate_sensors_gdd(self, sensor_reset_dates: List[Tuple[str, datetime]],
+                              max_workers: int = GDD_QUERY_CONCURRENCY) -> Dict[str, float]:
+        """
+        Current GDD for many sensors at once: calculate_sensor_gdd for each
+        (serial, reset date) pair, with up to `max_workers` partitions queried
+        concurrently. Returns {serial: GDD}.
+        """
+        sensor_reset_dates = list(sensor_reset_dates)
+        if not sensor_reset_dates:
+            return {}
+
+        workers = max(1, min(max_workers, len(sensor_reset_dates)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gdd-query") as executor:
+            futures = {
+                serial: executor.submit(
+                    self.calculate_sensor_gdd, serial, reset_date)
+                for serial, reset_date in sensor_reset_dates
+            }
+            return {serial: future.result() for serial, future in futures.items()}
+
+    def _scan_sensor_gdd(self, sensor_serial_number: str, latest_reset_date: datetime) -> float:
 
         table_name = "gdddata"
 
         try:
-            # Get today's date in the required format
-            today = datetime.now().strftime('%Y-%m-%d')
-
             # Get the GDD data since the latest reset date
-            self.create_table_if_not_exists(table_name)
-            table_client = self.get_table_client(table_name)
-            query_filter = (
-                f"PartitionKey eq '{sensor_serial_number}' and "
-                f"RowKey ge '{latest_reset_date.strftime('%Y-%m-%d')}' and "
-                f"RowKey le '{today}'"
-            )
-            entities = table_client.query_entities(query_filter=query_filter)
+            entities = self.storage.query(
+                table_name, *self._scan_sensor_gdd_range(sensor_serial_number, latest_reset_date))
 
             # Sum up GDD values (prefer GddActual, fallback to GddForecast if GddActual is missing)
-            cumulative_gdd = sum(
-                entity.get("GddActual") or entity.get("GddForecast", 0)
-                for entity in entities
-            )
+            cumulative_gdd = self._sum_daily_gdd(entities)
 
             logging.info(
                 f"Cumulative GDD for sensor {sensor_serial_number} since {latest_reset_date}: {cumulative_gdd}")
@@ -374,46 +548,14 @@ class AzureTableService:
 
     def get_seven_day_temperature_forecast(self, partition_key: str) -> List[Dict]:
 
-        table_name = "weatherdata"
         try:
-            self.create_table_if_not_exists(table_name)
-            table_client = self.get_table_client(table_name)
-
-            today = datetime.now().strftime('%Y-%m-%d')
-            seven_days_ahead = (
-                datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d')
-
-            query_filter = (
-                f"PartitionKey eq '{partition_key}' and "
-                f"RowKey ge '{today}' and RowKey le '{seven_days_ahead}'"
-            )
-            entities = table_client.query_entities(
-                query_filter=query_filter,
+            # Forecasts are stored once per grid cell, not per sensor
+            forecast_partition = self.get_forecast_partition(partition_key)
+            entities = self.iter_weather_rows(
+                *self._seven_day_forecast_range(forecast_partition),
                 select=["RowKey", "air_temperature"]
             )
-
-            # Group temperatures by date
-            grouped_data = defaultdict(list)
-            for entity in entities:
-                air_temperature = entity.get("air_temperature")
-                if air_temperature is not None:  # Skip null values
-                    row_date = datetime.strptime(
-                        entity["RowKey"], "%Y-%m-%d %H:%M:%S").date()
-                    grouped_data[row_date].append(air_temperature)
-
-            # Calculate daily average temperature
-            daily_averages = [
-                {
-                    "date": date,
-                    # Avoid division by zero
-                    "temperature": sum(temps) / len(temps) if temps else None
-                }
-                for date, temps in grouped_data.items()
-            ]
-
-            # Sort by date
-            daily_averages.sort(key=lambda x: x["date"])
-            return daily_averages
+            return self._daily_averages(entities, "air_temperature", "temperature")
 
         except Exception as e:
             logging.error(
@@ -422,106 +564,576 @@ class AzureTableService:
 
     def get_seven_day_humidity_forecast(self, partition_key: str) -> List[Dict]:
 
-        table_name = "weatherdata"
         try:
-            self.create_table_if_not_exists(table_name)
-            table_client = self.get_table_client(table_name)
-
-            today = datetime.now().strftime('%Y-%m-%d')
-            seven_days_ahead = (
-                datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d')
-
-            query_filter = (
-                f"PartitionKey eq '{partition_key}' and "
-                f"RowKey ge '{today}' and RowKey le '{seven_days_ahead}'"
-            )
-            entities = table_client.query_entities(
-                query_filter=query_filter,
+            # Forecasts are stored once per grid cell, not per sensor
+            forecast_partition = self.get_forecast_partition(partition_key)
+            entities = self.iter_weather_rows(
+                *self._seven_day_forecast_range(forecast_partition),
                 select=["RowKey", "relative_humidity"]
             )
+            return self._daily_averages(entities, "relative_humidity", "humidity")
 
-            # Group temperatures by date
-            grouped_data = defaultdict(list)
-            for entity in entities:
-                relative_humidity = entity.get("relative_humidity")
-                if relative_humidity is not None:  # Skip null values
-                    row_date = datetime.strptime(
-                        entity["RowKey"], "%Y-%m-%d %H:%M:%S").date()
-                    grouped_data[row_date].append(relative_humidity)
-
-            # Calculate daily average temperature
-            daily_averages = [
-                {
-                    "date": date,
-                    # Avoid division by zero
-                    "humidity": sum(temps) / len(temps) if temps else None
-                }
-                for date, temps in grouped_data.items()
-            ]
+        except Exception as e:
+            logging.error(
+                f"Error fetching seven-day humidity forecast: {e}")
+            raise
 
-            # Sort by date
-            daily_averages.sort(key=lambda x: x["date"])
-            return daily_averages
+    def get_weather_forecast_series(self, partition_key: str) -> Dict[str, List[Dict]]:
+        """
+        Seven-day daily average temperature and humidity forecasts from one
+        weatherdata query projecting both columns:
+        {"temperature": [{"date", "temperature"}], "humidity": [{"date", "humidity"}]}.
+        """
+        try:
+            # Forecasts are stored once per grid cell, not per sensor
+            forecast_partition = self.get_forecast_partition(partition_key)
+            entities = list(self.iter_weather_rows(
+                *self._seven_day_forecast_range(forecast_partition),
+                select=["RowKey", "air_temperature", "relative_humidity"]
+            ))
+            return self._weather_series(entities)
+
+        except Exception as e:
+            logging.error(f"Error fetching seven-day weather forecast: {e}")
+            raise
+
+    def get_gdd_series(self, partition_key: str, latest_reset_date: datetime) -> Dict:
+        """
+        Daily and cumulative GDD since the reset date for each day with GDD
+        data from today to seven days ahead, and the current GDD, from one
+        pass over the sensor's GDD data: one cumulative index query (plus
+        the meta row and the row before the reset date), or one gdddata
+        query when the sensor has no index yet.
+        {"daily_gdd": [{"date", "gdd"}], "cumulative_gdd": [{"date", "cumulative_gdd"}], "current_gdd": float}
+        """
+        try:
+            meta = self.get_cumulative_gdd_meta(partition_key)
+            if meta is None:
+                entities = self.storage.query(
+                    "gdddata", *self._scan_forecast_range(partition_key, latest_reset_date),
+                    select=["RowKey", "GddActual", "GddForecast"]
+                )
+                return self._gdd_series_from_days(entities, latest_reset_date)
+
+            base, _ = self._cumulative_at(
+                partition_key, meta, latest_reset_date.date() - timedelta(days=1))
+            entities = list(self.storage.query(
+                CUMULATIVE_GDD_TABLE, *self._cumulative_forecast_range(partition_key, latest_reset_date),
+                select=["RowKey", "DailyGdd", "Cumulative", "HasData"]
+            ))
+            until = self._current_cumulative(meta, latest_reset_date, entities)
+            if until is None:
+                # Today is past the end of the index, outside the queried range
+                until, _ = self._cumulative_at(
+                    partition_key, meta, datetime.now().date())
+            return self._gdd_series_from_index(entities, base, until, latest_reset_date)
 
         except Exception as e:
             logging.error(
-                f"Error fetching seven-day temperature forecast: {e}")
+                f"Error calculating GDD series for sensor {partition_key}: {e}")
             raise
 
+    def get_field_dashboard_series(self, partition_key: str, latest_reset_date: datetime) -> Dict:
+        """
+        Everything the field dashboard charts for a sensor, with one query
+        per table: the weather forecast series of get_weather_forecast_series
+        and the GDD series of get_gdd_series, in one dict.
+        """
+        return {**self.get_weather_forecast_series(partition_key),
+                **self.get_gdd_series(partition_key, latest_reset_date)}
+
+    def iter_weather_values(self, partition_key: str, column: str,
+                            start: datetime, end: datetime) -> Iterator[Tuple[datetime, float]]:
+        """
+        (timestamp, value) of the non-null `column` values of one weatherdata
+        partition in [start, end), in time order. Rows are read page by page
+        as the caller iterates, never all at once.
+        """
+        # RowKeys have whole seconds, so the last one before `end` closes the range
+        low = start.strftime('%Y-%m-%d %H:%M:%S')
+        high = (end - timedelta(seconds=1)).strftime('%Y-%m-%d %H:%M:%S')
+        try:
+            for entity in self.iter_weather_rows(partition_key, low, high, select=["RowKey", column]):
+                value = entity.get(column)
+                if value is not None:
+                    yield datetime.strptime(entity["RowKey"], "%Y-%m-%d %H:%M:%S"), float(value)
+
+        except Exception as e:
+            logging.error(
+                f"Error reading {column} history for PartitionKey '{partition_key}': {e}")
+            raise
+
+    def get_history_series(self, partition_keys: List[str], column: str, start: datetime, end: datetime,
+                           points: int, method: str = "buckets") -> List[Dict]:
+        """
+        `column` over [start, end) downsampled to about `points` points with
+        `method` ("buckets" or "lttb"). Several partitions are merged into one
+        series, averaging values with the same timestamp. Memory is bounded
+        by the point count, not by the rows read.
+        """
+        series = downsampler(method, start, end, points)
+        for timestamp, value in merge_mean([
+                self.iter_weather_values(partition_key, column, start, end)
+                for partition_key in dict.fromkeys(partition_keys)]):
+            series.add(timestamp, value)
+        return series.result()
+
+    def get_sensors_history(self, serials: List[str], start: datetime, end: datetime,
+                            points: int, method: str = "buckets") -> Dict[str, List[Dict]]:
+        """
+        Measured temperature (the sensors' own partitions) and forecast
+        temperature (their grid cells' partitions) of one or more sensors:
+        {"temperature": [...], "forecast_temperature": [...]}.
+        """
+        return {
+            "temperature": self.get_history_series(
+                serials, "temperature_actual", start, end, points, method),
+            # Sensors of a field usually share a cell, which is read once
+            "forecast_temperature": self.get_history_series(
+                [self.get_forecast_partition(serial) for serial in serials],
+                "air_temperature", start, end, points, method),
+        }
+
     def calculate_cumulative_gdd_forecast(self, partition_key: str, latest_reset_date: datetime) -> List[Dict]:
+        """
+        Cumulative GDD since the reset date for each day with GDD data from
+        today to seven days ahead, read from the cumulative GDD index.
+        """
+        try:
+            meta = self.get_cumulative_gdd_meta(partition_key)
+            if meta is None:
+                return self._scan_cumulative_gdd_forecast(partition_key, latest_reset_date)
+
+            base, _ = self._cumulative_at(
+                partition_key, meta, latest_reset_date.date() - timedelta(days=1))
+
+            entities = self.storage.query(
+                CUMULATIVE_GDD_TABLE, *self._cumulative_forecast_range(partition_key, latest_reset_date),
+                select=["RowKey", "Cumulative", "HasData"]
+            )
+            return self._cumulative_forecast_from_index(entities, base)
+
+        except Exception as e:
+            logging.error(f"Error calculating cumulative GDD forecast: {e}")
+            raise
+
+    def _scan_cumulative_gdd_forecast(self, partition_key: str, latest_reset_date: datetime) -> List[Dict]:
 
         table_name = "gdddata"
         try:
-            # Define the forecast period
-            today = datetime.now().date()  # Ensure `today` is a date object
-            seven_days_ahead = today + timedelta(days=7)
+            # Query forecasted GDD data
+            entities = self.storage.query(
+                table_name, *self._scan_forecast_range(partition_key, latest_reset_date))
+            return self._cumulative_forecast_from_days(entities, latest_reset_date)
 
-            # Get the table client
-            self.create_table_if_not_exists(table_name)
-            table_client = self.get_table_client(table_name)
+        except Exception as e:
+            logging.error(f"Error calculating cumulative GDD forecast: {e}")
+            raise
 
-            # Query forecasted GDD data
-            query_filter = (
-                f"PartitionKey eq '{partition_key}' and "
-                f"RowKey ge '{latest_reset_date.strftime('%Y-%m-%d')}' and "
-                f"RowKey le '{seven_days_ahead.strftime('%Y-%m-%d')}'"
-            )
-            entities = table_client.query_entities(query_filter=query_filter)
+    # Dashboard query ranges (partition key, first and last RowKey) and result
+    # processing, shared with AsyncAzureTableService
+
+    @staticmethod
+    def _seven_day_forecast_range(forecast_partition: str) -> Tuple[str, str, str]:
+        today = datetime.now().strftime('%Y-%m-%d')
+        seven_days_ahead = (
+            datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d')
+        return forecast_partition, today, seven_days_ahead
+
+    @staticmethod
+    def _daily_averages(entities, column: str, value_key: str) -> List[Dict]:
+        """
+        Average hourly weatherdata values of `column` per day, as
+        [{"date": date, value_key: average}] sorted by date.
+        """
+        # Group values by date
+        grouped_data = defaultdict(list)
+        for entity in entities:
+            value = entity.get(column)
+            if value is not None:  # Skip null values
+                row_date = datetime.strptime(
+                    entity["RowKey"], "%Y-%m-%d %H:%M:%S").date()
+                grouped_data[row_date].append(value)
+
+        # Calculate daily averages
+        daily_averages = [
+            {
+                "date": date,
+                # Avoid division by zero
+                value_key: sum(values) / len(values) if values else None
+            }
+            for date, values in grouped_data.items()
+        ]
+
+        # Sort by date
+        daily_averages.sort(key=lambda x: x["date"])
+        return daily_averages
+
+    @classmethod
+    def _weather_series(cls, entities: List[Dict]) -> Dict[str, List[Dict]]:
+        return {
+            "temperature": cls._daily_averages(entities, "air_temperature", "temperature"),
+            "humidity": cls._daily_averages(entities, "relative_humidity", "humidity"),
+        }
+
+    @staticmethod
+    def _cumulative_forecast_range(partition_key: str, latest_reset_date: datetime) -> Tuple[str, str, str]:
+        today = datetime.now().date()
+        seven_days_ahead = today + timedelta(days=7)
+        return partition_key, max(today, latest_reset_date.date()).isoformat(), seven_days_ahead.isoformat()
+
+    @staticmethod
+    def _cumulative_forecast_from_index(entities, base: float) -> List[Dict]:
+        cumulative_forecast = [
+            {
+                "date": date.fromisoformat(entity["RowKey"]),
+                "cumulative_gdd": entity["Cumulative"] - base
+            }
+            for entity in entities
+            if entity.get("HasData")
+        ]
+        cumulative_forecast.sort(key=lambda x: x["date"])
+        return cumulative_forecast
+
+    @classmethod
+    def _current_cumulative(cls, meta: Dict, latest_reset_date: datetime, entities: List[Dict]) -> Optional[float]:
+        """
+        Cumulative GDD at the end of today from the index rows queried by
+        _cumulative_forecast_range, or None if today's row isn't among them.
+        """
+        today = datetime.now().date()
+        row_key = cls._cumulative_row_key(meta, today)
+        if row_key is None or latest_reset_date.date() > today:
+            return 0.0
+        for entity in entities:
+            if entity["RowKey"] == row_key:
+                return entity["Cumulative"]
+        return None
+
+    @staticmethod
+    def _gdd_series_from_index(entities: List[Dict], base: float, until: float,
+                               latest_reset_date: datetime) -> Dict:
+        entities = sorted(
+            (entity for entity in entities if entity.get("HasData")), key=lambda entity: entity["RowKey"])
+        return {
+            "daily_gdd": [
+                {"date": date.fromisoformat(entity["RowKey"]), "gdd": entity["DailyGdd"]} for entity in entities
+            ],
+            "cumulative_gdd": [
+                {"date": date.fromisoformat(entity["RowKey"]), "cumulative_gdd": entity["Cumulative"] - base}
+                for entity in entities
+            ],
+            # GDD since the reset date up to today (none yet if it is in the future)
+            "current_gdd": 0 if latest_reset_date.date() > datetime.now().date() else until - base,
+        }
+
+    @staticmethod
+    def _scan_forecast_range(partition_key: str, latest_reset_date: datetime) -> Tuple[str, str, str]:
+        seven_days_ahead = datetime.now().date() + timedelta(days=7)
+        return partition_key, latest_reset_date.strftime('%Y-%m-%d'), seven_days_ahead.strftime('%Y-%m-%d')
+
+    @classmethod
+    def _cumulative_forecast_from_days(cls, entities, latest_reset_date: datetime) -> List[Dict]:
+        """
+        Cumulative GDD since the reset date for each gdddata day from today
+        to seven days ahead, summed from the daily rows.
+        """
+        return cls._gdd_series_from_days(entities, latest_reset_date)["cumulative_gdd"]
+
+    @staticmethod
+    def _gdd_series_from_days(entities, latest_reset_date: datetime) -> Dict:
+        # Define the forecast period
+        today = datetime.now().date()  # Ensure `today` is a date object
+        seven_days_ahead = today + timedelta(days=7)
+
+        # Sort the forecast data by date
+        forecast_data = sorted(
+            [
+                {
+                    # Convert to `datetime.date`
+                    "date": datetime.strptime(entity["RowKey"], "%Y-%m-%d").date(),
+                    # Fetch forecasted GDD
+                    # entity.get("GddForecast", 0)
+                    "gdd_forecast": entity.get("GddActual") or entity.get("GddForecast", 0)
+                }
+                for entity in entities
+            ],
+            key=lambda x: x["date"]
+        )
+
+        # Initialize cumulative GDD
+        daily_gdd = []
+        cumulative_forecast = []
+        cumulative_gdd = 0
+        current_gdd = 0
+
+        for record in forecast_data:
+            # Add GDD from reset date to current record's date
+            # Normalize `latest_reset_date` to `datetime.date`
+            if record["date"] >= latest_reset_date.date():
+                cumulative_gdd += record["gdd_forecast"]
+                if record["date"] <= today:
+                    current_gdd = cumulative_gdd
+
+            # Include only today and the next six days
+            if today <= record["date"] <= seven_days_ahead:
+                daily_gdd.append({
+                    "date": record["date"],
+                    "gdd": record["gdd_forecast"]
+                })
+                cumulative_forecast.append({
+                    "date": record["date"],
+                    "cumulative_gdd": cumulative_gdd
+                })
 
-            # Sort the forecast data by date
-            forecast_data = sorted(
-                [
-                    {
-                        # Convert to `datetime.date`
-                        "date": datetime.strptime(entity["RowKey"], "%Y-%m-%d").date(),
-                        # Fetch forecasted GDD
-                        # entity.get("GddForecast", 0)
-                        "gdd_forecast": entity.get("GddActual") or entity.get("GddForecast", 0)
-                    }
-                    for entity in entities
-                ],
-                key=lambda x: x["date"]
-            )
+        return {"daily_gdd": daily_gdd, "cumulative_gdd": cumulative_forecast, "current_gdd": current_gdd}
+
+    @staticmethod
+    def _scan_sensor_gdd_range(sensor_serial_number: str, latest_reset_date: datetime) -> Tuple[str, str, str]:
+        # Get today's date in the required format
+        today = datetime.now().strftime('%Y-%m-%d')
+        return sensor_serial_number, latest_reset_date.strftime('%Y-%m-%d'), today
+
+    @staticmethod
+    def _sum_daily_gdd(entities) -> float:
+        return sum(
+            entity.get("GddActual") or entity.get("GddForecast", 0)
+            for entity in entities
+        )
+
+    @staticmethod
+    def _split_dashboard_summary(entities) -> Optional[Tuple[Dict, Dict[str, Dict]]]:
+        field_summary, sensor_summaries = None, {}
+        for entity in entities:
+            if entity["RowKey"] == DASHBOARD_SUMMARY_FIELD_ROW:
+                field_summary = entity
+            else:
+                sensor_summaries[entity["RowKey"]] = entity
+        if field_summary is None:
+            return None
+        return field_summary, sensor_summaries
+
+    # Cumulative GDD index
+
+    @staticmethod
+    def _daily_gdd(entity) -> float:
+        # Same precedence as the GDD calculations: actual first, then forecast
+        return entity.get("GddActual") or entity.get("GddForecast") or 0
+
+    @staticmethod
+    def _cumulative_bounds(meta) -> Tuple[date, date]:
+        return date.fromisoformat(meta["FirstDate"]), date.fromisoformat(meta["LastDate"])
+
+    def _get_cumulative_entity(self, partition_key: str, row_key: str) -> Optional[Dict]:
+        return self.storage.get_entity(CUMULATIVE_GDD_TABLE, partition_key, row_key)
+
+    def get_cumulative_gdd_meta(self, partition_key: str) -> Optional[Dict]:
+        """
+        The index bounds (FirstDate, LastDate) of a sensor, or None if the
+        sensor has no cumulative GDD index yet.
+        """
+        return self._get_cumulative_entity(partition_key, CUMULATIVE_GDD_META_ROW)
+
+    def _cumulative_at(self, partition_key: str, meta: Dict, day: date) -> Tuple[float, float]:
+        """
+        (cumulative GDD, running maximum of it) at the end of `day`.
+        """
+        row_key = self._cumulative_row_key(meta, day)
+        if row_key is None:
+            return 0.0, float("-inf")
+        entity = self._get_cumulative_entity(partition_key, row_key)
+        return self._cumulative_values(partition_key, row_key, entity)
+
+    @classmethod
+    def _cumulative_row_key(cls, meta: Dict, day: date) -> Optional[str]:
+        # Index row holding the cumulative GDD at the end of `day`, None before the first day
+        first, last = cls._cumulative_bounds(meta)
+        if day < first:
+            return None
+        return min(day, last).isoformat()
+
+    @staticmethod
+    def _cumulative_values(partition_key: str, row_key: str, entity: Optional[Dict]) -> Tuple[float, float]:
+        if entity is None:
+            raise LookupError(
+                f"Cumulative GDD index for {partition_key} has no row for {row_key}")
+        return entity["Cumulative"], entity["CumulativeMax"]
+
+    def _build_cumulative_rows(self, partition_key: str, gdd_days: Dict[str, float], start: date, end: date,
+                               cumulative: float, cumulative_max: float) -> List[Dict]:
+        rows = []
+        day = start
+        while day <= end:
+            row_key = day.isoformat()
+            daily = gdd_days.get(row_key)
+            cumulative += daily or 0
+            cumulative_max = max(cumulative_max, cumulative)
+            rows.append({
+                "PartitionKey": partition_key,
+                "RowKey": row_key,
+                "DailyGdd": daily or 0.0,
+                "Cumulative": cumulative,
+                "CumulativeMax": cumulative_max,
+                "HasData": daily is not None,
+            })
+            day += timedelta(days=1)
+        return rows
+
+    def _get_gdd_days(self, partition_key: str, from_date: str = None) -> Dict[str, float]:
+        entities = self.storage.query(
+            "gdddata", partition_key, from_date or None,
+            select=["RowKey", "GddActual", "GddForecast"]
+        )
+        return {entity["RowKey"]: self._daily_gdd(entity) for entity in entities}
+
+    def rebuild_cumulative_gdd(self, partition_key: str) -> int:
+        """
+        Recompute a sensor's whole cumulative GDD index from gdddata.
+        """
+        try:
+            gdd_days = self._get_gdd_days(partition_key)
+            if not gdd_days:
+                return 0
+
+            first = date.fromisoformat(min(gdd_days))
+            last = date.fromisoformat(max(gdd_days))
+            rows = self._build_cumulative_rows(
+                partition_key, gdd_days, first, last, 0.0, float("-inf"))
+            # Written last, so readers never see bounds without their rows
+            rows.append({
+                "PartitionKey": partition_key,
+                "RowKey": CUMULATIVE_GDD_META_ROW,
+                "FirstDate": first.isoformat(),
+                "LastDate": last.isoformat(),
+            })
+            return self.upsert_entities_batch(CUMULATIVE_GDD_TABLE, rows)
+
+        except Exception as e:
+            logging.error(
+                f"Error rebuilding cumulative GDD index for {partition_key}: {e}")
+            raise
 
-            # Initialize cumulative GDD
-            cumulative_forecast = []
-            cumulative_gdd = 0
+    def update_cumulative_gdd(self, partition_key: str, from_date: str) -> int:
+        """
+        Bring a sensor's cumulative GDD index up to date after daily GDD values
+        changed on or after `from_date` ('YYYY-MM-DD'). Only rows from that
+        date on are rewritten.
+        """
+        try:
+            meta = self.get_cumulative_gdd_meta(partition_key)
+            if meta is None or from_date < meta["FirstDate"]:
+                return self.rebuild_cumulative_gdd(partition_key)
+
+            first, last = self._cumulative_bounds(meta)
+            # Keep the series contiguous when new days start after a gap
+            start = min(date.fromisoformat(from_date),
+                        last + timedelta(days=1))
+
+            cumulative, cumulative_max = 0.0, float("-inf")
+            if start > first:
+                previous = self._get_cumulative_entity(
+                    partition_key, (start - timedelta(days=1)).isoformat())
+                if previous is None:
+                    return self.rebuild_cumulative_gdd(partition_key)
+                cumulative, cumulative_max = previous["Cumulative"], previous["CumulativeMax"]
+
+            gdd_days = self._get_gdd_days(partition_key, start.isoformat())
+            end = max([last] + [date.fromisoformat(day) for day in gdd_days])
+            rows = self._build_cumulative_rows(
+                partition_key, gdd_days, start, end, cumulative, cumulative_max)
+            rows.append({
+                "PartitionKey": partition_key,
+                "RowKey": CUMULATIVE_GDD_META_ROW,
+                "FirstDate": first.isoformat(),
+                "LastDate": end.isoformat(),
+            })
+            return self.upsert_entities_batch(CUMULATIVE_GDD_TABLE, rows)
 
-            for record in forecast_data:
-                # Add GDD from reset date to current record's date
-                # Normalize `latest_reset_date` to `datetime.date`
-                if record["date"] >= latest_reset_date.date():
-                    cumulative_gdd += record["gdd_forecast"]
+        except Exception as e:
+            logging.error(
+                f"Error updating cumulative GDD index for {partition_key}: {e}")
+            raise
 
-                # Include only today and the next six days
-                if today <= record["date"] <= seven_days_ahead:
-                    cumulative_forecast.append({
-                        "date": record["date"],
-                        "cumulative_gdd": cumulative_gdd
-                    })
+    # Dashboard read model
+
+    @staticmethod
+    def encode_series(records: List[Dict], value_key: str) -> str:
+        """
+        Serialize [{"date": date, value_key: value}] as a JSON list of
+        [ISO date, value] pairs for storage in a single property.
+        """
+        return json.dumps([[record["date"].isoformat(), record[value_key]] for record in records])
+
+    @staticmethod
+    def decode_series(encoded: Optional[str]) -> List[Tuple[date, float]]:
+        return [(date.fromisoformat(day), value) for day, value in json.loads(encoded or "[]")]
+
+    @staticmethod
+    def is_summary_current(field_summary: Optional[Dict], serials: List[str]) -> bool:
+        """
+        Whether a field summary is recent enough and covers exactly the
+        field's current sensors.
+        """
+        if field_summary is None:
+            return False
+        age = time.time() - field_summary.get("ComputedAt", 0)
+        return age <= DASHBOARD_SUMMARY_MAX_AGE_SEC and \
+            field_summary.get("SensorSerials") == json.dumps(sorted(serials))
+
+    def upsert_dashboard_summary(self, field_id: str, field_summary: Dict, sensor_summaries: Dict[str, Dict]) -> int:
+        """
+        Write a field's dashboard summary and its sensors' summaries in one
+        transaction, so readers never see a field row with mismatched sensors.
+        """
+        entities = [{**field_summary, "PartitionKey": field_id,
+                     "RowKey": DASHBOARD_SUMMARY_FIELD_ROW}]
+        entities.extend({**summary, "PartitionKey": field_id, "RowKey": serial}
+                        for serial, summary in sensor_summaries.items())
+        return self.upsert_entities_batch(DASHBOARD_SUMMARY_TABLE, entities, replace=True)
+
+    def get_field_dashboard_summary(self, field_id: str) -> Optional[Tuple[Dict, Dict[str, Dict]]]:
+        """
+        A field's summary row and {serial: sensor summary}, read with one
+        partition query, or None if the field has no summary.
+        """
+        table_name = DASHBOARD_SUMMARY_TABLE
+        try:
+            entities = self.storage.query(table_name, field_id)
+            return self._split_dashboard_summary(entities)
 
-            return cumulative_forecast
+        except Exception as e:
+            logging.error(
+                f"Error reading dashboard summary for field {field_id}: {e}")
+            raise
 
+    def get_field_summaries(self, field_ids: List[str],
+                            max_workers: int = GDD_QUERY_CONCURRENCY) -> Dict[str, Dict]:
+        """
+        Field summary rows for many fields, read with concurrent point reads.
+        Fields without a summary are left out.
+        """
+        table_name = DASHBOARD_SUMMARY_TABLE
+        field_ids = list(dict.fromkeys(field_ids))
+        if not field_ids:
+            return {}
+
+        def read(field_id):
+            return self.storage.get_entity(table_name, field_id, DASHBOARD_SUMMARY_FIELD_ROW)
+
+        workers = max(1, min(max_workers, len(field_ids)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="summary-read") as executor:
+            summaries = dict(zip(field_ids, executor.map(read, field_ids)))
+        return {field_id: summary for field_id, summary in summaries.items() if summary is not None}
+
+    def invalidate_dashboard_summary(self, field_id: str):
+        """
+        Drop a field's summary row (e.g. after a reset date changed), so the
+        API computes the field live until the DataProcessor writes a new one.
+        """
+        table_name = DASHBOARD_SUMMARY_TABLE
+        try:
+            self.storage.delete_entity(table_name, field_id, DASHBOARD_SUMMARY_FIELD_ROW)
         except Exception as e:
-            logging.error(f"Error calculating cumulative GDD forecast: {e}")
+            logging.error(
+                f"Error invalidating dashboard summary for field {field_id}: {e}")
             raise
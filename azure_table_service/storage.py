@@ -0,0 +1,485 @@
+# storage.py
+"""
+Pluggable table storage behind AzureTableService.
+
+The services keep everything in partitioned tables of entities ordered by
+RowKey, and only need a few operations on them, named by TableStorage:
+batch upserts and deletes, partition range queries with a projection, point
+reads and deletes, and daily aggregates of a column. Two backends implement them:
+- AzureTableStorage: Azure Table Storage (or Azurite) via azure.data.tables
+- SqliteTableStorage: an embedded SQLite file, for single-node farms and
+  local benchmarks without Azurite
+
+TABLE_STORAGE_BACKEND ("azure" or "sqlite") picks the backend the services use.
+"""
+import base64
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+from azure.core.exceptions import ResourceNotFoundError
+from azure.core.pipeline.transport import RequestsTransport
+from azure.data.tables import TableClient, TableServiceClient, UpdateMode
+
+TABLE_STORAGE_BACKEND = os.getenv("TABLE_STORAGE_BACKEND", "azure")
+TABLE_STORAGE_SQLITE_PATH = os.getenv(
+    "TABLE_STORAGE_SQLITE_PATH", "tablestorage.db")
+
+# Maximum number of operations Azure Table Storage accepts in one entity-group transaction
+MAX_TRANSACTION_SIZE = 100
+
+# HTTP connections kept per storage account, so concurrent queries are not serialized
+AZURE_TABLE_POOL_SIZE = int(os.getenv(
+    "AZURE_TABLE_POOL_SIZE", max(10, int(os.getenv("GDD_QUERY_CONCURRENCY", 16)))))
+
+
+def aggregate_daily(records, column: str) -> Dict[str, tuple]:
+    """
+    Sum and count the non-null values of `column` per date (the date part
+    of the RowKey). Returns {date: (sum, count)}.
+    """
+    aggregates = {}
+    for record in records:
+        value = record.get(column)
+        if value is None:
+            continue
+        date = record["RowKey"].split(" ")[0]
+        total, count = aggregates.get(date, (0.0, 0))
+        aggregates[date] = (total + value, count + 1)
+    return aggregates
+
+
+def odata_filter(partition_key: str = None, low: str = None, high: str = None) -> str:
+    """
+    Table storage filter for a partition's RowKeys in [low, high].
+    """
+    clauses = []
+    if partition_key is not None:
+        clauses.append(f"PartitionKey eq '{partition_key}'")
+    if low is not None:
+        clauses.append(f"RowKey ge '{low}'")
+    if high is not None:
+        clauses.append(f"RowKey le '{high}'")
+    return " and ".join(clauses)
+
+
+class TableStorage:
+    """
+    The table operations the services need. Entities are dicts with
+    PartitionKey, RowKey and their properties; tables are created on first
+    use. Partition range bounds are inclusive RowKeys, and None leaves that
+    side open.
+    """
+
+    name = None
+
+    def create_table(self, table_name: str):
+        raise NotImplementedError
+
+    def upsert_batch(self, table_name: str, entities: Iterable[Dict], replace: bool = False) -> int:
+        """
+        Insert or update entities, each partition atomically where the
+        backend allows. Stored entities are merged with the new properties,
+        or replaced with `replace`. Duplicate keys keep the last entity.
+        Returns the number of entities written.
+        """
+        raise NotImplementedError
+
+    def query(self, table_name: str, partition_key: str = None, low: str = None, high: str = None,
+              select: List[str] = None) -> Iterator[Dict]:
+        """
+        Entities of a partition with RowKey in [low, high] (all partitions
+        without a partition key), in RowKey order and read lazily. With
+        `select`, only those properties are returned.
+        """
+        raise NotImplementedError
+
+    def get_entity(self, table_name: str, partition_key: str, row_key: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def delete_entity(self, table_name: str, partition_key: str, row_key: str):
+        raise NotImplementedError
+
+    def delete_batch(self, table_name: str, keys: Iterable[Tuple[str, str]]) -> int:
+        """
+        Delete the entities with the given (PartitionKey, RowKey) keys, each
+        partition atomically where the backend allows. The entities must
+        exist. Returns the number of entities deleted.
+        """
+        raise NotImplementedError
+
+    def read_daily_aggregates(self, table_name: str, partition_key: str, column: str,
+                              start_date: str, end_date: str) -> Dict[str, tuple]:
+        """
+        {date: (sum, count)} of the non-null `column` values of a partition
+        whose RowKeys fall on `start_date` .. `end_date` ('YYYY-MM-DD').
+        """
+        entities = self.query(table_name, partition_key, start_date,
+                              f"{end_date} 23:59:59", select=["RowKey", column])
+        return aggregate_daily(entities, column)
+
+    def write_daily_aggregates(self, table_name: str, partition_key: str, kind: str,
+                               aggregates: Dict[str, tuple]) -> int:
+        """
+        Merge {date: (sum, count)} into one row per date: Gdd<kind> (the
+        daily mean), <kind>Sum and <kind>Count.
+        """
+        entities = [
+            {
+                "PartitionKey": partition_key,
+                "RowKey": date,
+                f"Gdd{kind}": total / count,
+                f"{kind}Sum": total,
+                f"{kind}Count": count,
+            }
+            for date, (total, count) in aggregates.items()
+            if count
+        ]
+        if not entities:
+            return 0
+        return self.upsert_batch(table_name, entities)
+
+    def close(self):
+        pass
+
+
+class AzureTableStorage(TableStorage):
+    """
+    Azure Table Storage. Upserts are entity-group transactions of at most
+    MAX_TRANSACTION_SIZE operations per partition.
+    """
+
+    name = "azure"
+
+    # Process-wide state, shared by every instance using the same connection string:
+    # one TableServiceClient, one pooled TableClient per table, and the set of
+    # tables already known to exist.
+    _shared_lock = threading.Lock()
+    _service_clients = {}
+    _table_clients = {}
+    _ready_tables = set()
+
+    def __init__(self, connection_string: str = None):
+        # Fetch Azure Table Storage connection string from environment variables
+        self.connection_string = connection_string or os.getenv(
+            'AZURE_STORAGE_SERVICE', "UseDevelopmentStorage=true")
+        with AzureTableStorage._shared_lock:
+            service_client = AzureTableStorage._service_clients.get(
+                self.connection_string)
+            if service_client is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_maxsize=AZURE_TABLE_POOL_SIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                service_client = TableServiceClient.from_connection_string(
+                    conn_str=self.connection_string, transport=RequestsTransport(session=session, session_owner=False))
+                AzureTableStorage._service_clients[self.connection_string] = service_client
+        self.service_client = service_client
+
+    def get_table_client(self, table_name: str) -> TableClient:
+
+        key = (self.connection_string, table_name)
+        with AzureTableStorage._shared_lock:
+            table_client = AzureTableStorage._table_clients.get(key)
+            if table_client is None:
+                table_client = self.service_client.get_table_client(table_name)
+                AzureTableStorage._table_clients[key] = table_client
+        return table_client
+
+    def create_table(self, table_name: str):
+        key = (self.connection_string, table_name)
+        if key in AzureTableStorage._ready_tables:
+            return
+
+        try:
+            self.service_client.create_table_if_not_exists(table_name)
+            with AzureTableStorage._shared_lock:
+                AzureTableStorage._ready_tables.add(key)
+            print(f"Table '{table_name}' is ready.")
+        except Exception as e:
+            print(f"Error creating table '{table_name}': {str(e)}")
+
+    def invalidate_table(self, table_name: str):
+        """
+        Forget that a table exists, so the next access creates it again.
+        """
+        with AzureTableStorage._shared_lock:
+            AzureTableStorage._ready_tables.discard(
+                (self.connection_string, table_name))
+
+    def invalidate_if_table_missing(self, table_name: str, error: Exception):
+        """
+        Invalidate the readiness of `table_name` if `error` says the table is gone.
+        A missing entity also raises ResourceNotFoundError, with its own error code.
+        """
+        if isinstance(error, ResourceNotFoundError) and getattr(error, "error_code", None) != "ResourceNotFound":
+            logging.warning(
+                f"Table '{table_name}' not found, clearing its readiness cache.")
+            self.invalidate_table(table_name)
+            return True
+        return False
+
+    def run_on_table(self, table_name: str, operation):
+        """
+        Run `operation(table_client)` against a ready table. If the table was
+        deleted behind our back, recreate it and retry once.
+        """
+        self.create_table(table_name)
+        try:
+            return operation(self.get_table_client(table_name))
+        except ResourceNotFoundError as e:
+            if not self.invalidate_if_table_missing(table_name, e):
+                raise
+            self.create_table(table_name)
+            return operation(self.get_table_client(table_name))
+
+    def upsert_batch(self, table_name: str, entities: Iterable[Dict], replace: bool = False) -> int:
+        # A transaction may only touch a single partition, and each RowKey once
+        partitions = defaultdict(dict)
+        for entity in entities:
+            partitions[entity["PartitionKey"]][entity["RowKey"]] = entity
+
+        written = 0
+        options = {"mode": UpdateMode.REPLACE if replace else UpdateMode.MERGE}
+        for rows in partitions.values():
+            operations = [("upsert", entity, options)
+                          for entity in rows.values()]
+            for start in range(0, len(operations), MAX_TRANSACTION_SIZE):
+                chunk = operations[start:start + MAX_TRANSACTION_SIZE]
+                self.run_on_table(
+                    table_name, lambda table_client: table_client.submit_transaction(chunk))
+                written += len(chunk)
+        return written
+
+    def query(self, table_name: str, partition_key: str = None, low: str = None, high: str = None,
+              select: List[str] = None) -> Iterator[Dict]:
+        self.create_table(table_name)
+        try:
+            yield from self.get_table_client(table_name).query_entities(
+                query_filter=odata_filter(partition_key, low, high), select=select)
+        except ResourceNotFoundError as e:
+            # A table deleted behind our back has no rows; it is recreated on next use
+            if not self.invalidate_if_table_missing(table_name, e):
+                raise
+
+    def get_entity(self, table_name: str, partition_key: str, row_key: str) -> Optional[Dict]:
+        self.create_table(table_name)
+        try:
+            return self.get_table_client(table_name).get_entity(
+                partition_key=partition_key, row_key=row_key)
+        except ResourceNotFoundError as e:
+            self.invalidate_if_table_missing(table_name, e)
+            return None
+
+    def delete_entity(self, table_name: str, partition_key: str, row_key: str):
+        self.run_on_table(table_name, lambda table_client: table_client.delete_entity(
+            partition_key=partition_key, row_key=row_key))
+
+    def delete_batch(self, table_name: str, keys: Iterable[Tuple[str, str]]) -> int:
+        partitions = defaultdict(dict)
+        for partition_key, row_key in keys:
+            partitions[partition_key][row_key] = None
+
+        deleted = 0
+        for partition_key, rows in partitions.items():
+            operations = [("delete", {"PartitionKey": partition_key, "RowKey": row_key})
+                          for row_key in rows]
+            for start in range(0, len(operations), MAX_TRANSACTION_SIZE):
+                chunk = operations[start:start + MAX_TRANSACTION_SIZE]
+                self.run_on_table(
+                    table_name, lambda table_client: table_client.submit_transaction(chunk))
+                deleted += len(chunk)
+        return deleted
+
+
+class SqliteTableStorage(TableStorage):
+    """
+    Tables in one SQLite file. Each table is a WITHOUT ROWID table clustered
+    on (PartitionKey, RowKey), so a partition range query reads one
+    contiguous key range, as in table storage; the other properties are
+    stored as a JSON object. Daily aggregates are computed in SQL.
+
+    Each thread gets its own connection; the file is in WAL mode, so reads
+    run concurrently with a writer.
+    """
+
+    name = "sqlite"
+
+    # Table names follow the table storage rules
+    _TABLE_NAME = re.compile(r"^[A-Za-z][A-Za-z0-9]{2,62}$")
+
+    def __init__(self, path: str = TABLE_STORAGE_SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self._ready_tables = set()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Autocommit; batches open their own transactions
+            connection = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def _table(self, table_name: str) -> str:
+        if table_name not in self._ready_tables:
+            self.create_table(table_name)
+        return f'"{table_name}"'
+
+    def create_table(self, table_name: str):
+        if not self._TABLE_NAME.match(table_name):
+            raise ValueError(f"Invalid table name '{table_name}'")
+        self._connection().execute(
+            f'CREATE TABLE IF NOT EXISTS "{table_name}" ('
+            "PartitionKey TEXT NOT NULL, RowKey TEXT NOT NULL, Properties TEXT NOT NULL, "
+            "PRIMARY KEY (PartitionKey, RowKey)) WITHOUT ROWID")
+        with self._lock:
+            self._ready_tables.add(table_name)
+
+    @staticmethod
+    def _encode_value(value):
+        if isinstance(value, datetime):
+            return {"$datetime": value.isoformat()}
+        if isinstance(value, bytes):
+            return {"$binary": base64.b64encode(value).decode("ascii")}
+        return value
+
+    @classmethod
+    def _encode(cls, entity: Dict) -> str:
+        # Like table storage, None properties are not stored
+        return json.dumps({
+            key: cls._encode_value(value)
+            for key, value in entity.items()
+            if key not in ("PartitionKey", "RowKey") and value is not None
+        })
+
+    @staticmethod
+    def _decode_value(value):
+        if isinstance(value, dict):
+            if "$datetime" in value:
+                return datetime.fromisoformat(value["$datetime"])
+            if "$binary" in value:
+                return base64.b64decode(value["$binary"])
+        return value
+
+    def _entity(self, partition_key: str, row_key: str, properties: str, select: List[str] = None) -> Dict:
+        entity = {"PartitionKey": partition_key, "RowKey": row_key}
+        entity.update((key, self._decode_value(value))
+                      for key, value in json.loads(properties).items())
+        if select:
+            return {key: entity[key] for key in select if key in entity}
+        return entity
+
+    def upsert_batch(self, table_name: str, entities: Iterable[Dict], replace: bool = False) -> int:
+        rows = {(entity["PartitionKey"], entity["RowKey"]): entity for entity in entities}
+        if not rows:
+            return 0
+
+        table = self._table(table_name)
+        if replace:
+            statement = f"INSERT OR REPLACE INTO {table} (PartitionKey, RowKey, Properties) VALUES (?, ?, ?)"
+        else:
+            # Merge: the new properties overwrite, the others are kept
+            statement = (
+                f"INSERT INTO {table} (PartitionKey, RowKey, Properties) VALUES (?, ?, ?) "
+                "ON CONFLICT (PartitionKey, RowKey) DO UPDATE SET Properties = json_patch(Properties, excluded.Properties)")
+
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany(statement, (
+                (partition_key, row_key, self._encode(entity)) for (partition_key, row_key), entity in rows.items()))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    def query(self, table_name: str, partition_key: str = None, low: str = None, high: str = None,
+              select: List[str] = None) -> Iterator[Dict]:
+        clauses, parameters = [], []
+        for clause, value in (("PartitionKey = ?", partition_key), ("RowKey >= ?", low), ("RowKey <= ?", high)):
+            if value is not None:
+                clauses.append(clause)
+                parameters.append(value)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        cursor = self._connection().execute(
+            f"SELECT PartitionKey, RowKey, Properties FROM {self._table(table_name)}{where} "
+            "ORDER BY PartitionKey, RowKey", parameters)
+        for partition_key, row_key, properties in cursor:
+            yield self._entity(partition_key, row_key, properties, select)
+
+    def get_entity(self, table_name: str, partition_key: str, row_key: str) -> Optional[Dict]:
+        row = self._connection().execute(
+            f"SELECT Properties FROM {self._table(table_name)} WHERE PartitionKey = ? AND RowKey = ?",
+            (partition_key, row_key)).fetchone()
+        return self._entity(partition_key, row_key, row[0]) if row else None
+
+    def delete_entity(self, table_name: str, partition_key: str, row_key: str):
+        self._connection().execute(
+            f"DELETE FROM {self._table(table_name)} WHERE PartitionKey = ? AND RowKey = ?",
+            (partition_key, row_key))
+
+    def delete_batch(self, table_name: str, keys: Iterable[Tuple[str, str]]) -> int:
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return 0
+
+        table = self._table(table_name)
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany(
+                f"DELETE FROM {table} WHERE PartitionKey = ? AND RowKey = ?", keys)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return len(keys)
+
+    def read_daily_aggregates(self, table_name: str, partition_key: str, column: str,
+                              start_date: str, end_date: str) -> Dict[str, tuple]:
+        # The date is the RowKey up to the first space, as in aggregate_daily
+        rows = self._connection().execute(
+            "SELECT day, sum(value), count(value) FROM ("
+            "SELECT CASE instr(RowKey, ' ') WHEN 0 THEN RowKey ELSE substr(RowKey, 1, instr(RowKey, ' ') - 1) END AS day, "
+            f"json_extract(Properties, ?) AS value FROM {self._table(table_name)} "
+            "WHERE PartitionKey = ? AND RowKey >= ? AND RowKey <= ?) "
+            "WHERE value IS NOT NULL GROUP BY day",
+            (f'$."{column}"', partition_key, start_date, f"{end_date} 23:59:59"))
+        return {day: (float(total), count) for day, total, count in rows}
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
+
+
+def create_table_storage(backend: str = None) -> TableStorage:
+    """
+    The table storage configured by TABLE_STORAGE_BACKEND (or `backend`).
+    """
+    backend = backend or TABLE_STORAGE_BACKEND
+    if backend == "azure":
+        return AzureTableStorage()
+    if backend == "sqlite":
+        return SqliteTableStorage()
+    raise ValueError(f"Unknown table storage backend '{backend}'")
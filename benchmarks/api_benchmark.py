@@ -0,0 +1,151 @@
+"""
+Load-test the REST API dashboard routes and report requests per second and
+latency percentiles.
+
+Runs a fixed number of concurrent clients against each path for a fixed
+duration and prints throughput, p50/p95/p99 latency and errors per target.
+To compare two builds (e.g. the sync routes before and the async routes
+after), run both APIs side by side and pass the old one as --baseline-url;
+the same load is run against each and the deltas are printed.
+
+Start the APIs with RESPONSE_CACHE_TTL_SEC=0, otherwise the response cache
+answers every request after the first and the routes themselves are not
+measured.
+
+Requests need a bearer token: pass an Auth0 access token with --token, or
+sign one locally with --private-key/--kid when the API reads its keys from
+a local JWKS file (JWKS_FILE).
+
+Usage (from the repository root):
+    python benchmarks/api_benchmark.py --url http://localhost:8000 --baseline-url http://localhost:8001 \\
+        --token "$TOKEN" --path /farms/farmdashboard --path /fields/fielddashboard<field id>
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import aiohttp
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="http://localhost:8000",
+                        help="API under test")
+    parser.add_argument("--baseline-url",
+                        help="API to compare against (e.g. the previous build)")
+    parser.add_argument("--path", action="append",
+                        help="route to load, repeatable (default: /farms/farmdashboard)")
+    parser.add_argument("--token", default=os.getenv("API_TOKEN"),
+                        help="bearer token (default: $API_TOKEN)")
+    parser.add_argument("--private-key",
+                        help="PEM key to sign a token with instead of --token")
+    parser.add_argument("--kid", default="bench",
+                        help="kid of --private-key in the API's JWKS")
+    parser.add_argument("--sub", default="auth0|benchmark",
+                        help="user of the signed token")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20,
+                        help="seconds of load per path and target")
+    parser.add_argument("--warmup", type=float, default=3,
+                        help="seconds of unmeasured load first")
+    return parser.parse_args()
+
+
+def sign_token(args) -> str:
+    from jose import jwt
+
+    with open(args.private_key) as f:
+        key = f.read()
+    now = int(time.time())
+    claims = {
+        "sub": args.sub,
+        "aud": os.getenv("AUTH0_AUDIENCE"),
+        "iss": f"https://{os.getenv('AUTH0_DOMAIN')}/",
+        "iat": now,
+        "exp": now + 3600,
+    }
+    return jwt.encode(claims, key, algorithm="RS256", headers={"kid": args.kid})
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def load(session, url: str, concurrency: int, duration: float) -> dict:
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                async with session.get(url) as response:
+                    await response.read()
+                    if response.status != 200:
+                        errors += 1
+                        continue
+            except aiohttp.ClientError:
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) if latencies else float("nan"),
+        "p95": percentile(latencies, 0.95) if latencies else float("nan"),
+        "p99": percentile(latencies, 0.99) if latencies else float("nan"),
+    }
+
+
+async def run(args, token: str) -> int:
+    targets = [("baseline", args.baseline_url)] if args.baseline_url else []
+    targets.append(("current", args.url))
+    paths = args.path or ["/farms/farmdashboard"]
+
+    headers = {"Authorization": f"Bearer {token}"}
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    failed = False
+    async with aiohttp.ClientSession(headers=headers, connector=connector) as session:
+        print(f"{'path':40} {'target':9} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        for path in paths:
+            results = {}
+            for name, base_url in targets:
+                url = base_url.rstrip("/") + path
+                if args.warmup > 0:
+                    await load(session, url, args.concurrency, args.warmup)
+                result = results[name] = await load(session, url, args.concurrency, args.duration)
+                failed = failed or result["errors"] > 0
+                print(f"{path[:40]:40} {name:9} {result['rps']:9.1f} {result['p50']:9.1f} "
+                      f"{result['p95']:9.1f} {result['p99']:9.1f} {result['errors']:7}")
+            if "baseline" in results and results["baseline"]["requests"]:
+                baseline, current = results["baseline"], results["current"]
+                print(f"{'':40} {'change':9} {current['rps'] / baseline['rps']:8.2f}x "
+                      f"{'':9} {'':9} {current['p99'] - baseline['p99']:+9.1f}")
+    return 1 if failed else 0
+
+
+def main():
+    args = parse_args()
+    if args.private_key:
+        token = sign_token(args)
+    elif args.token:
+        token = args.token
+    else:
+        sys.exit("Pass --token (or set API_TOKEN) or --private-key")
+    sys.exit(asyncio.run(run(args, token)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Compare scans over a year of weatherdata before and after cold compaction.
+
+Writes hourly readings for a set of sensors over the last --days days, then
+times the scans the history and GDD endpoints make over the whole range:
+
+- values: iter_weather_values over temperature_actual, in rows per second
+- daily aggregates: get_daily_aggregates of temperature_actual per sensor
+
+Every closed month is then compacted into columnar blocks
+(azure_table_service.cold_storage) and the same scans are timed again. The
+results must be identical, and a second compaction must move no rows.
+
+The azure backend needs Azure Table Storage or Azurite (AZURE_STORAGE_SERVICE
+as for the services) and writes to the weatherdata and weathercold tables,
+under BENCH-COLD-* partitions that are left in place.
+
+Usage (from the repository root):
+    python benchmarks/cold_storage_benchmark.py --backend sqlite --sensors 10 --days 365
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage_conformance import open_storage  # noqa: E402
+from azure_table_service.service import AzureTableService  # noqa: E402
+from azure_table_service.cold_storage import (  # noqa: E402
+    COLD_WEATHER_TABLE, current_month)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--backend", choices=["sqlite", "azure"], default="sqlite")
+    parser.add_argument("--path", help="SQLite file (default: a temporary one)")
+    parser.add_argument("--sensors", type=int, default=10)
+    parser.add_argument("--days", type=int, default=365,
+                        help="days of hourly readings per sensor")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="times each scan is timed (the best is reported)")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+def generate(rng, serials, first_hour, n_days):
+    for serial in serials:
+        yield [{
+            "PartitionKey": serial,
+            "RowKey": (first_hour + timedelta(hours=hour)).strftime("%Y-%m-%d %H:%M:%S"),
+            "temperature_actual": round(rng.uniform(-10, 35), 2),
+            "relative_humidity": rng.randint(30, 100),
+        } for hour in range(n_days * 24)]
+
+
+def scan(service, serials, start, end, repeat):
+    """
+    Run both scans `repeat` times. Returns their results and the best time
+    of each.
+    """
+    best = {"values": float("inf"), "daily aggregates": float("inf")}
+    for _ in range(repeat):
+        started = time.perf_counter()
+        values = {serial: list(service.iter_weather_values(serial, "temperature_actual", start, end))
+                  for serial in serials}
+        best["values"] = min(best["values"], time.perf_counter() - started)
+
+        started = time.perf_counter()
+        aggregates = {serial: service.get_daily_aggregates(
+            serial, "temperature_actual", start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"))
+            for serial in serials}
+        best["daily aggregates"] = min(best["daily aggregates"], time.perf_counter() - started)
+    return (values, aggregates), best
+
+
+def count_entities(service, table, serials):
+    return sum(sum(1 for _ in service.storage.query(table, serial, select=["RowKey"])) for serial in serials)
+
+
+def main():
+    args = parse_args()
+    serials = [f"BENCH-COLD-{index:05d}" for index in range(args.sensors)]
+    end = datetime.now().replace(minute=0, second=0, microsecond=0)
+    start = end - timedelta(days=args.days)
+    service = AzureTableService(storage=open_storage(args.backend, args.path))
+
+    try:
+        started = time.perf_counter()
+        rows = 0
+        for batch in generate(random.Random(args.seed), serials, start, args.days):
+            rows += service.upsert_entities_batch("weatherdata", batch)
+        print(f"{args.backend}: {rows} rows for {args.sensors} sensors over {args.days} days "
+              f"written in {time.perf_counter() - started:.2f}s\n")
+
+        hot_result, hot_times = scan(service, serials, start, end, args.repeat)
+        hot_entities = count_entities(service, "weatherdata", serials)
+
+        started = time.perf_counter()
+        compacted = {"months": 0, "rows": 0}
+        for serial in serials:
+            for key, value in service.compact_weather(serial, current_month()).items():
+                compacted[key] += value
+        print(f"compacted {compacted['rows']} rows in {compacted['months']} sensor-months "
+              f"in {time.perf_counter() - started:.2f}s")
+
+        again = [service.compact_weather(serial, current_month())["rows"] for serial in serials]
+        cold_result, cold_times = scan(service, serials, start, end, args.repeat)
+        cold_entities = count_entities(service, "weatherdata", serials) + \
+            count_entities(service, COLD_WEATHER_TABLE, serials)
+
+        print(f"entities: {hot_entities} hot before, {cold_entities} hot and cold after\n")
+        scanned = sum(len(values) for values in hot_result[0].values())
+        print(f"  {'scan':18} {'hot':>10} {'cold':>10} {'speedup':>8}")
+        for name, hot_time in hot_times.items():
+            print(f"  {name:18} {hot_time:9.2f}s {cold_times[name]:9.2f}s {hot_time / cold_times[name]:7.1f}x")
+        print(f"  ({scanned} values per values scan: {scanned / hot_times['values']:.0f} rows/s hot, "
+              f"{scanned / cold_times['values']:.0f} rows/s cold)")
+
+        failed = False
+        if cold_result != hot_result:
+            print("\nFAILED: scans over cold storage differ from the hot ones")
+            failed = True
+        if any(again):
+            print(f"\nFAILED: a second compaction moved {sum(again)} rows")
+            failed = True
+        if failed:
+            sys.exit(1)
+    finally:
+        service.storage.close()
+
+
+if __name__ == "__main__":
+    main()
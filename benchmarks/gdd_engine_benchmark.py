@@ -0,0 +1,192 @@
+"""
+Benchmark the vectorized GDD engine against the per-sensor service path.
+
+Generates synthetic hourly readings (actual and forecast temperatures) and
+computes current GDD and cutting dates for every sensor:
+
+- engine: azure_table_service.gdd_engine.compute over columnar arrays,
+  processed in chunks of sensors to bound memory, for the whole fleet
+- per-sensor: AzureTableService on a SQLite backend for a sample of sensors
+  whose readings are stored in weatherdata: add_gdd_actual,
+  add_gdd_forecast and rebuild_cumulative_gdd, then calculate_sensor_gdd and
+  calculate_cutting_date over the cumulative index; timed and extrapolated
+  to the fleet
+
+For the sample, the engine also runs over the same stored rows
+(gdd_engine.load_batch and compute), and its results are checked to match
+the service's before timings are printed.
+
+Usage (from the repository root):
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/gdd_engine_benchmark.py --sensors 10000 --days 365
+"""
+import argparse
+import math
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage_conformance import open_storage  # noqa: E402
+from azure_table_service import gdd_engine  # noqa: E402
+from azure_table_service.service import AzureTableService  # noqa: E402
+
+
+def generate(rng, n_sensors, n_days, first_day):
+    """
+    Hourly readings for n_sensors over n_days: actual temperatures up to
+    today, forecast temperatures for the whole range.
+    """
+    hours = n_days * 24
+    day_ordinals = first_day.toordinal() + np.repeat(np.arange(n_days), 24)
+    sensor_index = np.repeat(np.arange(n_sensors), hours)
+    day_column = np.tile(day_ordinals, n_sensors)
+    actual = np.round(rng.uniform(-10, 35, n_sensors * hours), 2)
+    forecast = np.round(rng.uniform(-5, 30, n_sensors * hours), 2)
+    return sensor_index, day_column, actual, forecast
+
+
+def engine_batch(sensor_index, day_column, actual, forecast, serials, first_ordinal, n_days, today_ordinal):
+    """
+    A GddBatch straight from the generated arrays, as load_batch builds it
+    from stored rows.
+    """
+    batch = gdd_engine.GddBatch(serials, first_ordinal, n_days)
+    has_actual = day_column <= today_ordinal
+    batch.actual = gdd_engine.daily_means(
+        sensor_index[has_actual], day_column[has_actual], actual[has_actual], len(serials), first_ordinal, n_days)
+    batch.forecast = gdd_engine.daily_means(
+        sensor_index, day_column, forecast, len(serials), first_ordinal, n_days)
+    return batch
+
+
+def store_sample(service, serials, sensor_index, day_column, actual, forecast, today_ordinal):
+    """
+    Write the sample sensors' readings to weatherdata, one entity per hour.
+    Without a grid cell mapping, a sensor's forecast is in its own partition.
+    """
+    for i, serial in enumerate(serials):
+        rows = np.flatnonzero(sensor_index == i)
+        entities = []
+        for hour, row in enumerate(rows.tolist()):
+            ordinal = int(day_column[row])
+            entity = {
+                "PartitionKey": serial,
+                "RowKey": (datetime.fromordinal(ordinal) + timedelta(hours=hour % 24)).strftime("%Y-%m-%d %H:%M:%S"),
+                "air_temperature": float(forecast[row]),
+            }
+            if ordinal <= today_ordinal:
+                entity["temperature_actual"] = float(actual[row])
+            entities.append(entity)
+        service.upsert_entities_batch("weatherdata", entities)
+
+
+def service_run(service, serial, reset_date, optimal_gdd):
+    """
+    The AzureTableService path for one sensor rebuilt from its readings:
+    daily GDD, the cumulative index, then current GDD and cutting date.
+    """
+    service.add_gdd_actual(serial)
+    service.add_gdd_forecast(serial)
+    service.rebuild_cumulative_gdd(serial)
+    return (service.calculate_sensor_gdd(serial, reset_date),
+            service.calculate_cutting_date(serial, optimal_gdd, reset_date))
+
+
+def engine_from_storage(service, serials, reset_dates, optimal_gdd, first_day, last_day, today):
+    """
+    The engine over the same stored rows: load_batch and compute.
+    """
+    actual_readings = [row for serial in serials
+                       for row in service.get_weather_data_with_actual_temperature(serial)]
+    forecast_readings = {serial: service.get_weather_data_with_air_temperature(
+        service.get_forecast_partition(serial)) for serial in serials}
+    batch = gdd_engine.load_batch(
+        serials, actual_readings, forecast_readings, first_day, last_day)
+    return gdd_engine.compute(batch, reset_dates, optimal_gdd, today)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sensors", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--chunk-sensors", type=int, default=1000,
+                        help="sensors per engine chunk (bounds memory)")
+    parser.add_argument("--sample-sensors", type=int, default=20,
+                        help="sensors stored and timed with the service")
+    parser.add_argument("--path", help="SQLite file for the sample (default: a temporary one)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    today = date.today()
+    first_day = today - timedelta(days=args.days - 8)
+    last_day = first_day + timedelta(days=args.days - 1)
+    first_ordinal = first_day.toordinal()
+    today_ordinal = today.toordinal()
+
+    # Engine over the whole fleet, chunk by chunk
+    engine_sec = 0.0
+    sample = None
+    for start in range(0, args.sensors, args.chunk_sensors):
+        n = min(args.chunk_sensors, args.sensors - start)
+        serials = [f"BENCH-GDD-{start + i:06d}" for i in range(n)]
+        sensor_index, day_column, actual, forecast = generate(
+            rng, n, args.days, first_day)
+        reset_dates = {serial: datetime.fromordinal(int(ordinal)) for serial, ordinal in
+                       zip(serials, first_ordinal + rng.integers(0, args.days // 2, n))}
+        optimal_gdd = dict(zip(serials, rng.integers(200, 3000, n).tolist()))
+
+        started = time.perf_counter()
+        gdd_engine.compute(engine_batch(sensor_index, day_column, actual, forecast, serials,
+                                        first_ordinal, args.days, today_ordinal),
+                           reset_dates, optimal_gdd, today)
+        engine_sec += time.perf_counter() - started
+
+        if sample is None:
+            sample = (serials, sensor_index, day_column, actual, forecast, reset_dates, optimal_gdd)
+
+    # The service and the engine over the same stored rows, for a sample of the first chunk
+    serials, sensor_index, day_column, actual, forecast, reset_dates, optimal_gdd = sample
+    serials = serials[:args.sample_sensors]
+    service = AzureTableService(storage=open_storage("sqlite", args.path))
+    try:
+        store_sample(service, serials, sensor_index, day_column, actual, forecast, today_ordinal)
+
+        started = time.perf_counter()
+        expected = {serial: service_run(service, serial, reset_dates[serial], optimal_gdd[serial])
+                    for serial in serials}
+        service_sec = time.perf_counter() - started
+
+        started = time.perf_counter()
+        results = engine_from_storage(
+            service, serials, reset_dates, optimal_gdd, first_day, last_day, today)
+        engine_sample_sec = time.perf_counter() - started
+    finally:
+        service.storage.close()
+
+    mismatches = [serial for serial in serials
+                  if not math.isclose(expected[serial][0], results[serial]["current_gdd"], abs_tol=1e-9)
+                  or expected[serial][1] != results[serial]["cutting_date"]]
+
+    service_fleet_sec = service_sec / len(serials) * args.sensors
+    readings = args.sensors * args.days * 24 * 2
+    print(f"sensors={args.sensors} days={args.days} readings={readings:,}")
+    print(f"engine:     {engine_sec:8.2f}s for the fleet (in memory)")
+    print(f"per-sensor: {service_fleet_sec:8.2f}s for the fleet "
+          f"(extrapolated from {len(serials)} sensors, {service_sec:.2f}s)")
+    print(f"speedup:    {service_fleet_sec / engine_sec:8.1f}x (the service also reads and writes storage)")
+    print(f"sample:     {engine_sample_sec:8.2f}s engine against {service_sec:.2f}s service, "
+          f"both reading the stored rows ({service_sec / engine_sample_sec:.1f}x)")
+    print(f"mismatches: {len(mismatches)} of {len(serials)} sampled sensors")
+    for serial in mismatches[:5]:
+        print(f"  {serial}: service {expected[serial]}, engine {results[serial]}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
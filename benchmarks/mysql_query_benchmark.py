@@ -0,0 +1,253 @@
+"""
+Benchmark every MySQLService query against a large synthetic dataset and
+check their query plans.
+
+Seeds a separate benchmark database (farms, users, fields, sensors and reset
+dates), applies the schema migrations, then calls each MySQLService method
+several times. For every SQL statement a method issues, the script records
+the latency and runs EXPLAIN on it. A statement that reads a seeded table
+with a full scan (EXPLAIN type ALL) fails the run, unless the method is
+expected to read the whole table, so missing indexes are caught before they
+ship.
+
+Needs a MySQL server (DB_HOST, DB_PORT, DB_USER, DB_PASSWORD as for the
+services). The benchmark database is created if needed and is reseeded
+with --reseed.
+
+Usage (from the repository root):
+    python benchmarks/mysql_query_benchmark.py --farms 2000 --database farmadvisor_bench
+"""
+import argparse
+import os
+import random
+import re
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Methods that read whole tables by design; their full scans are expected
+FULL_SCAN_ALLOWED = {"get_all_fields_with_sensors", "get_all_sensors"}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--database", default="farmadvisor_bench",
+                        help="benchmark database, created if missing (never the real one)")
+    parser.add_argument("--farms", type=int, default=2000)
+    parser.add_argument("--fields-per-farm", type=int, default=5)
+    parser.add_argument("--sensors-per-field", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=20,
+                        help="calls per query")
+    parser.add_argument("--reseed", action="store_true",
+                        help="drop and reseed the benchmark data")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+def ensure_database(args):
+    import pymysql
+    from mysql_service.config import DATABASE_CONFIG
+
+    connection = pymysql.connect(host=DATABASE_CONFIG["host"], port=DATABASE_CONFIG["port"],
+                                 user=DATABASE_CONFIG["user"], password=DATABASE_CONFIG["password"])
+    try:
+        with connection.cursor() as cursor:
+            if args.reseed:
+                cursor.execute(f"DROP DATABASE IF EXISTS `{args.database}`")
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{args.database}`")
+    finally:
+        connection.close()
+
+
+def insert_rows(connection, table, rows, chunk_size=5000):
+    for start in range(0, len(rows), chunk_size):
+        connection.execute(table.insert(), rows[start:start + chunk_size])
+
+
+def seed(service, args, rng):
+    """
+    Insert the synthetic dataset unless the database already holds one.
+    Returns sample keys to run the queries with and the table row counts.
+    """
+    from sqlalchemy import func, select
+    from mysql_service.models import Farm, FarmUsers, Field, Sensor, SensorResetDates, StateEnum, User
+
+    with service.engine.begin() as connection:
+        existing = connection.execute(
+            select(func.count()).select_from(Sensor.__table__)).scalar()
+        if not existing:
+            now = datetime.now()
+            users, farms, farm_users, fields, sensors, reset_dates = [], [], [], [], [], []
+            for farm_index in range(args.farms):
+                farm_id = str(uuid.uuid4())
+                user_id = str(uuid.uuid4())
+                farms.append({"FarmId": farm_id, "Name": f"Farm {farm_index}", "Postcode": "0000",
+                              "City": "Grimstad", "Country": "Norway"})
+                users.append({"UserID": user_id, "Name": f"User {farm_index}", "Phone": "Unknown",
+                              "Email": f"user{farm_index}@example.com", "AuthId": f"auth0|{farm_index}"})
+                farm_users.append({"UserId": user_id, "FarmId": farm_id,
+                                   "Role": 1, "Timestamp": now})
+                for field_index in range(args.fields_per_farm):
+                    field_id = str(uuid.uuid4())
+                    fields.append({"FieldId": field_id, "FarmId": farm_id, "Name": f"Field {field_index}",
+                                   "Altitude": rng.randint(0, 500), "Polygon": " "})
+                    for _ in range(args.sensors_per_field):
+                        sensor_id = str(uuid.uuid4())
+                        sensors.append({
+                            "SensorId": sensor_id, "FieldId": field_id, "SerialNo": f"SN-{len(sensors):08d}",
+                            "LastCommunication": now, "BatterStatus": 1, "OptimalGDD": rng.randint(200, 400),
+                            "Long": rng.uniform(4, 31), "Lat": rng.uniform(58, 71), "State": StateEnum.Active.name,
+                        })
+                        reset_dates.append({"SensorId": sensor_id, "UserId": user_id,
+                                            "Timestamp": now - timedelta(days=rng.randint(0, 120))})
+
+            started = time.perf_counter()
+            for model, rows in ((User, users), (Farm, farms), (FarmUsers, farm_users), (Field, fields),
+                                (Sensor, sensors), (SensorResetDates, reset_dates)):
+                insert_rows(connection, model.__table__, rows)
+            print(f"Seeded {len(farms)} farms, {len(fields)} fields and {len(sensors)} sensors "
+                  f"in {time.perf_counter() - started:.1f}s")
+
+        sample = connection.execute(
+            select(Sensor.SensorId, Sensor.SerialNo, Sensor.FieldId, FarmUsers.UserId, User.AuthId)
+            .join(Field, Field.FieldId == Sensor.FieldId)
+            .join(FarmUsers, FarmUsers.FarmId == Field.FarmId)
+            .join(User, User.UserID == FarmUsers.UserId)
+            .order_by(func.rand())
+            .limit(200)
+        ).all()
+        counts = {
+            model.__tablename__: connection.execute(
+                select(func.count()).select_from(model.__table__)).scalar()
+            for model in (User, Farm, FarmUsers, Field, Sensor, SensorResetDates)
+        }
+    return sample, counts
+
+
+def queries(service, sample):
+    """
+    (method name, callable) for every MySQLService query, each picking its
+    arguments from the sample.
+    """
+    def pick():
+        return random.choice(sample)
+
+    serials = [row.SerialNo for row in sample]
+    sensor_ids = [row.SensorId for row in sample]
+    return [
+        ("get_or_create_user", lambda: service.get_or_create_user(
+            {"sub": pick().AuthId, "name": "Bench", "email": "bench@example.com"})),
+        ("get_farms_with_fields_by_user",
+         lambda: service.get_farms_with_fields_by_user(pick().UserId)),
+        ("get_field_by_id", lambda: service.get_field_by_id(pick().FieldId)),
+        ("get_sensors_by_field_id",
+         lambda: service.get_sensors_by_field_id(pick().FieldId)),
+        ("get_latest_sensor_reset_date",
+         lambda: service.get_latest_sensor_reset_date(pick().SensorId)),
+        ("get_sensor_reset_date_by_sensor_id",
+         lambda: service.get_sensor_reset_date_by_sensor_id(pick().SensorId)),
+        ("get_latest_sensor_reset_date_by_serial",
+         lambda: service.get_latest_sensor_reset_date_by_serial(pick().SerialNo)),
+        ("get_latest_reset_dates_by_serials",
+         lambda: service.get_latest_reset_dates_by_serials(serials)),
+        ("get_latest_reset_dates_by_sensor_ids",
+         lambda: service.get_latest_reset_dates_by_sensor_ids(sensor_ids)),
+        ("update_sensor_cutting_date", lambda: service.update_sensor_cutting_date(
+            pick().SerialNo, datetime.now())),
+        ("update_sensor_cutting_dates", lambda: service.update_sensor_cutting_dates(
+            {serial: datetime.now() for serial in serials})),
+        ("get_all_fields_with_sensors", service.get_all_fields_with_sensors),
+        ("get_all_sensors", service.get_all_sensors),
+    ]
+
+
+class StatementRecorder:
+    """
+    Collects the SQL statements (with parameters) the engine executes.
+    """
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.statements = []
+        event.listen(engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if executemany and parameters:
+            parameters = parameters[0]
+        self.statements.append((statement, parameters))
+
+    def take(self):
+        statements, self.statements = self.statements, []
+        return statements
+
+
+def explain(service, statement, parameters):
+    connection = service.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"EXPLAIN {statement}", parameters)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    finally:
+        connection.close()
+
+
+def main():
+    args = parse_args()
+    os.environ["DB_NAME"] = args.database
+    ensure_database(args)
+
+    from mysql_service.service import MySQLService
+
+    service = MySQLService()
+    # The services log every statement; keep the benchmark output readable
+    service.engine.echo = False
+    rng = random.Random(args.seed)
+    random.seed(args.seed)
+    sample, counts = seed(service, args, rng)
+    print(f"Row counts: {counts}")
+
+    recorder = StatementRecorder(service.engine)
+    failures = []
+    print(f"{'query':42} {'p50 ms':>9} {'p95 ms':>9}  plan")
+    for name, call in queries(service, sample):
+        latencies = []
+        statements = {}
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            call()
+            latencies.append((time.perf_counter() - started) * 1000)
+            for statement, parameters in recorder.take():
+                if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+                    statements.setdefault(statement, parameters)
+
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        plans = []
+        for statement, parameters in statements.items():
+            for row in explain(service, statement, parameters):
+                # SQLAlchemy aliases joined tables as <table>_<n>
+                table = re.sub(r"_\d+$", "", row.get("table") or "")
+                plans.append(f"{table}:{row.get('type')}/{row.get('key')}")
+                # Only scans of the seeded tables matter; derived tables are tiny
+                if row.get("type") == "ALL" and table in counts and counts[table] > 1 and name not in FULL_SCAN_ALLOWED:
+                    failures.append((name, table, statement))
+        recorder.take()
+        print(
+            f"{name:42} {statistics.median(latencies):9.2f} {p95:9.2f}  {', '.join(plans)}")
+
+    if failures:
+        print("\nFull table scans:")
+        for name, table, statement in failures:
+            print(f"- {name} scans {table}: {' '.join(statement.split())}")
+        sys.exit(1)
+    print("\nNo unexpected full table scans.")
+
+
+if __name__ == "__main__":
+    main()
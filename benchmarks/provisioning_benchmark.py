@@ -0,0 +1,125 @@
+"""
+Measure the sensor onboarding rate of the one-at-a-time and bulk create
+paths of MySQLService.
+
+Creates a user, a farm and its fields in a benchmark database, then
+registers sensors with create_sensor (one request per sensor, as
+/fields/newsensor) and with create_sensors (a batch per request, as
+/fields/newsensors). Prints sensors per second and the commits made for
+both, and the speedup of the bulk path.
+
+Needs a MySQL server (DB_HOST, DB_PORT, DB_USER, DB_PASSWORD as for the
+services). The benchmark database is created if needed and is dropped
+first with --reseed.
+
+Usage (from the repository root):
+    python benchmarks/provisioning_benchmark.py --sensors 2000 --batch-size 500
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mysql_query_benchmark import ensure_database
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--database", default="farmadvisor_bench",
+                        help="benchmark database, created if missing (never the real one)")
+    parser.add_argument("--reseed", action="store_true",
+                        help="drop the benchmark database first")
+    parser.add_argument("--fields", type=int, default=20,
+                        help="fields the sensors are spread over")
+    parser.add_argument("--sensors", type=int, default=2000,
+                        help="sensors to create with the bulk path")
+    parser.add_argument("--batch-size", type=int, default=500,
+                        help="sensors per bulk request")
+    parser.add_argument("--single", type=int, default=200,
+                        help="sensors to create one at a time (the rate is per sensor)")
+    return parser.parse_args()
+
+
+class CommitCounter:
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.commits = 0
+        event.listen(engine, "commit", self._count)
+
+    def _count(self, connection):
+        self.commits += 1
+
+
+def new_sensors(field_ids, count, run_id):
+    from mysql_service.schemas import CreateSensorSchema
+
+    return [
+        CreateSensorSchema(FieldId=field_ids[index % len(field_ids)], SerialNo=f"BENCH-{run_id}-{index:06d}",
+                           OptimalGDD=300, Long=10.0, Lat=60.0)
+        for index in range(count)
+    ]
+
+
+def report(name, count, elapsed, commits):
+    print(f"{name:12} {count:9} {elapsed:9.2f} {count / elapsed:10.1f} {commits:8}")
+    return count / elapsed
+
+
+def main():
+    args = parse_args()
+    os.environ["DB_NAME"] = args.database
+    ensure_database(args)
+
+    from mysql_service.schemas import CreateFarmSchema, CreateFieldSchema
+    from mysql_service.service import MySQLService
+
+    service = MySQLService()
+    # The services log every statement; keep the benchmark output readable
+    service.engine.echo = False
+
+    run_id = uuid.uuid4().hex[:8]
+    user = service.get_or_create_user(
+        {"sub": f"auth0|bench-{run_id}", "name": "Bench", "email": "bench@example.com"})
+    farm = service.create_farm(CreateFarmSchema(
+        farmName=f"Bench {run_id}", postcode="0000", city="Grimstad", country="Norway"))
+    service.assign_user_to_farm(user.UserID, farm.FarmId, role=1)
+    outcomes = service.create_fields([
+        CreateFieldSchema(FarmId=farm.FarmId, Name=f"Field {index}", Altitude=100)
+        for index in range(args.fields)
+    ])
+    field_ids = [outcome["Id"] for outcome in outcomes]
+
+    counter = CommitCounter(service.engine)
+    print(f"{'path':12} {'sensors':>9} {'seconds':>9} {'sensors/s':>10} {'commits':>8}")
+
+    single = new_sensors(field_ids, args.single, f"{run_id}s")
+    counter.commits = 0
+    started = time.perf_counter()
+    for sensor in single:
+        service.create_sensor(sensor, user.UserID)
+    single_rate = report("one-by-one", len(single),
+                         time.perf_counter() - started, counter.commits)
+
+    bulk = new_sensors(field_ids, args.sensors, f"{run_id}b")
+    counter.commits = 0
+    rejected = 0
+    started = time.perf_counter()
+    for start in range(0, len(bulk), args.batch_size):
+        outcomes = service.create_sensors(
+            bulk[start:start + args.batch_size], user.UserID)
+        rejected += sum(outcome["Status"] != "created" for outcome in outcomes)
+    bulk_rate = report("bulk", len(bulk), time.perf_counter() - started, counter.commits)
+
+    print(f"\nBulk onboarding is {bulk_rate / single_rate:.1f}x faster "
+          f"({args.sensors} sensors in batches of {args.batch_size}).")
+    if rejected:
+        print(f"{rejected} sensors were rejected")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Compare the throughput of the table storage backends on weatherdata-shaped
+rows.
+
+Each backend first passes the conformance checks of storage_conformance.py,
+then gets the same synthetic hourly readings for a set of sensors:
+
+- upsert: rows written per second, in per-sensor batches as the ingest writer
+  sends them
+- range query: rows read per second by one-week partition range queries
+  projecting RowKey and temperature_actual, as the history endpoints do
+- daily aggregates: 30-day read_daily_aggregates calls per second, as the
+  incremental GDD updates make them
+
+The azure backend needs Azure Table Storage or Azurite (AZURE_STORAGE_SERVICE
+as for the services) and writes to a new table, which is left in place.
+
+Usage (from the repository root):
+    python benchmarks/storage_benchmark.py --backend sqlite --backend azure --sensors 20 --days 60
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage_conformance import open_storage, run_conformance  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--backend", choices=["sqlite", "azure"], action="append",
+                        help="backend to measure (repeatable, default: sqlite)")
+    parser.add_argument("--path", help="SQLite file (default: a temporary one)")
+    parser.add_argument("--sensors", type=int, default=20)
+    parser.add_argument("--days", type=int, default=60,
+                        help="days of hourly readings per sensor")
+    parser.add_argument("--batch-size", type=int, default=500,
+                        help="rows per upsert_batch call")
+    parser.add_argument("--queries", type=int, default=200,
+                        help="range queries and aggregate reads to time")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+def generate(rng, n_sensors, n_days, first_day):
+    serials = [f"BENCH-{index:05d}" for index in range(n_sensors)]
+    rows = []
+    for serial in serials:
+        for hour in range(n_days * 24):
+            rows.append({
+                "PartitionKey": serial,
+                "RowKey": (first_day + timedelta(hours=hour)).strftime("%Y-%m-%d %H:%M:%S"),
+                "temperature_actual": round(rng.uniform(-10, 35), 2),
+                "air_temperature": round(rng.uniform(-5, 30), 2),
+                "relative_humidity": round(rng.uniform(30, 100), 1),
+            })
+    return serials, rows
+
+
+def report(name, count, unit, elapsed):
+    print(f"  {name:18} {count:9} {unit:10} {elapsed:8.2f}s {count / elapsed:12.1f} {unit}/s")
+
+
+def measure(storage, args, serials, rows, first_day):
+    table = f"bench{uuid.uuid4().hex[:12]}"
+    storage.create_table(table)
+    rng = random.Random(args.seed)
+
+    started = time.perf_counter()
+    for start in range(0, len(rows), args.batch_size):
+        storage.upsert_batch(table, rows[start:start + args.batch_size])
+    report("upsert", len(rows), "rows", time.perf_counter() - started)
+
+    read = 0
+    started = time.perf_counter()
+    for _ in range(args.queries):
+        low = first_day + timedelta(days=rng.randrange(max(1, args.days - 7)))
+        high = low + timedelta(days=7) - timedelta(seconds=1)
+        read += sum(1 for _ in storage.query(
+            table, rng.choice(serials), low.strftime("%Y-%m-%d %H:%M:%S"), high.strftime("%Y-%m-%d %H:%M:%S"),
+            select=["RowKey", "temperature_actual"]))
+    report("range query", read, "rows", time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for _ in range(args.queries):
+        start_date = first_day.date() + timedelta(days=rng.randrange(max(1, args.days - 30)))
+        storage.read_daily_aggregates(table, rng.choice(serials), "temperature_actual",
+                                      start_date.isoformat(), (start_date + timedelta(days=29)).isoformat())
+    report("daily aggregates", args.queries, "reads", time.perf_counter() - started)
+
+
+def main():
+    args = parse_args()
+    first_day = datetime.combine(datetime.now().date() - timedelta(days=args.days), datetime.min.time())
+    serials, rows = generate(random.Random(args.seed), args.sensors, args.days, first_day)
+    print(f"{len(rows)} rows for {args.sensors} sensors over {args.days} days\n")
+
+    failed = False
+    for backend in args.backend or ["sqlite"]:
+        storage = open_storage(backend, args.path)
+        try:
+            if run_conformance(storage, verbose=False):
+                print(f"{backend}: conformance checks failed, run storage_conformance.py for details")
+                failed = True
+                continue
+            print(f"{backend}:")
+            measure(storage, args, serials, rows, first_day)
+        finally:
+            storage.close()
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
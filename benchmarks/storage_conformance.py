@@ -0,0 +1,207 @@
+"""
+Check that a TableStorage backend behaves as the services expect.
+
+Every backend in azure_table_service.storage must give the same results for
+the operations the services use: merge and replace upserts (with duplicate
+keys keeping the last entity), inclusive partition range queries in RowKey
+order, projections, point reads, single and batch deletes, binary
+properties, and daily aggregates. The checks run against a fresh table and
+print one line per check; the exit status is 1 if any of them fails.
+
+The azure backend needs Azure Table Storage or Azurite (AZURE_STORAGE_SERVICE
+as for the services). The sqlite backend uses a temporary file unless --path
+is given.
+
+Usage (from the repository root):
+    python benchmarks/storage_conformance.py --backend sqlite
+"""
+import argparse
+import os
+import sys
+import tempfile
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from azure_table_service.storage import (  # noqa: E402
+    AzureTableStorage, SqliteTableStorage, aggregate_daily)
+
+
+def check_merge_upsert(storage, table):
+    storage.upsert_batch(table, [{"PartitionKey": "p", "RowKey": "r", "A": 1, "B": "x"}])
+    storage.upsert_batch(table, [{"PartitionKey": "p", "RowKey": "r", "B": "y", "C": 2.5}])
+    entity = storage.get_entity(table, "p", "r")
+    assert (entity["A"], entity["B"], entity["C"]) == (1, "y", 2.5), entity
+
+
+def check_replace_upsert(storage, table):
+    storage.upsert_batch(table, [{"PartitionKey": "p", "RowKey": "r", "A": 1, "B": "x"}])
+    storage.upsert_batch(table, [{"PartitionKey": "p", "RowKey": "r", "B": "z", "A": None}], replace=True)
+    entity = storage.get_entity(table, "p", "r")
+    assert entity["B"] == "z" and "A" not in entity, entity
+
+
+def check_duplicate_keys(storage, table):
+    written = storage.upsert_batch(table, [
+        {"PartitionKey": "p", "RowKey": "r", "A": 1},
+        {"PartitionKey": "q", "RowKey": "r", "A": 2},
+        {"PartitionKey": "p", "RowKey": "r", "A": 3},
+    ])
+    assert written == 2, written
+    assert storage.get_entity(table, "p", "r")["A"] == 3
+
+
+def check_large_partition(storage, table):
+    # More than one Azure transaction per partition
+    entities = [{"PartitionKey": "p", "RowKey": f"{index:04d}", "Value": index} for index in range(250)]
+    assert storage.upsert_batch(table, entities) == 250
+    assert [entity["Value"] for entity in storage.query(table, "p")] == list(range(250))
+
+
+def check_value_types(storage, table):
+    values = {"Int": 7, "Float": 1.25, "Text": "it's", "Flag": True, "Time": datetime(2024, 5, 1, 12, 30),
+              "Blob": bytes(range(256))}
+    storage.upsert_batch(table, [{"PartitionKey": "p", "RowKey": "r", **values}])
+    entity = storage.get_entity(table, "p", "r")
+    for key, value in values.items():
+        # Azure returns its own datetime subclass
+        assert entity[key] == value and isinstance(entity[key], type(value)), (key, entity[key])
+
+
+def check_range_query(storage, table):
+    storage.upsert_batch(table, [
+        {"PartitionKey": partition, "RowKey": f"2024-01-0{day} 12:00:00", "Value": day}
+        for partition in ("p", "q") for day in range(1, 6)
+    ])
+    rows = list(storage.query(table, "p", "2024-01-02", "2024-01-04 12:00:00"))
+    assert [row["Value"] for row in rows] == [2, 3, 4], rows
+    assert all(row["PartitionKey"] == "p" for row in rows), rows
+    assert [row["Value"] for row in storage.query(table, "p", low="2024-01-04")] == [4, 5]
+    assert [row["Value"] for row in storage.query(table, "p", high="2024-01-02 12:00:00")] == [1, 2]
+    assert len(list(storage.query(table))) == 10
+
+
+def check_projection(storage, table):
+    storage.upsert_batch(table, [{"PartitionKey": "p", "RowKey": "r", "A": 1, "B": 2}])
+    rows = list(storage.query(table, "p", select=["RowKey", "A"]))
+    assert len(rows) == 1 and rows[0]["RowKey"] == "r" and rows[0]["A"] == 1 and "B" not in rows[0], rows
+
+
+def check_missing(storage, table):
+    assert storage.get_entity(table, "p", "missing") is None
+    assert list(storage.query(table, "missing")) == []
+    # Deleting a missing entity is not an error
+    storage.delete_entity(table, "p", "missing")
+
+
+def check_delete(storage, table):
+    storage.upsert_batch(table, [{"PartitionKey": "p", "RowKey": row_key, "A": 1} for row_key in ("a", "b")])
+    storage.delete_entity(table, "p", "a")
+    assert [row["RowKey"] for row in storage.query(table, "p")] == ["b"]
+
+
+def check_delete_batch(storage, table):
+    storage.upsert_batch(table, [
+        {"PartitionKey": partition, "RowKey": f"{index:04d}", "A": index}
+        for partition in ("p", "q") for index in range(150)
+    ])
+    keys = [("p", f"{index:04d}") for index in range(0, 150, 2)] + [("q", "0000"), ("p", "0000")]
+    assert storage.delete_batch(table, keys) == 76
+    assert [row["A"] for row in storage.query(table, "p")] == list(range(1, 150, 2))
+    assert len(list(storage.query(table, "q"))) == 149
+
+
+def check_daily_aggregates(storage, table):
+    entities = [
+        {"PartitionKey": "p", "RowKey": f"2024-01-0{day} {hour:02d}:00:00",
+         "Temp": None if hour == 6 else day + hour / 10}
+        for day in range(1, 5) for hour in range(0, 24, 3)
+    ]
+    entities.append({"PartitionKey": "q", "RowKey": "2024-01-02 00:00:00", "Temp": 100.0})
+    entities.append({"PartitionKey": "p", "RowKey": "2024-01-05 00:00:00", "Other": 1.0})
+    storage.upsert_batch(table, entities)
+
+    expected = aggregate_daily(
+        [entity for entity in entities
+         if entity["PartitionKey"] == "p" and "2024-01-02" <= entity["RowKey"] <= "2024-01-05 23:59:59"],
+        "Temp")
+    aggregates = storage.read_daily_aggregates(table, "p", "Temp", "2024-01-02", "2024-01-05")
+    assert set(aggregates) == set(expected) == {"2024-01-02", "2024-01-03", "2024-01-04"}, aggregates
+    for day, (total, count) in expected.items():
+        assert abs(aggregates[day][0] - total) < 1e-9 and aggregates[day][1] == count, (day, aggregates[day])
+
+
+def check_write_daily_aggregates(storage, table):
+    storage.upsert_batch(table, [{"PartitionKey": "p", "RowKey": "2024-01-01", "GddForecast": 4.0}])
+    written = storage.write_daily_aggregates(
+        table, "p", "Actual", {"2024-01-01": (30.0, 3), "2024-01-02": (0.0, 0)})
+    assert written == 1, written
+    entity = storage.get_entity(table, "p", "2024-01-01")
+    assert (entity["GddActual"], entity["ActualSum"], entity["ActualCount"], entity["GddForecast"]) == \
+        (10.0, 30.0, 3, 4.0), entity
+
+
+CHECKS = [
+    check_merge_upsert,
+    check_replace_upsert,
+    check_duplicate_keys,
+    check_large_partition,
+    check_value_types,
+    check_range_query,
+    check_projection,
+    check_missing,
+    check_delete,
+    check_delete_batch,
+    check_daily_aggregates,
+    check_write_daily_aggregates,
+]
+
+
+def run_conformance(storage, verbose: bool = True):
+    """
+    Run every check against its own new table. Returns the names of the
+    checks that failed.
+    """
+    failed = []
+    for check in CHECKS:
+        table = f"conformance{uuid.uuid4().hex[:12]}"
+        try:
+            check(storage, table)
+            status = "ok"
+        except Exception as e:
+            failed.append(check.__name__)
+            status = f"FAILED: {type(e).__name__}: {e}"
+        if verbose:
+            print(f"{storage.name:7} {check.__name__:30} {status}")
+    return failed
+
+
+def open_storage(backend: str, path: str = None):
+    if backend == "azure":
+        return AzureTableStorage()
+    return SqliteTableStorage(path or os.path.join(tempfile.mkdtemp(), "tablestorage.db"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--backend", choices=["sqlite", "azure"], action="append",
+                        help="backend to check (repeatable, default: sqlite)")
+    parser.add_argument("--path", help="SQLite file (default: a temporary one)")
+    args = parser.parse_args()
+
+    failed = []
+    for backend in args.backend or ["sqlite"]:
+        storage = open_storage(backend, args.path)
+        try:
+            failed += run_conformance(storage)
+        finally:
+            storage.close()
+
+    if failed:
+        print(f"\n{len(failed)} checks failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
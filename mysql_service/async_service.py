@@ -0,0 +1,191 @@
+# mysql_service/async_service.py
+import logging
+import os
+import uuid
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import joinedload
+from mysql_service.models import Farm, FarmUsers, Field, Sensor, SensorResetDates, User
+from mysql_service.config import DATABASE_CONFIG
+from mysql_service.service import MAX_IN_CLAUSE_SIZE, farm_with_fields_to_dict
+from mysql_service.user_cache import profile_changes, user_cache
+
+# Connections kept open by the async engine (on top of the sync engine's pool)
+DB_ASYNC_POOL_SIZE = int(os.getenv("DB_ASYNC_POOL_SIZE", 10))
+DB_ASYNC_MAX_OVERFLOW = int(os.getenv("DB_ASYNC_MAX_OVERFLOW", 20))
+
+
+class AsyncMySQLService:
+    """
+    Async (SQLAlchemy asyncio + aiomysql) version of the MySQLService reads
+    behind the dashboards. The schema is created and migrated by MySQLService.
+    """
+
+    def __init__(self):
+        self.engine = self._create_engine()
+        self.Session = async_sessionmaker(
+            bind=self.engine, expire_on_commit=False)
+        # Auth subject -> User, shared with MySQLService
+        self.user_cache = user_cache
+
+    def _create_engine(self):
+        """
+        Create an async SQLAlchemy engine.
+        """
+        connection_string = (
+            f"mysql+aiomysql://{DATABASE_CONFIG['user']}:{DATABASE_CONFIG['password']}"
+            f"@{DATABASE_CONFIG['host']}:{DATABASE_CONFIG['port']}/{DATABASE_CONFIG['database']}"
+        )
+        return create_async_engine(connection_string, pool_size=DB_ASYNC_POOL_SIZE,
+                                   max_overflow=DB_ASYNC_MAX_OVERFLOW, pool_recycle=3600)
+
+    async def close(self):
+        await self.engine.dispose()
+
+    async def get_or_create_user(self, user_info: dict):
+        """
+        The User for the token's subject, created on first sight. Cached by
+        subject, so the row is only written when it is created or its
+        profile claims change.
+        """
+        user = self.user_cache.get(user_info)
+        if user is not None:
+            return user
+
+        async with self.Session() as session:
+            # Check if the user exists
+            user = (await session.execute(
+                select(User).where(User.AuthId == user_info.get("sub")))).scalars().first()
+
+            outcome = None
+            if not user:
+                # Create a new user if not found
+                user = User(
+                    # Generate a new UUID for the user
+                    UserID=str(uuid.uuid4()),
+                    Name=user_info.get("name"),
+                    Phone=user_info.get("phone", "Unknown"),
+                    Email=user_info.get("email"),
+                    AuthId=user_info.get("sub")
+                )
+                session.add(user)
+                outcome = "created"
+            else:
+                changes = profile_changes(user, user_info)
+                for column, value in changes.items():
+                    setattr(user, column, value)
+                if changes:
+                    outcome = "updated"
+
+            if outcome is not None:
+                await session.commit()
+
+        self.user_cache.put(user, outcome)
+        return user
+
+    async def get_farms_with_fields_by_user(self, user_id: str):
+
+        async with self.Session() as session:
+            try:
+                # Query farms associated with the user, including fields and sensors
+                result = await session.execute(
+                    select(Farm)
+                    .join(FarmUsers, Farm.FarmId == FarmUsers.FarmId)
+                    .where(FarmUsers.UserId == user_id)
+                    .options(joinedload(Farm.fields).joinedload(Field.sensors))
+                )
+                return [farm_with_fields_to_dict(farm) for farm in result.unique().scalars().all()]
+            except Exception as e:
+                logging.error(
+                    f"Error retrieving farms for user {user_id}: {e}")
+                raise
+
+    async def get_farm_dashboard_page(self, user_id: str, after_farm_id: Optional[str] = None,
+                                      limit: Optional[int] = None) -> Tuple[List[Dict], Optional[str]]:
+        """
+        A page of the user's farms in FarmId order, starting after
+        `after_farm_id`, with their fields and sensors. Only the columns the
+        farm dashboard uses are read (no field Polygon), with two queries.
+        Returns (farms, FarmId to continue after, or None on the last page);
+        without a limit, all the user's farms are returned.
+        """
+        async with self.Session() as session:
+            try:
+                query = (
+                    select(Farm.FarmId, Farm.Name)
+                    .join(FarmUsers, Farm.FarmId == FarmUsers.FarmId)
+                    .where(FarmUsers.UserId == user_id)
+                    .order_by(Farm.FarmId)
+                )
+                if after_farm_id is not None:
+                    query = query.where(Farm.FarmId > after_farm_id)
+                if limit is not None:
+                    # One extra row tells whether there is a next page
+                    query = query.limit(limit + 1)
+                rows = (await session.execute(query)).all()
+
+                next_farm_id = None
+                if limit is not None and len(rows) > limit:
+                    rows = rows[:limit]
+                    next_farm_id = rows[-1].FarmId
+
+                farms = {
+                    farm_id: {"FarmId": farm_id, "Name": name, "Fields": []}
+                    for farm_id, name in rows
+                }
+                fields = {}
+                farm_ids = list(farms)
+                for start in range(0, len(farm_ids), MAX_IN_CLAUSE_SIZE):
+                    result = await session.execute(
+                        select(Field.FarmId, Field.FieldId, Field.Name,
+                               Sensor.SensorId, Sensor.SerialNo, Sensor.CuttingDateCalculated)
+                        .outerjoin(Sensor, Sensor.FieldId == Field.FieldId)
+                        .where(Field.FarmId.in_(farm_ids[start:start + MAX_IN_CLAUSE_SIZE]))
+                        .order_by(Field.FarmId, Field.FieldId)
+                    )
+                    for row in result:
+                        field = fields.get(row.FieldId)
+                        if field is None:
+                            field = fields[row.FieldId] = {
+                                "FieldId": row.FieldId, "Name": row.Name, "Sensors": []}
+                            farms[row.FarmId]["Fields"].append(field)
+                        if row.SensorId is not None:
+                            field["Sensors"].append({
+                                "SensorId": row.SensorId,
+                                "SerialNo": row.SerialNo,
+                                "CuttingDateCalculated": row.CuttingDateCalculated,
+                            })
+                return list(farms.values()), next_farm_id
+            except Exception as e:
+                logging.error(
+                    f"Error retrieving farm page for user {user_id}: {e}")
+                raise
+
+    async def get_field_by_id(self, field_id: str):
+
+        async with self.Session() as session:
+            result = await session.execute(
+                select(Field)
+                .options(joinedload(Field.sensors))  # Eagerly load sensors
+                .where(Field.FieldId == field_id)
+            )
+            return result.unique().scalars().first()
+
+    async def get_latest_reset_dates_by_sensor_ids(self, sensor_ids: Iterable[str]) -> Dict[str, datetime]:
+        """
+        Latest reset date for many sensors at once, keyed by SensorId.
+        Sensors without a reset date are left out.
+        """
+        keys = list(dict.fromkeys(sensor_ids))
+        reset_dates = {}
+        async with self.Session() as session:
+            for start in range(0, len(keys), MAX_IN_CLAUSE_SIZE):
+                result = await session.execute(
+                    select(SensorResetDates.SensorId, func.max(SensorResetDates.Timestamp))
+                    .where(SensorResetDates.SensorId.in_(keys[start:start + MAX_IN_CLAUSE_SIZE]))
+                    .group_by(SensorResetDates.SensorId)
+                )
+                reset_dates.update(result.all())
+        return reset_dates
@@ -1,8 +1,14 @@
 from .service import MySQLService
+from .async_service import AsyncMySQLService
 
 # Singleton service instance
 mysql_service_instance = MySQLService()
+mysql_async_service_instance = AsyncMySQLService()
 
 # Dependency function
 def get_mysql_service():
     return mysql_service_instance
+
+# Async dependency, so async routes don't hop to the threadpool to resolve it
+async def get_async_mysql_service():
+    return mysql_async_service_instance
@@ -0,0 +1,133 @@
+# mysql_service/migrations.py
+"""
+Versioned schema migrations.
+
+Applied versions are recorded in the `schema_version` table; `run_migrations`
+applies the missing ones in order, each in its own transaction. Version 1 is
+the original schema (created from the models for new databases), so every
+later migration must also work when the models already created what it adds.
+MySQL commits DDL implicitly, so migrations must also be safe to re-run after
+a partial failure.
+
+To change the schema, update the models and append a new migration to
+MIGRATIONS; never edit one that has shipped.
+"""
+import logging
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, text
+
+from mysql_service.models import Base
+
+logger = logging.getLogger(__name__)
+
+# Serializes migrations between processes starting at the same time (API and DataProcessor)
+MIGRATION_LOCK_NAME = "farmadvisor_schema_migrations"
+MIGRATION_LOCK_TIMEOUT_SEC = 60
+
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def _create_index_if_missing(connection, table_name: str, name: str, columns: list, unique: bool = False):
+    """
+    Create an index unless the table already has one on the same leading
+    columns (e.g. the index InnoDB adds for a foreign key), or a unique one
+    when a unique index is required.
+    """
+    inspector = inspect(connection)
+    existing = inspector.get_indexes(table_name) + [
+        {"column_names": constraint["column_names"], "unique": True}
+        for constraint in inspector.get_unique_constraints(table_name)
+    ]
+    for index in existing:
+        if index["column_names"][:len(columns)] == columns and (index.get("unique") or not unique):
+            logger.info(
+                f"Index on {table_name}({', '.join(columns)}) already exists, skipping {name}")
+            return
+
+    quote = connection.dialect.identifier_preparer.quote
+    connection.execute(text(
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX {quote(name)} ON {quote(table_name)} "
+        f"({', '.join(quote(column) for column in columns)})"))
+    logger.info(f"Created index {name} on {table_name}({', '.join(columns)})")
+
+
+def _baseline(connection):
+    Base.metadata.create_all(connection)
+
+
+def _hot_path_indexes(connection):
+    duplicates = connection.execute(text(
+        "SELECT SerialNo FROM Sensor GROUP BY SerialNo HAVING COUNT(*) > 1")).scalars().all()
+    if duplicates:
+        raise RuntimeError(
+            f"Cannot make Sensor.SerialNo unique, duplicated serial numbers: {duplicates}")
+
+    _create_index_if_missing(
+        connection, "Sensor", "uq_Sensor_SerialNo", ["SerialNo"], unique=True)
+    _create_index_if_missing(
+        connection, "Sensor", "ix_Sensor_FieldId", ["FieldId"])
+    _create_index_if_missing(
+        connection, "Field", "ix_Field_FarmId", ["FarmId"])
+    _create_index_if_missing(
+        connection, "User", "ix_User_AuthId", ["AuthId"])
+    _create_index_if_missing(
+        connection, "FarmUsers", "ix_FarmUsers_FarmId", ["FarmId"])
+    _create_index_if_missing(
+        connection, "SensorResetDates", "ix_SensorResetDates_SensorId_Timestamp", ["SensorId", "Timestamp"])
+
+
+# (version, description, migration); append only
+MIGRATIONS = [
+    (1, "baseline schema", _baseline),
+    (2, "indexes for hot-path queries and unique Sensor.SerialNo", _hot_path_indexes),
+]
+
+
+def current_version(connection) -> int:
+    if not inspect(connection).has_table(schema_version.name):
+        return 0
+    version = connection.execute(
+        text(f"SELECT MAX(version) FROM {schema_version.name}")).scalar()
+    return version or 0
+
+
+def run_migrations(engine) -> int:
+    """
+    Apply every migration newer than the database's version.
+    Returns the resulting schema version.
+    """
+    with engine.connect() as lock_connection:
+        locked = engine.dialect.name == "mysql"
+        if locked:
+            acquired = lock_connection.execute(text("SELECT GET_LOCK(:name, :timeout)"), {
+                "name": MIGRATION_LOCK_NAME, "timeout": MIGRATION_LOCK_TIMEOUT_SEC}).scalar()
+            if acquired != 1:
+                raise RuntimeError(
+                    "Timed out waiting for another process to finish schema migrations")
+        try:
+            with engine.begin() as connection:
+                schema_version.create(connection, checkfirst=True)
+                version = current_version(connection)
+
+            for migration_version, description, migration in MIGRATIONS:
+                if migration_version <= version:
+                    continue
+                logger.info(
+                    f"Applying schema migration {migration_version}: {description}")
+                with engine.begin() as connection:
+                    migration(connection)
+                    connection.execute(schema_version.insert().values(
+                        version=migration_version, description=description, applied_at=datetime.utcnow()))
+                version = migration_version
+            return version
+        finally:
+            if locked:
+                lock_connection.execute(
+                    text("SELECT RELEASE_LOCK(:name)"), {"name": MIGRATION_LOCK_NAME})
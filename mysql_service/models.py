@@ -9,6 +9,7 @@ from sqlalchemy import (
     ForeignKey,
     CHAR,
     Float,
+    Index,
 )
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
@@ -36,6 +37,8 @@ class User(Base):
     Email = Column(String(255), nullable=False)
     AuthId = Column(String(255), nullable=False)
 
+    __table_args__ = (Index("ix_User_AuthId", "AuthId"),)
+
 
 class Farm(Base):
     __tablename__ = "Farm"
@@ -58,6 +61,9 @@ class FarmUsers(Base):
     user = relationship("User")
     farm = relationship("Farm")
 
+    # UserId lookups use the primary key (UserId, FarmId)
+    __table_args__ = (Index("ix_FarmUsers_FarmId", "FarmId"),)
+
 
 class Field(Base):
     __tablename__ = "Field"
@@ -70,6 +76,8 @@ class Field(Base):
     farm = relationship("Farm")
     sensors = relationship("Sensor", back_populates="field")
 
+    __table_args__ = (Index("ix_Field_FarmId", "FarmId"),)
+
 
 class Sensor(Base):
     __tablename__ = "Sensor"
@@ -87,6 +95,11 @@ class Sensor(Base):
 
     field = relationship("Field", back_populates="sensors")
 
+    __table_args__ = (
+        Index("uq_Sensor_SerialNo", "SerialNo", unique=True),
+        Index("ix_Sensor_FieldId", "FieldId"),
+    )
+
 
 class SensorResetDates(Base):
     __tablename__ = "SensorResetDates"
@@ -97,3 +110,7 @@ class SensorResetDates(Base):
 
     sensor = relationship("Sensor")
     user = relationship("User")
+
+    __table_args__ = (
+        Index("ix_SensorResetDates_SensorId_Timestamp", "SensorId", "Timestamp"),
+    )
@@ -122,6 +122,24 @@ class ReadSensorSchema(BaseModel):
         from_attributes = True
 
 
+class BulkItemResultSchema(BaseModel):
+    # Position of the item in the request
+    Index: int
+    # "created" or "rejected"
+    Status: str
+    # FieldId / SensorId of a created item
+    Id: Optional[str] = None
+    # FarmId of a field, FieldId of a sensor
+    ParentId: Optional[str] = None
+    Error: Optional[str] = None
+
+
+class BulkCreateResultSchema(BaseModel):
+    Created: int
+    Rejected: int
+    Items: List[BulkItemResultSchema] = []
+
+
 class SensorResetDatesSchema(BaseModel):
     SensorId: str
     Timestamp: datetime
@@ -144,6 +162,12 @@ class FarmDashboardSchema(BaseModel):
     FarmFields: List[FieldDetail] = []
 
 
+class FarmDashboardPageSchema(BaseModel):
+    Farms: List[FarmDashboardSchema] = []
+    # FarmId to pass as `cursor` for the next page, None on the last page
+    NextCursor: Optional[str] = None
+
+
 class FieldSensorSchema(BaseModel):
     SensorId: str
     SerialNo: str
@@ -169,6 +193,24 @@ class FieldDashboardSchema(BaseModel):
     SevenDayHumidityForecast: List[GraphData] = []
 
 
+class HistoryPointSchema(BaseModel):
+    date: datetime
+    # Bucket mean, or the kept reading for LTTB
+    value: float
+    # Bucket statistics (buckets method only)
+    min: Optional[float] = None
+    max: Optional[float] = None
+    count: Optional[int] = None
+
+
+class HistorySchema(BaseModel):
+    Start: datetime
+    End: datetime
+    Method: str
+    Temperature: List[HistoryPointSchema] = []
+    ForecastTemperature: List[HistoryPointSchema] = []
+
+
 class UpdateSensorResetDateSchema(BaseModel):
     SensorId: str
     NewResetDate: datetime
@@ -2,18 +2,67 @@
 import logging
 from datetime import datetime
 import uuid
+from typing import Dict, Iterable, List
 from mysql_service.schemas import CreateFarmSchema, FarmSchema, CreateFieldSchema, CreateSensorSchema, ReadSensorSchema
-from sqlalchemy import create_engine
+from sqlalchemy import bindparam, create_engine, func, select
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm import joinedload
-from mysql_service.models import Base, Farm, FarmUsers, Field, Sensor, SensorResetDates, User, StateEnum
+from mysql_service.models import Farm, FarmUsers, Field, Sensor, SensorResetDates, User, StateEnum
 from mysql_service.config import DATABASE_CONFIG
+from mysql_service.migrations import run_migrations
+from mysql_service.user_cache import profile_changes, user_cache
+
+# Upper bound on the values in one IN (...) list
+MAX_IN_CLAUSE_SIZE = 1000
+
+
+def farm_with_fields_to_dict(farm: Farm) -> dict:
+    """
+    A farm with its fields and their sensors (eagerly loaded) as plain dicts.
+    """
+    return {
+        "FarmId": farm.FarmId,
+        "Name": farm.Name,
+        "Postcode": farm.Postcode,
+        "City": farm.City,
+        "Country": farm.Country,
+        "Fields": [
+            {
+                "FieldId": field.FieldId,
+                "Name": field.Name,
+                "Altitude": field.Altitude,
+                "Polygon": field.Polygon,
+                "Sensors": [
+                    {
+                        "SensorId": sensor.SensorId,
+                        "SerialNo": sensor.SerialNo,
+                        "LastCommunication": sensor.LastCommunication,
+                        "BatterStatus": sensor.BatterStatus,
+                        "OptimalGDD": sensor.OptimalGDD,
+                        "CuttingDateCalculated": sensor.CuttingDateCalculated,
+                        "State": sensor.State.value
+                    }
+                    for sensor in field.sensors
+                ]
+            }
+            for field in farm.fields
+        ],
+    }
+
+
+def bulk_outcome(index: int, status: str, id: str = None, parent_id: str = None, error: str = None) -> dict:
+    """
+    Outcome of one item of a bulk create.
+    """
+    return {"Index": index, "Status": status, "Id": id, "ParentId": parent_id, "Error": error}
 
 
 class MySQLService:
     def __init__(self):
         self.engine = self._create_engine()
         self.Session = sessionmaker(bind=self.engine)
+        # Auth subject -> User, shared with AsyncMySQLService
+        self.user_cache = user_cache
         # Automatically initialize the schema
         self.init_db()
 
@@ -35,9 +84,10 @@ class MySQLService:
 
     def init_db(self):
         """
-        Initialize the database and create tables.
+        Initialize the database: create tables and apply schema migrations.
         """
-        Base.metadata.create_all(self.engine)
+        version = run_migrations(self.engine)
+        logging.info(f"Database schema at version {version}")
         # self.seed_data()
 
     # CRUD Operations
@@ -83,6 +133,108 @@ class MySQLService:
             db.refresh(newFieldmodel)
             return newFieldmodel
 
+    def create_fields(self, new_fields: List[CreateFieldSchema]) -> List[Dict]:
+        """
+        Create many fields with one executemany INSERT in a single transaction.
+        Returns an outcome per item, in request order:
+        {"Index", "Status": "created" or "rejected", "Id", "ParentId", "Error"}.
+        Fields of unknown farms are rejected; the rest are created together.
+        """
+        known_farms = self._existing_keys(
+            Farm.FarmId, [field.FarmId for field in new_fields])
+
+        outcomes, rows = [], []
+        for index, field in enumerate(new_fields):
+            if field.FarmId not in known_farms:
+                outcomes.append(bulk_outcome(
+                    index, "rejected", parent_id=field.FarmId, error="Farm not found"))
+                continue
+            field_id = str(uuid.uuid4())
+            rows.append({"FieldId": field_id, "FarmId": field.FarmId, "Name": field.Name,
+                         "Altitude": field.Altitude, "Polygon": " "})
+            outcomes.append(bulk_outcome(
+                index, "created", field_id, field.FarmId))
+
+        if rows:
+            try:
+                with self.engine.begin() as connection:
+                    connection.execute(Field.__table__.insert(), rows)
+                logging.info(f"Created {len(rows)} fields.")
+            except Exception as e:
+                logging.error(f"Error creating {len(rows)} fields: {e}")
+                raise
+        return outcomes
+
+    def create_sensors(self, new_sensors: List[CreateSensorSchema], user_id: str) -> List[Dict]:
+        """
+        Create many sensors and their initial reset dates with two executemany
+        INSERTs in a single transaction. Returns an outcome per item, as
+        create_fields. Sensors of unknown fields, and serial numbers already
+        registered or repeated in the request, are rejected.
+        """
+        known_fields = self._existing_keys(
+            Field.FieldId, [sensor.FieldId for sensor in new_sensors])
+        taken_serials = self._existing_keys(
+            Sensor.SerialNo, [sensor.SerialNo for sensor in new_sensors])
+
+        now = datetime.now()
+        outcomes, sensor_rows, reset_date_rows = [], [], []
+        for index, sensor in enumerate(new_sensors):
+            error = None
+            if sensor.FieldId not in known_fields:
+                error = "Field not found"
+            elif sensor.SerialNo in taken_serials:
+                error = f"Serial number {sensor.SerialNo} already registered"
+            if error:
+                outcomes.append(bulk_outcome(
+                    index, "rejected", parent_id=sensor.FieldId, error=error))
+                continue
+
+            # Later duplicates of the serial in this request are rejected
+            taken_serials.add(sensor.SerialNo)
+            sensor_id = str(uuid.uuid4())
+            sensor_rows.append({
+                "SensorId": sensor_id,
+                "FieldId": sensor.FieldId,
+                "SerialNo": sensor.SerialNo,
+                "OptimalGDD": sensor.OptimalGDD,
+                "Long": sensor.Long,
+                "Lat": sensor.Lat,
+                "LastCommunication": now,
+                "BatterStatus": 1,
+                "State": StateEnum.Active,
+            })
+            reset_date_rows.append(
+                {"SensorId": sensor_id, "Timestamp": now, "UserId": user_id})
+            outcomes.append(bulk_outcome(
+                index, "created", sensor_id, sensor.FieldId))
+
+        if sensor_rows:
+            try:
+                with self.engine.begin() as connection:
+                    connection.execute(Sensor.__table__.insert(), sensor_rows)
+                    connection.execute(
+                        SensorResetDates.__table__.insert(), reset_date_rows)
+                logging.info(f"Created {len(sensor_rows)} sensors.")
+            except Exception as e:
+                logging.error(
+                    f"Error creating {len(sensor_rows)} sensors: {e}")
+                raise
+        return outcomes
+
+    def _existing_keys(self, key_column, keys: Iterable[str]) -> set:
+        """
+        The subset of `keys` present in `key_column`, one query per
+        MAX_IN_CLAUSE_SIZE keys.
+        """
+        keys = list(dict.fromkeys(keys))
+        existing = set()
+        with self.engine.connect() as connection:
+            for start in range(0, len(keys), MAX_IN_CLAUSE_SIZE):
+                existing.update(connection.execute(
+                    select(key_column).where(key_column.in_(keys[start:start + MAX_IN_CLAUSE_SIZE]))).scalars())
+        return existing
+
     def create_sensor(self, newSensor: CreateSensorSchema, userId: str):
 
         with self.get_session() as db:
@@ -98,10 +250,8 @@ class MySQLService:
                 State=StateEnum.Active
             )
             db.add(newSensormodel)
-            db.commit()
-            db.refresh(newSensormodel)
 
-            # Create the sensor reset date entry
+            # Create the sensor reset date entry, in the same transaction
             sensor_reset_date = SensorResetDates(
                 SensorId=newSensormodel.SensorId,
                 Timestamp=datetime.now(),  # Use the current datetime
@@ -109,7 +259,7 @@ class MySQLService:
             )
             db.add(sensor_reset_date)
             db.commit()
-            db.refresh(sensor_reset_date)
+            db.refresh(newSensormodel)
 
             return ReadSensorSchema.from_orm(newSensormodel)
 
@@ -135,12 +285,21 @@ class MySQLService:
                 raise
 
     def get_or_create_user(self, user_info: dict):
+        """
+        The User for the token's subject, created on first sight. Cached by
+        subject, so the row is only written when it is created or its
+        profile claims change.
+        """
+        user = self.user_cache.get(user_info)
+        if user is not None:
+            return user
 
         with self.get_session() as db:
             # Check if the user exists
             user = db.query(User).filter(
                 User.AuthId == user_info.get("sub")).first()
 
+            outcome = None
             if not user:
                 # Create a new user if not found
                 user = User(
@@ -151,10 +310,20 @@ class MySQLService:
                     Email=user_info.get("email"),
                     AuthId=user_info.get("sub")
                 )
-            db.add(user)
-            db.commit()
-            db.refresh(user)
-
+                db.add(user)
+                outcome = "created"
+            else:
+                changes = profile_changes(user, user_info)
+                for column, value in changes.items():
+                    setattr(user, column, value)
+                if changes:
+                    outcome = "updated"
+
+            if outcome is not None:
+                db.commit()
+                db.refresh(user)
+
+        self.user_cache.put(user, outcome)
         return user
 
     def get_all_sensors(self):
@@ -195,6 +364,37 @@ class MySQLService:
             )
             return latest_reset_date[0] if latest_reset_date else datetime.now()
 
+    def get_latest_reset_dates_by_serials(self, serial_numbers: Iterable[str]) -> Dict[str, datetime]:
+        """
+        Latest reset date for many sensors at once, keyed by serial number,
+        with one grouped query per MAX_IN_CLAUSE_SIZE serials. Serials without
+        a reset date are left out.
+        """
+        return self._latest_reset_dates(Sensor.SerialNo, serial_numbers)
+
+    def get_latest_reset_dates_by_sensor_ids(self, sensor_ids: Iterable[str]) -> Dict[str, datetime]:
+        """
+        Latest reset date for many sensors at once, keyed by SensorId.
+        Sensors without a reset date are left out.
+        """
+        return self._latest_reset_dates(Sensor.SensorId, sensor_ids)
+
+    def _latest_reset_dates(self, key_column, keys: Iterable[str]) -> Dict[str, datetime]:
+        keys = list(dict.fromkeys(keys))
+        reset_dates = {}
+        with self.get_session() as session:
+            for start in range(0, len(keys), MAX_IN_CLAUSE_SIZE):
+                rows = (
+                    session.query(key_column, func.max(
+                        SensorResetDates.Timestamp))
+                    .join(SensorResetDates, SensorResetDates.SensorId == Sensor.SensorId)
+                    .filter(key_column.in_(keys[start:start + MAX_IN_CLAUSE_SIZE]))
+                    .group_by(key_column)
+                    .all()
+                )
+                reset_dates.update(rows)
+        return reset_dates
+
     def update_sensor_cutting_date(self, serial_number: str, cutting_date: datetime):
 
         with self.get_session() as session:
@@ -220,6 +420,32 @@ class MySQLService:
                     f"Error updating CuttingDateCalculated for sensor {serial_number}: {e}")
                 return False
 
+    def update_sensor_cutting_dates(self, cutting_dates: Dict[str, datetime]) -> bool:
+        """
+        Set CuttingDateCalculated for many sensors ({serial number: date}) with
+        one executemany UPDATE in a single transaction.
+        """
+        if not cutting_dates:
+            return True
+
+        statement = (
+            Sensor.__table__.update()
+            .where(Sensor.__table__.c.SerialNo == bindparam("serial_number"))
+            .values(CuttingDateCalculated=bindparam("cutting_date"))
+        )
+        parameters = [{"serial_number": serial_number, "cutting_date": cutting_date}
+                      for serial_number, cutting_date in cutting_dates.items()]
+        try:
+            with self.engine.begin() as connection:
+                connection.execute(statement, parameters)
+            logging.info(
+                f"Updated CuttingDateCalculated for {len(parameters)} sensors.")
+            return True
+        except Exception as e:
+            logging.error(
+                f"Error updating CuttingDateCalculated for {len(parameters)} sensors: {e}")
+            return False
+
     def get_farms_with_fields_by_user(self, user_id: str):
 
         with self.get_session() as session:
@@ -234,37 +460,7 @@ class MySQLService:
                 )
 
                 # Format the response
-                result = []
-                for farm in farms:
-                    farm_data = {
-                        "FarmId": farm.FarmId,
-                        "Name": farm.Name,
-                        "Postcode": farm.Postcode,
-                        "City": farm.City,
-                        "Country": farm.Country,
-                        "Fields": [
-                            {
-                                "FieldId": field.FieldId,
-                                "Name": field.Name,
-                                "Altitude": field.Altitude,
-                                "Polygon": field.Polygon,
-                                "Sensors": [
-                                    {
-                                        "SensorId": sensor.SensorId,
-                                        "SerialNo": sensor.SerialNo,
-                                        "LastCommunication": sensor.LastCommunication,
-                                        "BatterStatus": sensor.BatterStatus,
-                                        "OptimalGDD": sensor.OptimalGDD,
-                                        "CuttingDateCalculated": sensor.CuttingDateCalculated,
-                                        "State": sensor.State.value
-                                    }
-                                    for sensor in field.sensors
-                                ]
-                            }
-                            for field in farm.fields
-                        ],
-                    }
-                    result.append(farm_data)
+                result = [farm_with_fields_to_dict(farm) for farm in farms]
 
                 return result
             except Exception as e:
@@ -290,6 +486,10 @@ class MySQLService:
                 Sensor.FieldId == field_id).all()
             return sensors
 
+    def get_sensor_by_id(self, sensor_id: str):
+        with self.get_session() as session:
+            return session.query(Sensor).filter(Sensor.SensorId == sensor_id).first()
+
     def get_sensor_reset_date_by_sensor_id(self, sensor_id: str):
 
         with self.get_session() as session:
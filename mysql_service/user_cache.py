@@ -0,0 +1,95 @@
+# mysql_service/user_cache.py
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000))
+USER_CACHE_TTL_SEC = float(os.getenv("USER_CACHE_TTL_SEC", 300))
+
+# Token claims copied to the User row
+PROFILE_CLAIMS = {"name": "Name", "email": "Email", "phone": "Phone"}
+
+
+def profile_changes(user, user_info: dict) -> dict:
+    """
+    {User column: new value} for the profile claims that differ from the
+    user's row. Claims missing from the token leave the row unchanged.
+    """
+    return {
+        column: user_info[claim]
+        for claim, column in PROFILE_CLAIMS.items()
+        if user_info.get(claim) is not None and getattr(user, column) != user_info[claim]
+    }
+
+
+class UserCache:
+    """
+    Bounded LRU of resolved users by auth subject (`sub`), with a TTL.
+
+    A hit is only served while the token's profile claims still match the
+    cached row, so get_or_create_user writes a user on first sight or when
+    the claims change and otherwise doesn't touch the database.
+    """
+
+    def __init__(self, max_size: int = USER_CACHE_SIZE, ttl_sec: float = USER_CACHE_TTL_SEC):
+        self.max_size = max_size
+        self.ttl_sec = ttl_sec
+        self._lock = threading.Lock()
+        # sub -> (User, expiry)
+        self._users = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "created": 0,
+                       "updated": 0, "avoided_commits": 0}
+
+    def get(self, user_info: dict):
+        """
+        The cached User for the token's subject, or None if it isn't cached,
+        has expired or its profile claims changed.
+        """
+        sub = user_info.get("sub")
+        with self._lock:
+            cached = self._users.get(sub)
+            if cached is not None and (cached[1] <= time.monotonic() or profile_changes(cached[0], user_info)):
+                del self._users[sub]
+                cached = None
+            if cached is None:
+                self._stats["misses"] += 1
+                return None
+            self._users.move_to_end(sub)
+            self._stats["hits"] += 1
+            self._stats["avoided_commits"] += 1
+            return cached[0]
+
+    def put(self, user, outcome: Optional[str] = None):
+        """
+        Cache a user resolved from the database. `outcome` is "created" or
+        "updated" when the lookup wrote the row, None when it only read it.
+        """
+        with self._lock:
+            if self.max_size > 0:
+                self._users[user.AuthId] = (
+                    user, time.monotonic() + self.ttl_sec)
+                self._users.move_to_end(user.AuthId)
+                while len(self._users) > self.max_size:
+                    self._users.popitem(last=False)
+            if outcome is None:
+                self._stats["avoided_commits"] += 1
+            else:
+                self._stats[outcome] += 1
+
+    def invalidate(self, sub: str):
+        with self._lock:
+            self._users.pop(sub, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._users))
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(
+            stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+# Shared by MySQLService and AsyncMySQLService
+user_cache = UserCache()